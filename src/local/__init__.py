@@ -1,3 +1,4 @@
 """Сохраняет, обновляет и загружает локальную версию данных"""
 from local import moex, dividends
 from local.local_cpi import cpi, monthly_cpi
+from local.local_refresh import refresh
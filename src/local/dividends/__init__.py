@@ -1,6 +1,7 @@
 """Хранение и обновление локальной версии данных по дивидендам"""
 from local.dividends.comony_ru import dividends_conomy as conomy
-from local.dividends.dividends_status import smart_lab_status, dividends_status
+from local.dividends.dividends_status import smart_lab_status, dividends_status, verify_dividends, \
+    smart_lab_reconcile
 from local.dividends.dohod_ru import dividends_dohod as dohod
 from local.dividends.smart_lab_ru import dividends_smart_lab as smart_lab
 from local.dividends.sqlite import monthly_dividends
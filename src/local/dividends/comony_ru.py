@@ -9,37 +9,40 @@ CONOMY_NAME = 'conomy'
 class ConomyDataManager(AbstractDataManager):
     """Организация создания, обновления и предоставления локальных DataFrame
 
-    Данные загружаются с сайта https://www.conomy.ru
+    Данные загружаются с сайта https://www.conomy.ru - при необходимости в переданном браузере
     """
 
-    def __init__(self, ticker: str):
+    def __init__(self, ticker: str, browser=None):
+        self._browser = browser
         super().__init__(CONOMY_NAME, ticker)
 
     def download_all(self):
         """Загружаются все данные
 
         Несколько выплат в одну дату объединяются для уникальности индекса и удобства сопоставления"""
-        return dividends.conomy(self.data_name).groupby(DATE).sum()
+        return dividends.conomy(self.data_name, self._browser).groupby(DATE).sum()
 
     def download_update(self):
         """Нет возможности загрузить данные частично"""
         super().download_update()
 
 
-def dividends_conomy(ticker: str):
+def dividends_conomy(ticker: str, browser=None):
     """Сохраняет, при необходимости обновляет и возвращает дивиденды для тикеров
 
     Parameters
     ----------
     ticker
         Список тикеров
+    browser
+        Браузер web.dividends.conomy_ru.Browser для загрузки данных нескольких тикеров в одном браузере
     Returns
     -------
     pd.Series
         В строках - даты выплаты дивидендов
         Значения - выплаченные дивиденды
     """
-    data = ConomyDataManager(ticker)
+    data = ConomyDataManager(ticker, browser)
     return data.value
 
 
@@ -1,16 +1,56 @@
 """Функции проверки статуса дивидендов"""
+from concurrent.futures import ThreadPoolExecutor
 from urllib.error import URLError
 
 import numpy as np
 import pandas as pd
 
 from local.dividends import smart_lab_ru, dohod_ru, comony_ru
-from local.dividends.sqlite import DividendsDataManager, STATISTICS_START
-from web.labels import TICKER, DIVIDENDS
+from local.dividends.sqlite import DividendsDataManager, STATISTICS_START, load_dividends
+from web.dividends.conomy_ru import Browser
+from web.labels import DATE, TICKER, DIVIDENDS
 
 DIVIDENDS_SOURCES = [dohod_ru.dividends_dohod,
                      comony_ru.dividends_conomy,
                      smart_lab_ru.dividends_smart_lab]
+# Источники, для загрузки которых нужен браузер
+BROWSER_SOURCES = [comony_ru.dividends_conomy]
+# Максимальное количество одновременных загрузок данных из источников, работающих по HTTP
+MAX_WORKERS = 8
+
+# Столбец со значением дивидендов из локальной базы при сверке
+LOCAL_DIVIDENDS = 'LOCAL_DIVIDENDS'
+
+
+def smart_lab_reconcile(tickers: tuple):
+    """Сверка ожидаемых дивидендов со СмартЛаба с основной локальной базой дивидендов
+
+    Локальные данные для всех тикеров со СмартЛаба загружаются одним запросом и объединяются с таблицей СмартЛаба по
+    тикеру и дате
+
+    Parameters
+    ----------
+    tickers
+        Основные тикеры, для которых нужно проверить актуальность данных
+
+    Returns
+    -------
+    tuple
+        Нулевой элемент кортежа - список тикеров из переданных без актуальной информации в локальной базе
+        Первый элемент кортежа - список тикеров со СмартЛаба, по которым нет актуальной информации в локальной базе
+        Второй элемент кортежа - pd.DataFrame со строками СмартЛаба без актуальной информации в локальной базе и
+        значением из локальной базы в столбце LOCAL_DIVIDENDS (NaN при отсутствии выплаты в локальной базе)
+    """
+    df = smart_lab_ru.dividends_smart_lab()
+    smart_lab = pd.DataFrame({DATE: df.index, TICKER: df[TICKER].values, DIVIDENDS: df[DIVIDENDS].values},
+                             columns=[DATE, TICKER, DIVIDENDS])
+    local_data = load_dividends(tuple(smart_lab[TICKER].unique()))
+    local_data = local_data.stack().rename(LOCAL_DIVIDENDS).reset_index()
+    merged = smart_lab.merge(local_data, on=[DATE, TICKER], how='left')
+    stale = merged[LOCAL_DIVIDENDS].isnull() | (merged[LOCAL_DIVIDENDS] != merged[DIVIDENDS])
+    diff = merged[stale].set_index(DATE)
+    in_tickers = diff[TICKER].isin(tickers).values
+    return list(diff.loc[in_tickers, TICKER]), list(diff.loc[~in_tickers, TICKER]), diff
 
 
 def smart_lab_status(tickers: tuple):
@@ -27,18 +67,86 @@ def smart_lab_status(tickers: tuple):
         Нулевой элемент кортежа - список тикеров из переданных без актуальной информации в локальной базе
         Первый элемент кортежа - список тикеров со СмартЛаба, по которым нет актуальной информации в локальной базе
     """
-    df = smart_lab_ru.dividends_smart_lab()
-    result = ([], [])
-    for i in range(len(df)):
-        date = df.index[i]
-        ticker = df.iloc[i][TICKER]
-        value = df.iloc[i][DIVIDENDS]
-        local_data = DividendsDataManager(ticker).value
-        if (date not in local_data.index) or (local_data[date] != value):
-            if ticker in tickers:
-                result[0].append(ticker)
+    return smart_lab_reconcile(tickers)[:2]
+
+
+def _load_source(source, ticker: str, browser=None):
+    """Загружает данные источника, а при ошибке загрузки возвращает исключение"""
+    try:
+        if source in BROWSER_SOURCES:
+            return source(ticker, browser)
+        return source(ticker)
+    except (IndexError, URLError) as err:
+        return err
+
+
+def _load_browser_sources(tickers: tuple):
+    """Последовательно загружает данные источников, требующих браузера, используя один браузер для всех тикеров"""
+    with Browser() as browser:
+        return {(ticker, source): _load_source(source, ticker, browser)
+                for ticker in tickers
+                for source in DIVIDENDS_SOURCES if source in BROWSER_SOURCES}
+
+
+def _compare(df, source_df, ticker: str, source_name: str):
+    """Сопоставляет основные данные с данными источника"""
+    source_df = source_df[source_df.index >= pd.Timestamp(STATISTICS_START)]
+    source_df.name = source_name
+    compare_df = pd.concat([df, source_df], axis='columns')
+    compare_df['STATUS'] = 'ERROR'
+    compare_df.loc[np.isclose(compare_df[ticker].values, compare_df[source_name].values), 'STATUS'] = ''
+    return compare_df
+
+
+def verify_dividends(tickers: tuple, max_workers: int = MAX_WORKERS):
+    """Проверяет необходимость обновления данных для нескольких тикеров
+
+    Сравнивает основные данные по дивидендам с альтернативными источниками и выводит результаты сравнения. Данные
+    источников, работающих по HTTP, загружаются одновременно, а источники, требующие браузера, загружаются в одном
+    браузере параллельно с ними. Результаты выводятся в порядке тикеров и источников
+
+    Parameters
+    ----------
+    tickers
+        Кортеж тикеров
+    max_workers
+        Максимальное количество одновременных загрузок
+
+    Returns
+    -------
+    dict
+        Для каждого тикера список из DataFrame с результатами сравнения для каждого источника данных
+    """
+    tickers = tuple(dict.fromkeys(tickers))
+    local_data = dict()
+    for ticker in tickers:
+        manager = DividendsDataManager(ticker)
+        manager.update()
+        local_data[ticker] = manager.value
+    try:
+        # Общие для всех тикеров данные загружаются заранее
+        smart_lab_ru.dividends_smart_lab()
+    except URLError:
+        pass
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        browser_future = executor.submit(_load_browser_sources, tickers)
+        futures = {(ticker, source): executor.submit(_load_source, source, ticker)
+                   for ticker in tickers
+                   for source in DIVIDENDS_SOURCES if source not in BROWSER_SOURCES}
+        loaded = {key: future.result() for key, future in futures.items()}
+        loaded.update(browser_future.result())
+    result = dict()
+    for ticker in tickers:
+        result[ticker] = []
+        for source in DIVIDENDS_SOURCES:
+            print(f'\nСРАВНЕНИЕ ОСНОВНЫХ ДАННЫХ С {source.__name__}\n')
+            source_df = loaded[ticker, source]
+            if isinstance(source_df, Exception):
+                print(source_df.args[0])
             else:
-                result[1].append(ticker)
+                compare_df = _compare(local_data[ticker], source_df, ticker, source.__name__)
+                print(compare_df)
+                result[ticker].append(compare_df)
     return result
 
 
@@ -57,27 +165,7 @@ def dividends_status(ticker: str):
     list
         Список из DataFrame с результатами сравнения для каждого источника данных
     """
-    manager = DividendsDataManager(ticker)
-    manager.update()
-    df = manager.value
-    result = []
-    for source in DIVIDENDS_SOURCES:
-        print(f'\nСРАВНЕНИЕ ОСНОВНЫХ ДАННЫХ С {source.__name__}\n')
-        try:
-            source_df = source(ticker)
-        except IndexError as err:
-            print(err.args[0])
-        except URLError as err:
-            print(err.args[0])
-        else:
-            source_df = source_df[source_df.index >= pd.Timestamp(STATISTICS_START)]
-            source_df.name = source.__name__
-            compare_df = pd.concat([df, source_df], axis='columns')
-            compare_df['STATUS'] = 'ERROR'
-            compare_df.loc[np.isclose(compare_df[ticker].values, compare_df[source.__name__].values), 'STATUS'] = ''
-            print(compare_df)
-            result.append(compare_df)
-    return result
+    return verify_dividends((ticker,))[ticker]
 
 
 if __name__ == '__main__':
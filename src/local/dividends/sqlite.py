@@ -1,28 +1,266 @@
-"""Реализация менеджера данных для дивидендов и вспомогательные функции"""
+"""Реализация менеджера данных для дивидендов и вспомогательные функции
+
+Дивиденды всех тикеров хранятся в одной таблице базы данных с индексом по тикеру и дате, поэтому данные для любого
+набора тикеров загружаются одним запросом. Таблицы старого формата с данными отдельных тикеров автоматически
+переносятся в общую таблицу
+"""
+import contextlib
 import functools
 import sqlite3
+import threading
 
 import pandas as pd
-from pandas.io.sql import DatabaseError
 
 from settings import DATA_PATH
-from utils.aggregation import monthly_aggregation_func
+from utils.aggregation import monthly_index, monthly_labels, months_between
+from utils.data_file import DataFile
 from utils.data_manager import AbstractDataManager
-from web.labels import DATE, TICKER
+from web.labels import DATE, DIVIDENDS, TICKER
 
 DIVIDENDS_CATEGORY = 'dividends'
 STATISTICS_START = '2010-01-01'
 DATABASE = str(DATA_PATH / 'dividends.db')
 
+# Общая таблица дивидендов, ее индекс и колонка с источником данных
+TABLE = 'DIVIDENDS'
+TABLE_INDEX = 'DIVIDENDS_TICKER_DATE'
+SOURCE = 'SOURCE'
+# Колонка с комментариями в таблицах старого формата
+LEGACY_COMMENTS = 'COMMENTS'
+
+# Таблица счетчиков изменений дивидендов по тикерам - все изменения и изменения или удаления существующих строк
+CHANGES_TABLE = 'DIVIDENDS_CHANGES'
+VERSION = 'VERSION'
+REWRITES = 'REWRITES'
+# Счетчики поддерживаются триггерами на изменение общей таблицы дивидендов
+TRIGGERS = [f'CREATE TRIGGER IF NOT EXISTS {TABLE}_INSERT AFTER INSERT ON {TABLE} BEGIN '
+            f'INSERT OR IGNORE INTO {CHANGES_TABLE} ({TICKER}, {VERSION}, {REWRITES}) VALUES (NEW.{TICKER}, 0, 0); '
+            f'UPDATE {CHANGES_TABLE} SET {VERSION} = {VERSION} + 1 WHERE {TICKER} = NEW.{TICKER}; '
+            f'END',
+            f'CREATE TRIGGER IF NOT EXISTS {TABLE}_UPDATE AFTER UPDATE ON {TABLE} BEGIN '
+            f'INSERT OR IGNORE INTO {CHANGES_TABLE} ({TICKER}, {VERSION}, {REWRITES}) VALUES (NEW.{TICKER}, 0, 0); '
+            f'UPDATE {CHANGES_TABLE} SET {VERSION} = {VERSION} + 1, {REWRITES} = {REWRITES} + 1 '
+            f'WHERE {TICKER} IN (OLD.{TICKER}, NEW.{TICKER}); '
+            f'END',
+            f'CREATE TRIGGER IF NOT EXISTS {TABLE}_DELETE AFTER DELETE ON {TABLE} BEGIN '
+            f'UPDATE {CHANGES_TABLE} SET {VERSION} = {VERSION} + 1, {REWRITES} = {REWRITES} + 1 '
+            f'WHERE {TICKER} = OLD.{TICKER}; '
+            f'END']
+
+# Категория данных с состоянием базы данных на момент последнего обновления локальных данных по дивидендам
+VERSION_CATEGORY = 'dividends_version'
+
+# Перенос данных из таблиц старого формата не должен выполняться одновременно из нескольких потоков
+_LOCK = threading.Lock()
+
+
+def connect(database: str = None):
+    """Соединение с базой данных дивидендов, в которой при необходимости создана общая таблица
+
+    Parameters
+    ----------
+    database
+        Путь к базе данных - по умолчанию DATABASE
+
+    Returns
+    -------
+    sqlite3.Connection
+        Соединение в режиме автоматической фиксации изменений - транзакции открываются явно
+    """
+    connection = sqlite3.connect(database or DATABASE, isolation_level=None)
+    with _LOCK:
+        tables_exist = _has_table(connection, TABLE) and _has_table(connection, CHANGES_TABLE)
+        if _legacy_tables(connection) or not tables_exist:
+            _migrate(connection)
+    return connection
+
+
+def _has_table(connection, name: str):
+    """Проверяет наличие таблицы в базе данных"""
+    query = "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?"
+    return connection.execute(query, (name,)).fetchone() is not None
+
+
+def _legacy_tables(connection):
+    """Таблицы старого формата с колонками DATE и DIVIDENDS для отдельных тикеров и наличие в них комментариев"""
+    names = [name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    tables = dict()
+    for name in names:
+        if name in (TABLE, CHANGES_TABLE) or name.startswith('sqlite_'):
+            continue
+        columns = [row[1] for row in connection.execute(f'PRAGMA table_info("{name}")')]
+        if DATE in columns and DIVIDENDS in columns:
+            tables[name] = LEGACY_COMMENTS in columns
+    return tables
+
+
+def _migrate(connection):
+    """Создает общую таблицу дивидендов и переносит в нее данные из таблиц старого формата одной транзакцией
+
+    Вместе с общей таблицей создаются счетчики изменений и поддерживающие их триггеры. Если общая таблица уже
+    существовала без счетчиков, то счетчики инициализируются количеством строк каждого тикера
+
+    Перенесенные таблицы удаляются, поэтому таблица старого формата, созданная позже, будет перенесена при следующем
+    соединении
+    """
+    connection.execute('BEGIN IMMEDIATE')
+    try:
+        connection.execute(f'CREATE TABLE IF NOT EXISTS {TABLE} ('
+                           f'{TICKER} TEXT NOT NULL, '
+                           f'{DATE} TEXT NOT NULL, '
+                           f'{DIVIDENDS} REAL NOT NULL, '
+                           f"{SOURCE} TEXT NOT NULL DEFAULT '')")
+        connection.execute(f'CREATE INDEX IF NOT EXISTS {TABLE_INDEX} ON {TABLE} ({TICKER}, {DATE})')
+        if not _has_table(connection, CHANGES_TABLE):
+            connection.execute(f'CREATE TABLE {CHANGES_TABLE} ('
+                               f'{TICKER} TEXT PRIMARY KEY, '
+                               f'{VERSION} INTEGER NOT NULL, '
+                               f'{REWRITES} INTEGER NOT NULL)')
+            connection.execute(f'INSERT INTO {CHANGES_TABLE} ({TICKER}, {VERSION}, {REWRITES}) '
+                               f'SELECT {TICKER}, COUNT(*), 0 FROM {TABLE} GROUP BY {TICKER}')
+        for trigger in TRIGGERS:
+            connection.execute(trigger)
+        for name, has_comments in _legacy_tables(connection).items():
+            source = f"COALESCE({LEGACY_COMMENTS}, '')" if has_comments else "''"
+            connection.execute(f'INSERT INTO {TABLE} ({TICKER}, {DATE}, {DIVIDENDS}, {SOURCE}) '
+                               f'SELECT ?, {DATE}, {DIVIDENDS}, {source} FROM "{name}"', (name,))
+            connection.execute(f'DROP TABLE "{name}"')
+    except sqlite3.Error:
+        connection.execute('ROLLBACK')
+        raise
+    connection.execute('COMMIT')
+
+
+def load_dividends(tickers: tuple, database: str = None):
+    """Загружает дивиденды для набора тикеров одним запросом
+
+    Несколько выплат в одну дату объединяются, учитываются только выплаты начиная с STATISTICS_START
+
+    Parameters
+    ----------
+    tickers
+        Кортеж тикеров
+    database
+        Путь к базе данных - по умолчанию DATABASE
+
+    Returns
+    -------
+    pd.DataFrame
+        Столбцы - тикеры в порядке из кортежа
+        Строки - даты выплат хотя бы одного из тикеров. При отсутствии выплаты - NaN
+    """
+    unique_tickers = list(dict.fromkeys(tickers))
+    placeholders = ', '.join('?' * len(unique_tickers))
+    query = (f'SELECT {TICKER}, {DATE}, {DIVIDENDS} FROM {TABLE} '
+             f'WHERE {TICKER} IN ({placeholders}) AND {DATE} >= ?')
+    with contextlib.closing(connect(database)) as connection:
+        df = pd.read_sql_query(query, connection, params=unique_tickers + [STATISTICS_START], parse_dates=[DATE])
+    if len(df):
+        df = df.pivot_table(index=DATE, columns=TICKER, values=DIVIDENDS, aggfunc='sum')
+    else:
+        df = pd.DataFrame(index=pd.DatetimeIndex([], name=DATE), dtype='float64')
+    df = df.reindex(columns=list(tickers))
+    df.columns.name = TICKER
+    return df
+
+
+def database_state(ticker: str, database: str = None):
+    """Состояние дивидендов тикера в базе данных для обнаружения изменений
+
+    Parameters
+    ----------
+    ticker
+        Тикер
+    database
+        Путь к базе данных - по умолчанию DATABASE
+
+    Returns
+    -------
+    tuple
+        Счетчик всех изменений, счетчик изменений и удалений существующих строк и максимальный rowid строк тикера
+        или None при их отсутствии
+    """
+    query = (f'SELECT '
+             f'(SELECT {VERSION} FROM {CHANGES_TABLE} WHERE {TICKER} = :ticker), '
+             f'(SELECT {REWRITES} FROM {CHANGES_TABLE} WHERE {TICKER} = :ticker), '
+             f'(SELECT MAX(rowid) FROM {TABLE} WHERE {TICKER} = :ticker)')
+    with contextlib.closing(connect(database)) as connection:
+        version, rewrites, max_rowid = connection.execute(query, dict(ticker=ticker)).fetchone()
+    return version or 0, rewrites or 0, max_rowid
+
+
+def load_new_dividends(ticker: str, rowid, database: str = None):
+    """Загружает суммы выплат за даты, на которые в базе данных есть строки с rowid больше заданного
+
+    Parameters
+    ----------
+    ticker
+        Тикер
+    rowid
+        Максимальный rowid уже загруженных строк или None, если строки не загружались
+    database
+        Путь к базе данных - по умолчанию DATABASE
+
+    Returns
+    -------
+    pd.Series
+        Суммы выплат по датам начиная с STATISTICS_START
+    """
+    query = (f'SELECT {DATE}, SUM({DIVIDENDS}) AS {DIVIDENDS} FROM {TABLE} '
+             f'WHERE {TICKER} = :ticker AND {DATE} >= :start AND {DATE} IN '
+             f'(SELECT {DATE} FROM {TABLE} WHERE {TICKER} = :ticker AND rowid > :rowid) '
+             f'GROUP BY {DATE} ORDER BY {DATE}')
+    params = dict(ticker=ticker, start=STATISTICS_START, rowid=-1 if rowid is None else rowid)
+    with contextlib.closing(connect(database)) as connection:
+        df = pd.read_sql_query(query, connection, params=params, index_col=DATE, parse_dates=[DATE])
+    return df[DIVIDENDS].astype('float64').rename(ticker)
+
 
 class DividendsDataManager(AbstractDataManager):
     """Организация создания, обновления и предоставления локальных DataFrame
 
-    Данные загружаются из локальной базы данных и сохраняются в общем формате DataManager
+    Данные загружаются из локальной базы данных и сохраняются в общем формате DataManager. Вместе с данными
+    сохраняется состояние базы данных, поэтому при обновлении загружаются только новые строки, а при отсутствии
+    изменений обновляется лишь время обновления
     """
     def __init__(self, ticker: str):
+        self._version = DataFile(VERSION_CATEGORY, ticker)
+        # Новые строки, загруженные при проверке возможности дописать их к существующим данным
+        self._new_rows = None
         super().__init__(DIVIDENDS_CATEGORY, ticker)
 
+    def create(self):
+        """Создает локальный файл с нуля и запоминает состояние базы данных"""
+        state = database_state(self.data_name)
+        super().create()
+        self._version.value = state
+
+    def update(self):
+        """Обновляет локальные данные с учетом изменений в базе данных
+
+        Если дивиденды тикера в базе не менялись, то без перезаписи данных обновляется только время обновления. Если в
+        базе только добавлены строки на новые даты, то загружаются лишь они. При изменении или удалении строк,
+        добавлении выплат на уже существующие даты или отсутствии сохраненного состояния базы данные загружаются с нуля
+        """
+        saved = self._version.value
+        state = database_state(self.data_name)
+        if saved is None or state[1] != saved[1]:
+            self.create()
+            return
+        if state == saved:
+            self._data.touch()
+            return
+        new_rows = self.download_update()
+        if new_rows.index.isin(self.value.index).any():
+            self.create()
+            return
+        self._new_rows = new_rows
+        try:
+            super().update()
+        finally:
+            self._new_rows = None
+        self._version.value = state
+
     def download_all(self):
         """Загружает данные из базы базы данных
 
@@ -30,30 +268,23 @@ class DividendsDataManager(AbstractDataManager):
         Берется колонка с дивидендами и отбрасывается с комментариями
         В случае отсутствия данных возвращается пустая Series
         """
-        connection = sqlite3.connect(DATABASE)
-        query = f'SELECT DATE, DIVIDENDS FROM {self.data_name}'
-        try:
-            df = pd.read_sql_query(query, connection, index_col=DATE, parse_dates=[DATE])
-        except DatabaseError:
-            return pd.Series(name=self.data_name, index=pd.DatetimeIndex([], name=DATE))
-        else:
-            df = df[df.index >= pd.Timestamp(STATISTICS_START)]
-            # Несколько выплат в одну дату объединяются
-            df = df.groupby(DATE).sum()
-            df.columns = [self.data_name]
-            return df[self.data_name]
+        df = load_dividends((self.data_name,))
+        return df[self.data_name].dropna()
 
     def download_update(self):
-        super().download_update()
+        """Загружает суммы выплат за даты, на которые в базе данных появились новые строки
+
+        Во время обновления используются строки, уже загруженные для проверки
+        """
+        if self._new_rows is not None:
+            return self._new_rows
+        return load_new_dividends(self.data_name, self._version.value[2])
 
 
 @functools.lru_cache(maxsize=1)
 def tickers_dividends(tickers: tuple):
-    """Сводная информация по дивидендам для заданных тикеров"""
-    frames = (DividendsDataManager(ticker).value for ticker in tickers)
-    df = pd.concat(frames, axis='columns')
-    df.columns.name = TICKER
-    return df
+    """Сводная информация по дивидендам для заданных тикеров - загружается одним запросом к базе данных"""
+    return load_dividends(tickers)
 
 
 def monthly_dividends(tickers: tuple, last_date: pd.Timestamp):
@@ -76,10 +307,9 @@ def monthly_dividends(tickers: tuple, last_date: pd.Timestamp):
     month_end_day = last_date.day
     crop_date = pd.Timestamp(STATISTICS_START) + pd.DateOffset(day=month_end_day, days=1)
     df = df.loc[crop_date:, :]
-    df = df.groupby(by=monthly_aggregation_func(last_date)).sum()
-    start_date = pd.Timestamp(STATISTICS_START) + pd.DateOffset(months=1, day=month_end_day)
-    offset = pd.DateOffset(months=1, day=month_end_day)
-    index = pd.DatetimeIndex(start=start_date, end=last_date, freq=offset)
+    df = df.groupby(by=monthly_labels(df.index, last_date)).sum()
+    start_date = pd.Timestamp(STATISTICS_START) + pd.DateOffset(months=1)
+    index = monthly_index(start_date, months_between(start_date, last_date), month_end_day)
     df = df.reindex(index=index, fill_value=0)
     return df
 
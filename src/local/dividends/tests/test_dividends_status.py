@@ -1,7 +1,17 @@
+import sqlite3
+from pathlib import Path
+
 import pandas as pd
+import pytest
 
-from local.dividends import smart_lab_ru
-from local.dividends.dividends_status import dividends_status, smart_lab_status
+import settings
+from local.dividends import smart_lab_ru, sqlite
+from local.dividends.dividends_status import dividends_status, smart_lab_status, smart_lab_reconcile, LOCAL_DIVIDENDS
+from local.dividends.dividends_status import verify_dividends
+from web import recording, session, stand_in
+from web.dividends import conomy_ru, dohod_ru
+from web.dividends import smart_lab_ru as web_smart_lab_ru
+from web.labels import DIVIDENDS, TICKER
 
 
 def test_smart_lab_status(monkeypatch):
@@ -47,3 +57,99 @@ def test_dividends_status_no_table(capsys):
     dividends_status('NKHP')
     captured = capsys.readouterr()
     assert 'На странице нет таблицы 2' in captured.out
+
+
+def test_smart_lab_reconcile(monkeypatch):
+    data = {'TICKER': ['PIKK', 'ALRS', 'CHMF', 'MTSS', 'NLMK'], 'DIVIDENDS': [22.0, 5.930, 45.940, 2.600, 5.0]}
+    index = pd.DatetimeIndex(['2018-09-04', '2018-10-16', '2018-09-25', '2018-10-09', '2018-10-12'])
+    fake_df = pd.DataFrame(data=data, index=index)
+    monkeypatch.setattr(smart_lab_ru, 'dividends_smart_lab', lambda: fake_df)
+    in_tickers, others, diff = smart_lab_reconcile(tuple(['PIKK', 'CHMF']))
+    assert (in_tickers, others) == smart_lab_status(tuple(['PIKK', 'CHMF']))
+    assert list(diff[TICKER]) == ['PIKK', 'ALRS', 'NLMK']
+    assert list(diff.index) == [pd.Timestamp('2018-09-04'), pd.Timestamp('2018-10-16'), pd.Timestamp('2018-10-12')]
+    assert list(diff[DIVIDENDS]) == [22.0, 5.930, 5.0]
+    assert LOCAL_DIVIDENDS in diff.columns
+
+
+def make_table(rows, columns=8):
+    body = ''.join('<tr>' + ''.join(f'<td>{cell}</td>' for cell in row + [''] * (columns - len(row))) + '</tr>'
+                   for row in rows)
+    return f'<table>{body}</table>'
+
+
+def dohod_html(rows):
+    table = make_table([['Дата закрытия реестра', '', 'Дивиденд (руб.)']] + [[date, '', div] for date, div in rows])
+    return f'<html><body><table></table><table></table>{table}</body></html>'.encode('utf-8')
+
+
+def conomy_html(rows):
+    header = [['', '', '', '', '', 'Дата закрытия реестра акционеров', '', 'Размер дивидендов\nна одну акцию, руб.'],
+              ['', '', '', '', '', 'Под выплату дивидендов', '', 'АОИ']]
+    table = make_table(header + [['', '', '', '', '', date, '', div] for date, div in rows], 9)
+    return f'<html><body><table></table>{table}</body></html>'
+
+
+SMART_LAB_FOOTER = '\n+добавить дивиденды\nИстория выплаченных дивидендов\n'
+
+
+def smart_lab_html():
+    rows = [['', 'Тикер', '', '', 'дата отсечки', '', '', 'дивиденд,руб'],
+            ['', 'CHMF', '', '', '25.09.2018', '', '', '45,94']]
+    table = make_table(rows)[:-len('</table>')] + f'<tr><td colspan="8">{SMART_LAB_FOOTER}</td></tr></table>'
+    return f'<html><body><table></table><table></table>{table}</body></html>'.encode('utf-8')
+
+
+@pytest.fixture(name='stand_in_dividends')
+def make_stand_in_dividends(tmpdir, monkeypatch):
+    data_dir = Path(tmpdir.mkdir('data'))
+    monkeypatch.setattr(settings, 'DATA_PATH', data_dir)
+    database = str(data_dir / 'dividends.db')
+    connection = sqlite3.connect(database)
+    connection.execute('CREATE TABLE AKRN (DATE datetime, DIVIDENDS real, COMMENTS text)')
+    connection.executemany('INSERT INTO AKRN VALUES (?, ?, ?)', [('2017-04-10', 78.0, ''), ('2018-04-09', 78.0, '')])
+    connection.execute('CREATE TABLE CHMF (DATE datetime, DIVIDENDS real, COMMENTS text)')
+    connection.execute("INSERT INTO CHMF VALUES ('2018-06-19', 66.04, '')")
+    connection.commit()
+    connection.close()
+    monkeypatch.setattr(sqlite, 'DATABASE', database)
+
+    records = str(tmpdir.mkdir('records'))
+    recording.save(records, dohod_ru.make_url('AKRN'), dohod_html([('10.04.2017', '78'), ('09.04.2018', '78')]))
+    recording.save(records, dohod_ru.make_url('CHMF'), dohod_html([('19.06.2018', '66,04'), ('25.09.2018', '45,94')]))
+    recording.save(records, web_smart_lab_ru.URL, smart_lab_html())
+
+    browsers = []
+
+    def fake_get_html(ticker, browser=None):
+        browsers.append(browser)
+        if ticker == 'CHMF':
+            return '<html><body><table></table></body></html>'
+        return conomy_html([('10.04.2017', '78'), ('09.04.2018', '77')])
+
+    monkeypatch.setattr(conomy_ru, 'get_html', fake_get_html)
+    monkeypatch.setattr(session.SESSION, '_backoff', 0.001)
+    with stand_in.stand_in(records) as server:
+        yield server, browsers
+
+
+def test_verify_dividends(stand_in_dividends, capsys):
+    server, browsers = stand_in_dividends
+    result = verify_dividends(('AKRN', 'CHMF'))
+    captured = capsys.readouterr()
+    assert list(result) == ['AKRN', 'CHMF']
+    assert len(browsers) == 2
+    assert browsers[0] is browsers[1] is not None
+    assert server.requests == 3
+
+    dohod, conomy, smart_lab = result['AKRN']
+    assert list(dohod['STATUS']) == ['', '']
+    assert list(conomy['STATUS']) == ['', 'ERROR']
+    assert list(smart_lab['STATUS']) == ['ERROR', 'ERROR']
+
+    assert len(result['CHMF']) == 2
+    dohod, smart_lab = result['CHMF']
+    assert list(dohod['STATUS']) == ['', 'ERROR']
+    assert list(smart_lab['STATUS']) == ['ERROR', 'ERROR']
+    assert 'На странице нет таблицы 1' in captured.out
+    assert captured.out.index('AKRN') < captured.out.index('CHMF')
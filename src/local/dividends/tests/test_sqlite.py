@@ -1,3 +1,4 @@
+import sqlite3
 from pathlib import Path
 
 import pandas as pd
@@ -6,6 +7,7 @@ import pytest
 import local.dividends.sqlite as local_dividends
 import settings
 from local.dividends.sqlite import DividendsDataManager
+from utils.data_file import DataFile
 
 
 @pytest.fixture(scope='module', autouse=True)
@@ -44,3 +46,101 @@ def test_no_data_in_data_base():
     assert df.name == 'TEST'
     assert len(df) == 0
     assert isinstance(df.index, pd.DatetimeIndex)
+
+
+def make_legacy_database(path):
+    connection = sqlite3.connect(str(path))
+    connection.execute('CREATE TABLE AKRN (DATE datetime, DIVIDENDS real, COMMENTS text)')
+    connection.executemany('INSERT INTO AKRN VALUES (?, ?, ?)', [('2009-05-01', 10.0, ''),
+                                                                 ('2010-04-09', 25.0, 'a'),
+                                                                 ('2011-04-08', 40.0, None),
+                                                                 ('2011-04-08', 2.0, '')])
+    connection.execute('CREATE TABLE GMKN (DATE datetime, DIVIDENDS real)')
+    connection.execute("INSERT INTO GMKN VALUES ('2011-04-08', 180.0)")
+    connection.commit()
+    connection.close()
+
+
+def test_migrate_legacy_tables(tmpdir):
+    database = str(Path(tmpdir) / 'legacy.db')
+    make_legacy_database(database)
+    connection = local_dividends.connect(database)
+    tables = [name for name, in connection.execute("SELECT name FROM sqlite_master WHERE type = 'table'")]
+    assert tables == [local_dividends.TABLE, local_dividends.CHANGES_TABLE]
+    rows = connection.execute('SELECT TICKER, DATE, DIVIDENDS, SOURCE FROM DIVIDENDS ORDER BY TICKER, DATE').fetchall()
+    assert len(rows) == 5
+    assert rows[1] == ('AKRN', '2010-04-09', 25.0, 'a')
+    assert rows[4] == ('GMKN', '2011-04-08', 180.0, '')
+    connection.execute('CREATE TABLE CHMF (DATE datetime, DIVIDENDS real, COMMENTS text)')
+    connection.execute("INSERT INTO CHMF VALUES ('2012-01-01', 4.0, '')")
+    connection.close()
+    connection = local_dividends.connect(database)
+    assert connection.execute('SELECT COUNT(*) FROM DIVIDENDS').fetchone() == (6,)
+    connection.close()
+
+
+def test_load_dividends(tmpdir):
+    database = str(Path(tmpdir) / 'legacy.db')
+    make_legacy_database(database)
+    df = local_dividends.load_dividends(('GMKN', 'TEST', 'AKRN'), database)
+    assert list(df.columns) == ['GMKN', 'TEST', 'AKRN']
+    assert list(df.index) == [pd.Timestamp('2010-04-09'), pd.Timestamp('2011-04-08')]
+    assert df.loc['2011-04-08', 'AKRN'] == pytest.approx(42.0)
+    assert df.loc['2011-04-08', 'GMKN'] == pytest.approx(180.0)
+    assert df['TEST'].isnull().all()
+    assert df.loc['2010-04-09'].isnull().tolist() == [True, True, False]
+
+
+def test_database_state(tmpdir):
+    database = str(Path(tmpdir) / 'legacy.db')
+    make_legacy_database(database)
+    assert local_dividends.database_state('AKRN', database) == (4, 0, 4)
+    assert local_dividends.database_state('TEST', database) == (0, 0, None)
+    connection = local_dividends.connect(database)
+    connection.execute("INSERT INTO DIVIDENDS (TICKER, DATE, DIVIDENDS) VALUES ('AKRN', '2012-01-01', 1.0)")
+    assert local_dividends.database_state('AKRN', database) == (5, 0, 6)
+    new = local_dividends.load_new_dividends('AKRN', 4, database)
+    assert new.name == 'AKRN'
+    assert list(new.index) == [pd.Timestamp('2012-01-01')]
+    connection.execute("INSERT INTO DIVIDENDS (TICKER, DATE, DIVIDENDS) VALUES ('AKRN', '2011-04-08', 1.0)")
+    new = local_dividends.load_new_dividends('AKRN', 6, database)
+    assert new['2011-04-08'] == pytest.approx(43.0)
+    connection.execute("UPDATE DIVIDENDS SET DIVIDENDS = 26.0 WHERE TICKER = 'AKRN' AND DATE = '2010-04-09'")
+    assert local_dividends.database_state('AKRN', database)[:2] == (7, 1)
+    connection.execute("DELETE FROM DIVIDENDS WHERE TICKER = 'GMKN'")
+    assert local_dividends.database_state('GMKN', database)[1:] == (1, None)
+    connection.close()
+
+
+def test_incremental_update(tmpdir, monkeypatch):
+    database = str(Path(tmpdir) / 'legacy.db')
+    make_legacy_database(database)
+    monkeypatch.setattr(local_dividends, 'DATABASE', database)
+    manager = DividendsDataManager('AKRN')
+    assert list(manager.value) == [25.0, 42.0]
+    last_update = manager.last_update
+    path = DataFile(local_dividends.DIVIDENDS_CATEGORY, 'AKRN').data_path
+    mtime = path.stat().st_mtime_ns
+    connection = local_dividends.connect(database)
+    manager.update()
+    assert manager.last_update > last_update
+    assert path.stat().st_mtime_ns == mtime
+    assert list(manager.value) == [25.0, 42.0]
+    assert DividendsDataManager('AKRN').last_update == manager.last_update
+
+    connection.execute("INSERT INTO DIVIDENDS (TICKER, DATE, DIVIDENDS) VALUES ('AKRN', '2012-01-01', 1.0)")
+    loaded = []
+    load_new_dividends = local_dividends.load_new_dividends
+    monkeypatch.setattr(local_dividends, 'load_new_dividends',
+                        lambda *args: loaded.append(args) or load_new_dividends(*args))
+    manager.update()
+    assert list(manager.value) == [25.0, 42.0, 1.0]
+    assert loaded == [('AKRN', 4)]
+
+    connection.execute("INSERT INTO DIVIDENDS (TICKER, DATE, DIVIDENDS) VALUES ('AKRN', '2010-04-09', 1.0)")
+    manager.update()
+    assert list(manager.value) == [26.0, 42.0, 1.0]
+    connection.execute("DELETE FROM DIVIDENDS WHERE TICKER = 'AKRN' AND DATE = '2012-01-01'")
+    manager.update()
+    assert list(manager.value) == [26.0, 42.0]
+    connection.close()
@@ -1,11 +1,17 @@
 """Реализация менеджера данных для CPI и вспомогательные функции"""
+import functools
 
 import pandas as pd
 
 import web
+from utils.aggregation import monthly_index, months_between
 from utils.data_manager import AbstractDataManager
 
 CPI_NAME = 'cpi'
+# Количество месяцев в году - на такой срок статистика продлевается исходя из последней годовой инфляции
+MONTHS_IN_YEAR = 12
+# Максимальное количество дней в месяце - для каждого дня кэшируется свой ряд инфляции
+MAX_DAYS_IN_MONTH = 31
 
 
 class CPIDataManager(AbstractDataManager):
@@ -36,6 +42,46 @@ def cpi():
     return data.value
 
 
+@functools.lru_cache(maxsize=1)
+def cpi_last_update():
+    """Время обновления локальных данных по CPI
+
+    Данные проверяются и при необходимости обновляются только при первом обращении, а время обновления кэшируется до
+    сброса кэша при обновлении локальных данных
+    """
+    return CPIDataManager().last_update
+
+
+def anchored_cpi(day: int):
+    """Месячная инфляция с датами, приходящимися на заданный день месяца
+
+    Статистика продлевается на год исходя из последней годовой инфляции. Результат кэшируется для каждого дня
+    месяца и времени обновления локальных данных, поэтому ряды для разных дат с одинаковым днем месяца получаются
+    срезом одного ряда, а после обновления данных ряд создается заново
+
+    Parameters
+    ----------
+    day
+        День месяца
+
+    Returns
+    -------
+    pd.Series
+        В строках значения инфляции для каждого месяца
+        Инфляция 1,2% за месяц соответствует 1.012
+    """
+    return _anchored_cpi(day, cpi_last_update())
+
+
+@functools.lru_cache(maxsize=MAX_DAYS_IN_MONTH)
+def _anchored_cpi(day: int, last_update):
+    """Месячная инфляция с датами, приходящимися на заданный день месяца, по данным на время last_update"""
+    df = cpi()
+    index = monthly_index(df.index[0], len(df) + MONTHS_IN_YEAR, day, df.index.name)
+    df = pd.Series(df.values, index=index[:len(df)], name=df.name).reindex(index)
+    return df.fillna(df.shift(MONTHS_IN_YEAR))
+
+
 def monthly_cpi(last_date: pd.Timestamp):
     """Месячная инфляция с учетом даты окончания
 
@@ -52,17 +98,11 @@ def monthly_cpi(last_date: pd.Timestamp):
         В строках значения инфляции для каждого месяца
         Инфляция 1,2% за месяц соответствует 1.012
     """
-    df = cpi()[:last_date + pd.DateOffset(day=31)]
-    offset = pd.DateOffset(months=1, day=last_date.day)
-    index = pd.DatetimeIndex(name=df.index.name,
-                             freq=offset,
-                             start=df.index[0] + pd.DateOffset(day=last_date.day),
-                             end=last_date)
-    old_len = len(df.index)
-    df.index = index[:old_len]
-    df = df.reindex(index)
-    df = df.fillna(df.shift(12))
-    return df
+    df = anchored_cpi(last_date.day)
+    if last_date <= df.index[-1]:
+        return df.iloc[:df.index.searchsorted(last_date, side='right')]
+    months = months_between(df.index[0], last_date)
+    return df.reindex(monthly_index(df.index[0], months, last_date.day, df.index.name))
 
 
 if __name__ == '__main__':
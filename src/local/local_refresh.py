@@ -0,0 +1,64 @@
+"""Одновременное обновление всех устаревших локальных данных"""
+from concurrent.futures import ThreadPoolExecutor
+
+from local import local_cpi
+from local.dividends import sqlite
+from local.moex import iss_market, iss_quotes, iss_quotes_t2, iss_total_return
+from local.moex.iss_securities_info import AliasesDataManager, SecuritiesInfoDataManager
+from utils import data_manager
+
+# Максимальное количество одновременно загружаемых серий данных
+MAX_WORKERS = 16
+
+# Менеджеры данных для категорий, поддерживающих одновременное обновление
+MANAGERS = {iss_quotes.QUOTES_CATEGORY: iss_quotes.QuotesDataManager,
+            iss_quotes_t2.QUOTES_CATEGORY: iss_quotes_t2.QuotesT2DataManager,
+            sqlite.DIVIDENDS_CATEGORY: sqlite.DividendsDataManager}
+
+# Категории, для загрузки которых нужна информация об акциях и тикерах аналогах
+NEED_SECURITIES_INFO = {iss_quotes.QUOTES_CATEGORY, iss_quotes_t2.QUOTES_CATEGORY}
+
+# Функции, кэширующие данные, которые могли устареть после обновления
+CACHED_FUNCTIONS = [iss_quotes.quotes, iss_quotes.prices, iss_quotes.volumes,
+                    iss_quotes_t2.quotes_t2, iss_quotes_t2.prices_t2, iss_quotes_t2.volumes_t2,
+                    sqlite.tickers_dividends, iss_market.market_history, iss_total_return.panel,
+                    local_cpi.cpi_last_update]
+
+
+def refresh(tickers: tuple, categories: tuple = tuple(MANAGERS)):
+    """Находит по каталогу данных устаревшие серии и одновременно обновляет их
+
+    Загрузка ведется в пуле из MAX_WORKERS потоков, а каждая серия сохраняется сразу после загрузки. Информация об
+    акциях и тикерах аналогах, общая для всех тикеров, обновляется заранее. После обновления сбрасываются кэши
+    функций, предоставляющих данные, поэтому последующие расчеты используют актуальные данные без обращений к серверам
+
+    Parameters
+    ----------
+    tickers
+        Кортеж тикеров
+    categories
+        Кортеж категорий данных - по умолчанию котировки, котировки в режиме T+2 и дивиденды
+
+    Returns
+    -------
+    dict
+        Ключи - категории данных, значения - списки обновленных тикеров
+    """
+    stale = {category: data_manager.stale_data(category, tickers) for category in categories}
+    if any(stale[category] for category in NEED_SECURITIES_INFO.intersection(categories)):
+        SecuritiesInfoDataManager()
+        AliasesDataManager()
+    tasks = [(category, ticker) for category in categories for ticker in stale[category]]
+    if tasks:
+        print(f'Обновление {len(tasks)} серий данных')
+        with ThreadPoolExecutor(max_workers=MAX_WORKERS) as executor:
+            futures = [executor.submit(MANAGERS[category], ticker) for category, ticker in tasks]
+            for future in futures:
+                future.result()
+        for func in CACHED_FUNCTIONS:
+            func.cache_clear()
+    return stale
+
+
+if __name__ == '__main__':
+    print(refresh(('AKRN', 'GMKN', 'MSTT')))
@@ -0,0 +1,69 @@
+"""Обновление котировок по итогам торгов всех акций за пропущенные даты"""
+import functools
+import threading
+
+import pandas as pd
+
+from web import moex
+from web.labels import CLOSE_PRICE, DATE, TICKER, VOLUME
+
+# Максимальное количество пропущенных дней, при котором выгоднее загружать итоги торгов всех акций по датам, а не
+# историю котировок по каждому тикеру
+MARKET_UPDATE_DAYS = 7
+# Итоги за текущую дату могут быть еще не опубликованы, поэтому хранятся в кэше ограниченное время
+TODAY_CACHE_PERIOD = '10min'
+# Максимальное количество итогов торгов в кэше - достаточно для всех дат одного обновления и итогов за текущую дату
+# с прошлой отметкой времени, а итоги с устаревшими отметками вытесняются
+MARKET_CACHE_SIZE = MARKET_UPDATE_DAYS * 2
+
+# Итоги торгов за дату загружаются один раз для всех одновременно обновляемых тикеров
+_LOCK = threading.Lock()
+
+
+@functools.lru_cache(maxsize=MARKET_CACHE_SIZE)
+def market_history(date: pd.Timestamp, board: str = None, stamp: pd.Timestamp = None):
+    """Итоги торгов всех акций за дату - загружаются один раз для всех тикеров
+
+    Для текущей даты stamp ограничивает время хранения итогов в кэше. Размер кэша ограничен MARKET_CACHE_SIZE, поэтому
+    итоги с устаревшими отметками времени не накапливаются в долго работающем процессе
+    """
+    return moex.market_history(date, board)
+
+
+def market_update(ticker: str, last_date: pd.Timestamp, board: str = None):
+    """Котировки тикера начиная с last_date включительно, собранные из итогов торгов всех акций по датам
+
+    Количество запросов к серверу зависит от количества пропущенных дней, а не от количества обновляемых тикеров
+
+    Parameters
+    ----------
+    ticker
+        Тикер
+    last_date
+        Последняя дата в существующих данных
+    board
+        Режим торгов, например, 'TQBR'. Если None, то для каждой даты выбирается режим с максимальным оборотом
+
+    Returns
+    -------
+    pandas.DataFrame or None
+        В строках даты торгов
+        В столбцах [CLOSE, VOLUME] цена закрытия и оборот в штуках
+        None, если пропущено больше MARKET_UPDATE_DAYS дней и выгоднее загрузить историю котировок тикера
+    """
+    now = pd.Timestamp.now()
+    dates = pd.date_range(last_date.normalize(), now.normalize(), freq='D')
+    if len(dates) > MARKET_UPDATE_DAYS:
+        return None
+    stamp = now.floor(TODAY_CACHE_PERIOD)
+    with _LOCK:
+        frames = [market_history(date, board, stamp if date == dates[-1] else None) for date in dates]
+    frames = [df[df[TICKER] == ticker] for df in frames]
+    frames = [df for df in frames if len(df)]
+    if not frames:
+        return pd.DataFrame({CLOSE_PRICE: pd.Series(dtype='float64'), VOLUME: pd.Series(dtype='int64')},
+                            index=pd.DatetimeIndex([], name=DATE))
+    df = pd.concat(frames, ignore_index=True)
+    # Для каждой даты выбирается режим торгов с максимальным оборотом
+    df = df.loc[df.groupby(DATE)[VOLUME].idxmax()]
+    return df.set_index(DATE)[[CLOSE_PRICE, VOLUME]]
@@ -3,7 +3,9 @@ import functools
 
 import pandas as pd
 
+from local.moex import iss_market
 from local.moex.iss_securities_info import aliases
+from utils.columnar_data_file import ColumnarDataFile
 from utils.data_manager import AbstractDataManager
 from web import moex
 from web.labels import DATE, VOLUME, CLOSE_PRICE
@@ -13,6 +15,7 @@ QUOTES_CATEGORY = 'quotes'
 
 class QuotesDataManager(AbstractDataManager):
     """Реализует особенность загрузки и хранения 'длинной' истории котировок"""
+    data_file_class = ColumnarDataFile
 
     def __init__(self, ticker):
         super().__init__(QUOTES_CATEGORY, ticker)
@@ -34,9 +37,16 @@ class QuotesDataManager(AbstractDataManager):
             yield moex.quotes(ticker)
 
     def download_update(self):
+        """Загружает историю котировок начиная с последней имеющейся даты
+
+        При небольшом количестве пропущенных дней используются итоги торгов всех акций по датам, общие для всех тикеров
+        """
         ticker = self.data_name
         last_date = self.value.index[-1]
-        return moex.quotes(ticker, last_date)
+        df = iss_market.market_update(ticker, last_date)
+        if df is None:
+            df = moex.quotes(ticker, last_date)
+        return df
 
 
 @functools.lru_cache(maxsize=None)
@@ -3,22 +3,28 @@ import functools
 
 import numpy as np
 import pandas as pd
-from pandas.tseries import offsets
 
 import local
-from local import moex, dividends
+from local import moex
+from local.moex import iss_market, iss_total_return
 from utils import data_manager, aggregation
+from utils.columnar_data_file import ColumnarDataFile
 from web import moex
 from web.labels import VOLUME, CLOSE_PRICE, DATE, TICKER
 
 QUOTES_CATEGORY = 'quotes_t2'
 
+# Режим торгов T+2
+BOARD = 'TQBR'
+
 # Количество дней между отсечкой и эксдивидендной датой
 T2 = 1
 
 
 class QuotesT2DataManager(data_manager.AbstractDataManager):
     """Реализует особенность загрузки и хранения истории котировок в режиме T+2"""
+    data_file_class = ColumnarDataFile
+
     def __init__(self, ticker):
         super().__init__(QUOTES_CATEGORY, ticker)
 
@@ -39,10 +45,16 @@ class QuotesT2DataManager(data_manager.AbstractDataManager):
             yield moex.quotes_t2(ticker)
 
     def download_update(self):
-        """Загружает историю котировок в режиме T+2 начиная с последней имеющейся даты"""
+        """Загружает историю котировок в режиме T+2 начиная с последней имеющейся даты
+
+        При небольшом количестве пропущенных дней используются итоги торгов всех акций по датам, общие для всех тикеров
+        """
         ticker = self.data_name
         last_date = self.value.index[-1]
-        return moex.quotes_t2(ticker, last_date)
+        df = iss_market.market_update(ticker, last_date, BOARD)
+        if df is None:
+            df = moex.quotes_t2(ticker, last_date)
+        return df
 
 
 @functools.lru_cache(maxsize=None)
@@ -103,24 +115,83 @@ def volumes_t2(tickers: tuple):
     return df
 
 
+class TradingCalendar:
+    """Календарь торговых дней для расчета эксдивидендных дат в режиме T+2 сразу для массива дат
+
+    Строится один раз по датам торгов, после чего даты закрытия реестра переводятся в эксдивидендные даты одним
+    поиском по отсортированному массиву без обработки каждой даты по отдельности
+
+    Parameters
+    ----------
+    dates
+        Даты торгов - например, объединение индексов котировок нескольких тикеров
+    """
+
+    def __init__(self, dates):
+        dates = pd.DatetimeIndex(dates)
+        if not (dates.is_monotonic_increasing and dates.is_unique):
+            dates = dates.unique().sort_values()
+        self._dates = dates
+        self._values = dates.values
+
+    @property
+    def dates(self):
+        """Отсортированные даты торгов"""
+        return self._dates
+
+    def t2_shift(self, dates):
+        """Рассчитывает эксдивидендные даты для режима T-2 на основании дат закрытия реестра
+
+        Для дат в пределах истории берется предыдущая или совпадающая дата торгов, сдвинутая на T2 торговых дней
+        назад. Если дата находится в будущем за пределом истории, то она сдвигается на T2 бизнес дней назад от
+        предыдущего или совпадающего бизнес дня - упрощенный подход, который может не корректно работать из-за
+        праздников. Для дат, до которых в истории недостаточно торговых дней, возвращается NaT
+
+        Parameters
+        ----------
+        dates
+            Даты закрытия реестра
+
+        Returns
+        -------
+        pd.DatetimeIndex
+            Эксдивидендные даты
+        """
+        dates = pd.DatetimeIndex(dates)
+        values = dates.values
+        result = np.full(len(values), np.datetime64('NaT'), dtype='datetime64[ns]')
+        if len(self._values):
+            in_history = values <= self._values[-1]
+        else:
+            in_history = np.zeros(len(values), dtype=bool)
+        positions = np.searchsorted(self._values, values, side='right') - 1 - T2
+        found = in_history & (positions >= 0)
+        result[found] = self._values[positions[found]]
+        future = ~in_history
+        days = values[future].astype('datetime64[D]')
+        time_of_day = values[future] - days.astype('datetime64[ns]')
+        result[future] = np.busday_offset(days, -T2, roll='backward').astype('datetime64[ns]') + time_of_day
+        return pd.DatetimeIndex(result, name=dates.name)
+
+
 def t2_shift(date, index):
     """Рассчитывает эксдивидендную дату для режима T-2 на основании даты закрытия реестра
 
     Если дата не содержится индексе цен, то необходимо найти предыдущую из индекса цен. После этого взять
     сдвинутую на 1 назад дату. Если дата находится в будущем за пределом истории котировок, то достаточно
     сдвинуть на 1 бизнес дня назад - упрощенный подход, который может не корректно работать из-за праздников
+
+    Для большого количества дат следует один раз создать TradingCalendar и использовать его метод t2_shift
     """
-    if date <= index[-1]:
-        position = index.get_loc(date, 'ffill')
-        return index[position - T2]
-    # Выходной гарантированно заменяем бизнес днем
-    next_b_day = date + offsets.BDay()
-    return next_b_day - (T2 + 1) * offsets.BDay()
+    return TradingCalendar(index).t2_shift([date])[0]
 
 
 def log_returns_with_div(tickers: tuple, last_date: pd.Timestamp):
     """Ряды логарифмов месячных доходностей с учетом дивидендов для набора тикеров до указанной даты
 
+    Цены закрытия и дивиденды по эксдивидендным датам берутся из локальной панели, которая дополняется только при
+    появлении новых данных, поэтому расчет для разных наборов тикеров и дат сводится к срезу и агрегации
+
     Parameters
     ----------
     tickers
@@ -134,12 +205,11 @@ def log_returns_with_div(tickers: tuple, last_date: pd.Timestamp):
         Столбцы - тикеры
         Строки - логарифмы месячных доходностей с учетом дивидендов
     """
-    prices = prices_t2(tickers).fillna(method='ffill', axis='index')
-    monthly_prices = prices.groupby(by=aggregation.monthly_aggregation_func(last_date)).last()
+    prices, div = iss_total_return.panel(tickers)
+    prices = prices.fillna(method='ffill', axis='index')
+    monthly_prices = prices.groupby(by=aggregation.monthly_labels(prices.index, last_date)).last()
     monthly_prices = monthly_prices.loc[:last_date]
-    div = dividends.dividends(tickers).loc[monthly_prices.index[0]:, :]
-    div.index = div.index.map(functools.partial(t2_shift, index=prices.index))
-    monthly_dividends = div.groupby(by=aggregation.monthly_aggregation_func(last_date)).sum()
+    monthly_dividends = div.groupby(by=aggregation.monthly_labels(div.index, last_date)).sum()
     # В некоторые месяцы не платятся дивиденды - без этого буду NaN при расчете доходностей
     monthly_dividends = monthly_dividends.reindex(index=monthly_prices.index, fill_value=0)
     returns = (monthly_prices + monthly_dividends) / monthly_prices.shift(1)
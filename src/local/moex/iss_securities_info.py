@@ -3,9 +3,10 @@ from functools import lru_cache
 
 from utils.data_manager import AbstractDataManager
 from web import moex
-from web.labels import COMPANY_NAME, REG_NUMBER, LOT_SIZE
+from web.labels import COMPANY_NAME, REG_NUMBER, LOT_SIZE, TICKER
 
 SECURITIES_INFO_MANE = 'securities_info'
+ALIASES_NAME = 'aliases'
 
 
 class SecuritiesInfoDataManager(AbstractDataManager):
@@ -27,6 +28,37 @@ class SecuritiesInfoDataManager(AbstractDataManager):
         super().download_update()
 
 
+class AliasesDataManager(AbstractDataManager):
+    """Менеджер локальной информации о регистрационных номерах всех акций, в том числе не торгуемых
+
+    Позволяет находить тикеры аналоги без поисковых запросов к серверу MOEX для каждого тикера. Сохраняется порядок
+    тикеров из ответа сервера
+    """
+    is_monotonic = False
+    update_from_scratch = True
+
+    def __init__(self):
+        super().__init__(None, ALIASES_NAME)
+
+    def download_all(self):
+        """Загружает перечень всех акций и оставляет только акции с регистрационным номером"""
+        df = moex.securities_listing()
+        df = df[df[REG_NUMBER].notnull()]
+        df = df.drop_duplicates(TICKER).set_index(TICKER)
+        return df[REG_NUMBER]
+
+    def download_update(self):
+        """Отсутствует возможность частичного обновления данных """
+        super().download_update()
+
+
+@lru_cache(maxsize=1)
+def _reg_number_tickers(last_update):
+    """Словарь с кортежами тикеров для каждого регистрационного номера по данным на время last_update"""
+    reg_numbers = AliasesDataManager().value
+    return {reg_number: tuple(tickers) for reg_number, tickers in reg_numbers.groupby(reg_numbers).groups.items()}
+
+
 def securities_info(tickers: tuple):
     """Возвращает данные по тикерам из списка и при необходимости обновляет локальные данные
 
@@ -68,6 +100,9 @@ def aliases(ticker: str):
     Функция нужна для выгрузки длинной истории котировок с учетом изменения тикера
     Не используется за пределами пакета local
 
+    Тикеры аналоги берутся из локального перечня всех акций, который обновляется по обычному расписанию. Если
+    регистрационный номер в нем отсутствует, то тикеры ищутся запросом к серверу MOEX
+
     Parameters
     ----------
     ticker
@@ -79,7 +114,11 @@ def aliases(ticker: str):
         Тикеры аналоги с таким же регистрационным номером
     """
     reg_number = securities_info((ticker,)).loc[ticker, REG_NUMBER]
-    return moex.reg_number_tickers(reg_number)
+    last_update = AliasesDataManager().last_update
+    tickers = _reg_number_tickers(last_update).get(reg_number)
+    if tickers is None:
+        tickers = moex.reg_number_tickers(reg_number)
+    return tickers
 
 
 if __name__ == '__main__':
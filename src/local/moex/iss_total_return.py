@@ -0,0 +1,258 @@
+"""Дневная панель цен закрытия и дивидендов в режиме T+2 для расчета доходностей с учетом дивидендов
+
+Панель хранится локально и содержит цены закрытия всех запрошенных ранее тикеров на объединенном календаре торговых
+дней и дивиденды по датам закрытия реестра. Для каждого тикера запоминаются контрольные суммы исходных котировок и
+дивидендов из каталога данных, поэтому при появлении новых данных к панели дописываются только новые строки, а
+месячные доходности для любого набора тикеров и дня месяца рассчитываются срезом и агрегацией панели. Эксдивидендные
+даты определяются по календарю торговых дней запрошенных тикеров, поэтому результат не зависит от других тикеров
+панели
+
+Панель может обновляться одновременно несколькими процессами, например, при параллельном поиске гиперпараметров,
+поэтому обновление и чтение панели делаются под блокировкой файла
+"""
+import contextlib
+import functools
+import threading
+
+import pandas as pd
+
+import settings
+from local.dividends import sqlite
+from local.moex import iss_quotes_t2
+from utils import catalog, data_manager
+from utils.columnar_data_file import ColumnarDataFile
+from utils.data_file import DataFile
+from web.labels import CLOSE_PRICE, DATE, TICKER
+
+# Названия данных панели - цены закрытия, дивиденды по датам закрытия реестра и контрольные суммы исходных данных
+PRICES_NAME = 'total_return_prices'
+DIVIDENDS_NAME = 'total_return_record_dividends'
+SOURCES_NAME = 'total_return_sources'
+
+# Ключи описания исходных данных тикера
+QUOTES_CHECKSUM = 'quotes'
+QUOTES_ROWS = 'rows'
+QUOTES_LAST = 'last'
+DIVIDENDS_CHECKSUM = 'dividends'
+
+# Панель общая для всех тикеров и не должна обновляться одновременно потоками и процессами
+_LOCK = threading.Lock()
+LOCK_NAME = f'total_return{catalog.LOCK_EXTENSION}'
+
+
+def _dividends(ticker: str):
+    """Дивиденды тикера по датам закрытия реестра"""
+    return sqlite.DividendsDataManager(ticker).value
+
+
+def _checksum(data_category, data_name: str):
+    """Контрольная сумма данных из каталога или None при их отсутствии"""
+    entry = catalog.entry(data_category, data_name)
+    if entry is None:
+        return None
+    return entry[catalog.CHECKSUM]
+
+
+class TotalReturnPanel:
+    """Локальная дневная панель цен закрытия и дивидендов в режиме T+2
+
+    Цены закрытия хранятся в колоночном формате, поэтому новые даты дописываются в отдельные сегменты без
+    перезаписи всей истории. Дивиденды занимают мало места и перезаписываются целиком при изменении дивидендов
+    обновляемых тикеров
+    """
+
+    def __init__(self):
+        self._open()
+
+    def _open(self):
+        """Открывает файлы панели - повторное открытие позволяет увидеть изменения, сделанные другими процессами"""
+        self._prices = ColumnarDataFile(None, PRICES_NAME)
+        self._dividends = DataFile(None, DIVIDENDS_NAME)
+        self._sources = DataFile(None, SOURCES_NAME)
+
+    @property
+    def tickers(self):
+        """Тикеры, для которых есть данные в панели"""
+        return list(self._sources.value or {})
+
+    @property
+    def prices(self):
+        """Цены закрытия - в строках даты торгов всех тикеров панели, в столбцах тикеры. Если торгов не было - NaN"""
+        return self._prices.value
+
+    @property
+    def dividends(self):
+        """Дивиденды - в строках даты закрытия реестра, в столбцах тикеры. Если выплат не было - 0"""
+        return self._dividends.value
+
+    def update(self, tickers: tuple = None):
+        """Обновляет панель для тикеров, исходные данные которых изменились
+
+        Если к котировкам тикера только дописаны новые строки, то в панель добавляются лишь они. При изменении истории
+        котировок колонка тикера перезаписывается. Новые тикеры добавляются в панель
+
+        Parameters
+        ----------
+        tickers
+            Кортеж тикеров. Если не указан, то обновляются все тикеры с локальными котировками в режиме T+2
+        """
+        with _lock():
+            self._update(tickers)
+
+    def select(self, tickers: tuple):
+        """Обновляет панель для тикеров и возвращает их цены закрытия и дивиденды по датам закрытия реестра
+
+        Returns
+        -------
+        tuple
+            Два pandas.DataFrame: цены закрытия по датам торгов хотя бы одного из тикеров без заполнения пропусков и
+            дивиденды по датам закрытия хотя бы одного из тикеров. В столбцах тикеры
+        """
+        columns = list(tickers)
+        with _lock():
+            self._update(tickers)
+            prices = self.prices[columns].dropna(how='all')
+            dividends = self.dividends[columns]
+        dividends = dividends[(dividends != 0).any(axis=1)]
+        return prices, dividends
+
+    def _update(self, tickers):
+        """Обновление панели под блокировкой
+
+        Контрольные суммы исходных данных читаются из каталога до их загрузки, а котировки и дивиденды загружаются
+        только для тикеров, у которых они изменились или требуют планового обновления. Если данные обновит другой
+        процесс после чтения контрольной суммы, то в панели сохранится старая сумма и тикер обновится при следующем
+        обращении
+        """
+        self._open()
+        if tickers is None:
+            tickers = tuple(catalog.catalog(iss_quotes_t2.QUOTES_CATEGORY).index)
+        tickers = tuple(dict.fromkeys(tickers))
+        stale_quotes = set(data_manager.stale_data(iss_quotes_t2.QUOTES_CATEGORY, tickers))
+        stale_dividends = set(data_manager.stale_data(sqlite.DIVIDENDS_CATEGORY, tickers))
+        sources = dict(self._sources.value or {})
+        prices = self.prices
+        stored_dividends = self.dividends
+        extension = dict()
+        replaced = dict()
+        dividends = dict()
+        for ticker in tickers:
+            quotes_checksum = _checksum(iss_quotes_t2.QUOTES_CATEGORY, ticker)
+            dividends_checksum = _checksum(sqlite.DIVIDENDS_CATEGORY, ticker)
+            source = sources.get(ticker)
+            new_source = dict(source or {})
+            if source is None or source[QUOTES_CHECKSUM] != quotes_checksum or ticker in stale_quotes:
+                close = iss_quotes_t2.quotes_t2(ticker)[CLOSE_PRICE]
+                if not _is_extension(prices, ticker, source, close):
+                    replaced[ticker] = close
+                elif close.index[-1] > source[QUOTES_LAST]:
+                    extension[ticker] = close[close.index > source[QUOTES_LAST]]
+                new_source.update({QUOTES_CHECKSUM: quotes_checksum,
+                                   QUOTES_ROWS: len(close),
+                                   QUOTES_LAST: close.index[-1] if len(close) else None})
+            if (source is None or source[DIVIDENDS_CHECKSUM] != dividends_checksum or ticker in stale_dividends
+                    or stored_dividends is None or ticker not in stored_dividends.columns):
+                div = _dividends(ticker).groupby(level=0).sum()
+                if not _is_same_dividends(stored_dividends, ticker, div):
+                    dividends[ticker] = div
+                new_source[DIVIDENDS_CHECKSUM] = dividends_checksum
+            sources[ticker] = new_source
+        if not (extension or replaced or dividends) and sources == (self._sources.value or {}):
+            return
+        if extension or replaced:
+            self._update_prices(prices, extension, replaced)
+        if dividends:
+            self._update_dividends(stored_dividends, dividends)
+        self._sources.value = sources
+
+    def _update_prices(self, prices, extension: dict, replaced: dict):
+        """Дописывает новые строки в конец панели или перезаписывает ее при изменении истории"""
+        new_rows = pd.concat(extension, axis=1) if extension else None
+        if not replaced and new_rows is not None and new_rows.index[0] > prices.index[-1]:
+            new_rows = new_rows.reindex(columns=prices.columns)
+            new_rows.index.name = DATE
+            self._prices.append(new_rows)
+            return
+        if prices is None:
+            prices = pd.DataFrame(index=pd.DatetimeIndex([], name=DATE))
+        else:
+            prices = prices.copy()
+        if new_rows is not None:
+            prices = prices.reindex(index=prices.index.union(new_rows.index))
+            prices.update(new_rows)
+        for ticker, close in replaced.items():
+            prices = prices.reindex(index=prices.index.union(close.index))
+            prices[ticker] = close
+        prices = prices.dropna(how='all').astype('float64')
+        prices.index.name = DATE
+        prices.columns.name = None
+        self._prices.value = prices
+
+    def _update_dividends(self, stored, dividends: dict):
+        """Заменяет в панели дивиденды тикеров, для которых они загружены заново"""
+        frames = [div.rename(ticker) for ticker, div in dividends.items()]
+        df = pd.concat(frames, axis=1)
+        if stored is not None:
+            stored = stored.drop(columns=list(dividends), errors='ignore')
+            df = pd.concat([stored, df], axis=1)
+        df = df.fillna(0).sort_index()
+        df.index.name = DATE
+        self._dividends.value = df
+
+
+@contextlib.contextmanager
+def _lock():
+    """Блокировка панели между потоками и процессами"""
+    with _LOCK, catalog.file_lock(settings.DATA_PATH / LOCK_NAME):
+        yield
+
+
+def _is_extension(prices, ticker: str, source, close: pd.Series):
+    """Проверяет, что к котировкам тикера в панели только дописаны новые строки"""
+    if prices is None or source is None or ticker not in prices.columns:
+        return False
+    rows = source[QUOTES_ROWS]
+    last = source[QUOTES_LAST]
+    if rows == 0 or len(close) < rows or close.index[rows - 1] != last:
+        return False
+    old_close = prices[ticker].dropna()
+    return len(old_close) == rows and old_close.index[-1] == last and old_close.iat[-1] == close.iat[rows - 1]
+
+
+def _is_same_dividends(stored, ticker: str, div: pd.Series):
+    """Проверяет, что дивиденды тикера в панели совпадают с загруженными"""
+    if stored is None or ticker not in stored.columns:
+        return False
+    old_div = stored[ticker]
+    old_div = old_div[old_div != 0]
+    return old_div.index.equals(div.index) and (old_div.values == div.values).all()
+
+
+@functools.lru_cache(maxsize=1)
+def panel(tickers: tuple):
+    """Цены закрытия и дивиденды по эксдивидендным датам для набора тикеров, при необходимости обновляя панель
+
+    Parameters
+    ----------
+    tickers
+        Кортеж тикеров
+
+    Эксдивидендные даты определяются по календарю торговых дней тикеров из набора
+
+    Returns
+    -------
+    tuple
+        Два pandas.DataFrame: цены закрытия по датам торгов хотя бы одного из тикеров без заполнения пропусков и
+        дивиденды по эксдивидендным датам. В столбцах тикеры
+    """
+    prices, dividends = TotalReturnPanel().select(tickers)
+    dividends = dividends.set_index(iss_quotes_t2.TradingCalendar(prices.index).t2_shift(dividends.index))
+    dividends = dividends[dividends.index.notnull()].groupby(level=0).sum()
+    dividends.index.name = DATE
+    prices.columns.name = TICKER
+    dividends.columns.name = TICKER
+    return prices, dividends
+
+
+if __name__ == '__main__':
+    print(panel(('GMKN', 'RTKMP', 'MTSS')))
@@ -0,0 +1,59 @@
+import pandas as pd
+import pytest
+
+from local.moex import iss_market
+from web.labels import CLOSE_PRICE, DATE, TICKER, VOLUME
+
+ROWS = [('AKRN', '2018-10-22', 4500.0, 10),
+        ('AKRN', '2018-10-22', 4510.0, 30),
+        ('GMKN', '2018-10-22', 11000.0, 5),
+        ('AKRN', '2018-10-23', 4520.0, 20),
+        ('GMKN', '2018-10-23', 11100.0, 7)]
+
+
+@pytest.fixture(autouse=True)
+def fake_market(monkeypatch):
+    calls = []
+
+    def fake_market_history(date, board=None):
+        calls.append((date, board))
+        df = pd.DataFrame(ROWS, columns=[TICKER, DATE, CLOSE_PRICE, VOLUME])
+        df[DATE] = pd.to_datetime(df[DATE])
+        return df[df[DATE] == date].reset_index(drop=True)
+
+    monkeypatch.setattr(iss_market.moex, 'market_history', fake_market_history)
+    monkeypatch.setattr(pd.Timestamp, 'now', classmethod(lambda cls: pd.Timestamp('2018-10-24 20:00')))
+    iss_market.market_history.cache_clear()
+    yield calls
+    iss_market.market_history.cache_clear()
+
+
+def test_market_update(fake_market):
+    df = iss_market.market_update('AKRN', pd.Timestamp('2018-10-22'))
+    assert list(df.columns) == [CLOSE_PRICE, VOLUME]
+    assert list(df.index) == [pd.Timestamp('2018-10-22'), pd.Timestamp('2018-10-23')]
+    assert list(df[CLOSE_PRICE]) == [4510.0, 4520.0]
+    df = iss_market.market_update('GMKN', pd.Timestamp('2018-10-22'))
+    assert list(df[VOLUME]) == [5, 7]
+    assert len(fake_market) == 3
+
+
+def test_no_quotes(fake_market):
+    df = iss_market.market_update('MSTT', pd.Timestamp('2018-10-22'))
+    assert df.empty
+    assert df.index.name == DATE
+    assert str(df[VOLUME].dtype) == 'int64'
+
+
+def test_too_many_days(fake_market):
+    assert iss_market.market_update('AKRN', pd.Timestamp('2018-09-22')) is None
+    assert len(fake_market) == 0
+
+
+def test_market_cache_bounded(fake_market, monkeypatch):
+    for minutes in range(0, 600, 10):
+        now = pd.Timestamp('2018-10-24 20:00') + pd.Timedelta(minutes=minutes)
+        monkeypatch.setattr(pd.Timestamp, 'now', classmethod(lambda cls: now))
+        iss_market.market_update('AKRN', pd.Timestamp('2018-10-22'))
+    assert iss_market.market_history.cache_info().currsize <= iss_market.MARKET_CACHE_SIZE
+    assert len([call for call in fake_market if call[0] == pd.Timestamp('2018-10-22')]) == 1
@@ -6,7 +6,7 @@ import pytest
 
 import settings
 from local import moex
-from local.moex.iss_quotes_t2 import QuotesT2DataManager, t2_shift, log_returns_with_div
+from local.moex.iss_quotes_t2 import QuotesT2DataManager, t2_shift, log_returns_with_div, TradingCalendar
 from web.labels import CLOSE_PRICE, VOLUME
 
 
@@ -91,6 +91,20 @@ def test_t2_shift():
     assert pd.Timestamp('2018-10-17') == t2_shift(pd.Timestamp('2018-10-18'), index)
 
 
+def test_trading_calendar():
+    index = pd.DatetimeIndex(['2018-10-01', '2018-10-02', '2018-10-04', '2018-10-05', '2018-10-08'], name='DATE')
+    calendar = TradingCalendar(index[::-1].append(index[:2]))
+    assert calendar.dates.equals(index)
+    dates = pd.DatetimeIndex(['2018-09-30', '2018-10-01', '2018-10-02', '2018-10-03', '2018-10-07', '2018-10-08',
+                              '2018-10-09', '2018-10-13', '2018-10-15'], name='CLOSE')
+    result = calendar.t2_shift(dates)
+    assert result.name == 'CLOSE'
+    assert result.equals(pd.DatetimeIndex(['NaT', 'NaT', '2018-10-01', '2018-10-01', '2018-10-04', '2018-10-05',
+                                           '2018-10-08', '2018-10-11', '2018-10-12']))
+    for date, shifted in zip(dates[2:], result[2:]):
+        assert t2_shift(date, index) == shifted
+
+
 def test_log_returns_with_div():
     data = log_returns_with_div(('GMKN', 'RTKMP', 'MTSS'), pd.Timestamp('2018-10-06'))
     assert isinstance(data, pd.DataFrame)
@@ -4,8 +4,9 @@ import pandas as pd
 import pytest
 
 import settings
+from local.moex import iss_securities_info
 from local.moex.iss_securities_info import aliases, securities_info, SecuritiesInfoDataManager, lot_size
-from web.labels import LOT_SIZE, COMPANY_NAME, REG_NUMBER
+from web.labels import LOT_SIZE, COMPANY_NAME, REG_NUMBER, TICKER
 
 
 @pytest.fixture(scope='module', autouse=True)
@@ -65,3 +66,20 @@ def test_lot_size():
     assert df['AKRN'] == 1
     assert df['SNGSP'] == 100
     assert df['KBTK'] == 10
+
+
+def test_aliases_from_local_listing(tmpdir, monkeypatch):
+    monkeypatch.setattr(settings, 'DATA_PATH', Path(tmpdir))
+    listing = pd.DataFrame({TICKER: ['UPRO', 'AKRN', 'EONR', 'OGK4', 'BOND'],
+                            REG_NUMBER: ['1-02-65104-D', '1-03-00207-A', '1-02-65104-D', '1-02-65104-D', None]})
+    info = pd.DataFrame({REG_NUMBER: ['1-02-65104-D', '1-05-08443-H']}, index=['UPRO', 'MOEX'])
+
+    def fake_search(reg_number):
+        return 'search', reg_number
+
+    monkeypatch.setattr(iss_securities_info.moex, 'securities_listing', lambda: listing)
+    monkeypatch.setattr(iss_securities_info.moex, 'reg_number_tickers', fake_search)
+    monkeypatch.setattr(iss_securities_info, 'securities_info', lambda tickers: info.loc[list(tickers)])
+    assert aliases('UPRO') == ('UPRO', 'EONR', 'OGK4')
+    assert aliases('MOEX') == ('search', '1-05-08443-H')
+    assert iss_securities_info.AliasesDataManager().value.index.is_unique
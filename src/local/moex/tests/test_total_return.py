@@ -0,0 +1,147 @@
+import pathlib
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import settings
+from local.dividends import sqlite
+from local.moex import iss_quotes_t2, iss_total_return
+from utils.columnar_data_file import ColumnarDataFile
+from utils.data_file import DataFile
+from web.labels import CLOSE_PRICE, DATE, VOLUME
+
+DATES = pd.DatetimeIndex(['2018-08-30', '2018-08-31', '2018-09-03', '2018-09-04', '2018-09-28', '2018-10-01',
+                          '2018-10-02'], name=DATE)
+
+
+def make_quotes(dates, start):
+    prices = np.arange(len(dates), dtype='float64') + start
+    return pd.DataFrame({CLOSE_PRICE: prices, VOLUME: np.arange(len(dates)) + 1}, index=dates,
+                        columns=[CLOSE_PRICE, VOLUME])
+
+
+class FakeDividendsManager:
+    loaded = []
+
+    def __init__(self, ticker):
+        self.loaded.append(ticker)
+        self.value = DataFile(sqlite.DIVIDENDS_CATEGORY, ticker).value
+
+
+@pytest.fixture(autouse=True)
+def fake_sources(tmpdir, monkeypatch):
+    data_dir = pathlib.Path(tmpdir.mkdir('test_total_return'))
+    monkeypatch.setattr(settings, 'DATA_PATH', data_dir)
+    monkeypatch.setattr(iss_quotes_t2, 'quotes_t2',
+                        lambda ticker: ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, ticker).value)
+    monkeypatch.setattr(sqlite, 'DividendsDataManager', FakeDividendsManager)
+    ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, 'AKRN').value = make_quotes(DATES[:5], 100)
+    ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, 'GMKN').value = make_quotes(DATES[1:5], 200)
+    DataFile(sqlite.DIVIDENDS_CATEGORY, 'AKRN').value = pd.Series(
+        [5.0], index=pd.DatetimeIndex(['2018-09-03'], name=DATE), name='AKRN')
+    DataFile(sqlite.DIVIDENDS_CATEGORY, 'GMKN').value = pd.Series(
+        [7.0, 3.0], index=pd.DatetimeIndex(['2018-09-01', '2018-10-05'], name=DATE), name='GMKN')
+    iss_total_return.panel.cache_clear()
+    FakeDividendsManager.loaded.clear()
+    yield
+    iss_total_return.panel.cache_clear()
+
+
+def test_panel():
+    prices, dividends = iss_total_return.panel(('GMKN', 'AKRN'))
+    assert list(prices.columns) == ['GMKN', 'AKRN']
+    assert prices.index.equals(DATES[:5])
+    assert np.isnan(prices.loc['2018-08-30', 'GMKN'])
+    assert prices.loc['2018-09-28', 'AKRN'] == 104.0
+    assert list(dividends.columns) == ['GMKN', 'AKRN']
+    assert dividends.loc['2018-08-31', 'AKRN'] == 5.0
+    assert dividends.loc['2018-08-30', 'GMKN'] == 7.0
+    assert dividends.loc['2018-10-04', 'GMKN'] == 3.0
+    assert dividends.loc['2018-10-04', 'AKRN'] == 0.0
+
+    prices, _ = iss_total_return.panel(('GMKN',))
+    assert prices.index.equals(DATES[1:5])
+
+
+def test_panel_independent_of_other_tickers():
+    _, expected = iss_total_return.panel(('GMKN',))
+    assert expected.loc['2018-10-04', 'GMKN'] == 3.0
+    assert len(expected) == 1
+    iss_total_return.panel.cache_clear()
+    iss_total_return.panel(('GMKN', 'AKRN'))
+    FakeDividendsManager.loaded.clear()
+    _, dividends = iss_total_return.panel(('GMKN',))
+    assert dividends.equals(expected)
+    assert FakeDividendsManager.loaded == []
+
+
+def test_incremental_update():
+    iss_total_return.TotalReturnPanel().update(('AKRN', 'GMKN'))
+    ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, 'AKRN').append(make_quotes(DATES[5:], 105))
+    ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, 'GMKN').append(make_quotes(DATES[5:6], 204))
+    data = iss_total_return.TotalReturnPanel()
+    data.update(('AKRN', 'GMKN'))
+    assert ColumnarDataFile(None, iss_total_return.PRICES_NAME).deltas == 1
+    assert data.prices.index.equals(DATES)
+    assert list(data.prices['AKRN']) == [100.0, 101.0, 102.0, 103.0, 104.0, 105.0, 106.0]
+    assert data.prices.loc['2018-10-01', 'GMKN'] == 204.0
+    assert np.isnan(data.prices.loc['2018-10-02', 'GMKN'])
+    assert data.dividends.loc['2018-10-05', 'GMKN'] == 3.0
+
+    ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, 'GMKN').value = make_quotes(DATES[2:], 300)
+    data = iss_total_return.TotalReturnPanel()
+    data.update()
+    assert data.tickers == ['AKRN', 'GMKN']
+    assert ColumnarDataFile(None, iss_total_return.PRICES_NAME).deltas == 0
+    assert np.isnan(data.prices.loc['2018-08-31', 'GMKN'])
+    assert data.prices.loc['2018-10-02', 'GMKN'] == 304.0
+    assert list(data.prices['AKRN'].dropna()) == [100.0, 101.0, 102.0, 103.0, 104.0, 105.0, 106.0]
+
+
+def test_update_loads_changed_tickers(monkeypatch):
+    iss_total_return.TotalReturnPanel().update(('AKRN', 'GMKN'))
+    loaded = []
+
+    def quotes_t2(ticker):
+        loaded.append(ticker)
+        return ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, ticker).value
+
+    monkeypatch.setattr(iss_quotes_t2, 'quotes_t2', quotes_t2)
+    FakeDividendsManager.loaded.clear()
+    iss_total_return.TotalReturnPanel().update()
+    assert loaded == []
+    assert FakeDividendsManager.loaded == []
+    ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, 'AKRN').append(make_quotes(DATES[5:], 105))
+    data = iss_total_return.TotalReturnPanel()
+    data.update()
+    assert loaded == ['AKRN']
+    assert FakeDividendsManager.loaded == []
+    assert data.prices.loc['2018-10-02', 'AKRN'] == 106.0
+
+
+def test_update_during_load(monkeypatch):
+    iss_total_return.TotalReturnPanel().update(('AKRN',))
+
+    def quotes_t2(ticker):
+        quotes = ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, ticker).value
+        ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, ticker).append(make_quotes(DATES[6:], 106))
+        return quotes
+
+    monkeypatch.setattr(iss_quotes_t2, 'quotes_t2', quotes_t2)
+    ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, 'AKRN').append(make_quotes(DATES[5:6], 105))
+    data = iss_total_return.TotalReturnPanel()
+    data.update(('AKRN',))
+    assert data.prices.index[-1] == DATES[5]
+    monkeypatch.setattr(iss_quotes_t2, 'quotes_t2',
+                        lambda ticker: ColumnarDataFile(iss_quotes_t2.QUOTES_CATEGORY, ticker).value)
+    data.update(('AKRN',))
+    assert data.prices.loc['2018-10-02', 'AKRN'] == 106.0
+
+
+def test_log_returns_with_div():
+    returns = iss_quotes_t2.log_returns_with_div(('AKRN', 'GMKN'), pd.Timestamp('2018-10-01'))
+    assert list(returns.index) == [pd.Timestamp('2018-09-01'), pd.Timestamp('2018-10-01')]
+    assert np.isnan(returns.iloc[0, 0])
+    assert returns.loc['2018-10-01', 'AKRN'] == pytest.approx(np.log(104 / 101))
+    assert returns.loc['2018-10-01', 'GMKN'] == pytest.approx(np.log(203 / 200))
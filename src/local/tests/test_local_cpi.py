@@ -1,10 +1,18 @@
+import numpy as np
 import pandas as pd
 import pytest
 
 import web
 from local import local_cpi
 from local.local_cpi import CPIDataManager, monthly_cpi
-from web.labels import CPI
+from web.labels import CPI, DATE
+
+
+@pytest.fixture(autouse=True)
+def clear_last_update():
+    local_cpi.cpi_last_update.cache_clear()
+    yield
+    local_cpi.cpi_last_update.cache_clear()
 
 
 def test_cpi():
@@ -33,6 +41,7 @@ def test_download_update():
 def test_cpi_to_date(monkeypatch):
     fake_df = local_cpi.cpi()[:'2018-06-30']
     monkeypatch.setattr(local_cpi, 'cpi', lambda: fake_df)
+    monkeypatch.setattr(local_cpi, 'CPIDataManager', FakeManager)
     df = monthly_cpi(pd.Timestamp('2018-08-06'))
     assert len(df) == 332
     assert df.index[0] == pd.Timestamp('1991-01-06')
@@ -40,3 +49,70 @@ def test_cpi_to_date(monkeypatch):
     assert df.iat[-3] == pytest.approx(1.0049)
     assert df.iat[-2] == pytest.approx(1.0007)
     assert df.iat[-1] == pytest.approx(0.9946)
+
+
+class FakeManager:
+    last_update = object()
+
+    def __init__(self):
+        pass
+
+
+def old_monthly_cpi(df, last_date):
+    df = df[:last_date + pd.DateOffset(day=31)]
+    index = pd.date_range(name=df.index.name,
+                          freq=pd.DateOffset(months=1, day=last_date.day),
+                          start=df.index[0] + pd.DateOffset(day=last_date.day),
+                          end=last_date)
+    old_len = len(df.index)
+    df.index = index[:old_len]
+    df = df.reindex(index)
+    return df.fillna(df.shift(12))
+
+
+@pytest.mark.parametrize('last_date', ['2017-02-28', '2017-05-31', '2018-06-15', '2018-07-30', '2019-02-28',
+                                       '2019-06-30', '2019-09-09'])
+def test_anchored_cpi(monkeypatch, last_date):
+    fake_df = pd.Series(1 + np.arange(30) / 1000, name=CPI,
+                        index=pd.date_range('2016-01-31', periods=30, freq='M', name=DATE))
+    monkeypatch.setattr(local_cpi, 'cpi', lambda: fake_df)
+    monkeypatch.setattr(local_cpi, 'CPIDataManager', FakeManager)
+    monkeypatch.setattr(FakeManager, 'last_update', object())
+    last_date = pd.Timestamp(last_date)
+    df = monthly_cpi(last_date)
+    expected = old_monthly_cpi(fake_df, last_date)
+    assert df.index.equals(expected.index)
+    assert df.index.name == DATE
+    assert df.name == CPI
+    assert np.allclose(df.values, expected.values, equal_nan=True)
+
+
+def test_anchored_cpi_update(monkeypatch):
+    fake_df = pd.Series(1 + np.arange(30) / 1000, name=CPI,
+                        index=pd.date_range('2016-01-31', periods=30, freq='M', name=DATE))
+    monkeypatch.setattr(local_cpi, 'cpi', lambda: fake_df)
+    monkeypatch.setattr(local_cpi, 'CPIDataManager', FakeManager)
+    monkeypatch.setattr(FakeManager, 'last_update', object())
+    df = local_cpi.anchored_cpi(15)
+    assert local_cpi.anchored_cpi(15) is df
+    monkeypatch.setattr(local_cpi, 'cpi', lambda: fake_df * 2)
+    monkeypatch.setattr(FakeManager, 'last_update', object())
+    assert local_cpi.anchored_cpi(15) is df
+    local_cpi.cpi_last_update.cache_clear()
+    assert np.allclose(local_cpi.anchored_cpi(15).values, df.values * 2)
+
+
+def test_cpi_last_update_once(monkeypatch):
+    created = []
+
+    class CountingManager(FakeManager):
+        def __init__(self):
+            created.append(self)
+
+    fake_df = pd.Series(1 + np.arange(30) / 1000, name=CPI,
+                        index=pd.date_range('2016-01-31', periods=30, freq='M', name=DATE))
+    monkeypatch.setattr(local_cpi, 'cpi', lambda: fake_df)
+    monkeypatch.setattr(local_cpi, 'CPIDataManager', CountingManager)
+    for date in pd.date_range('2018-01-15', periods=3, freq='D'):
+        local_cpi.anchored_cpi(date.day)
+    assert len(created) == 1
@@ -0,0 +1,41 @@
+import threading
+from pathlib import Path
+
+import pandas as pd
+import pytest
+
+import settings
+from local import local_refresh
+from utils import data_manager
+
+
+@pytest.fixture(autouse=True)
+def make_temp_dir(tmpdir, monkeypatch):
+    monkeypatch.setattr(settings, 'DATA_PATH', Path(tmpdir))
+
+
+class FakeDataManager(data_manager.AbstractDataManager):
+    threads = set()
+
+    def __init__(self, ticker):
+        super().__init__('fake', ticker)
+
+    def download_all(self):
+        self.threads.add(threading.get_ident())
+        return pd.Series([1.0, 2.0], index=pd.DatetimeIndex(['2018-01-03', '2018-01-04']), name=self.data_name)
+
+    def download_update(self):
+        super().download_update()
+
+
+def test_refresh(monkeypatch):
+    monkeypatch.setitem(local_refresh.MANAGERS, 'fake', FakeDataManager)
+    tickers = tuple(f'TICKER{i}' for i in range(20))
+    FakeDataManager('TICKER0')
+    FakeDataManager.threads.clear()
+    result = local_refresh.refresh(tickers, ('fake',))
+    assert result == {'fake': list(tickers[1:])}
+    assert threading.get_ident() not in FakeDataManager.threads
+    assert data_manager.stale_data('fake', tickers) == []
+    assert FakeDataManager('TICKER7').value.equals(FakeDataManager('TICKER0').value)
+    assert local_refresh.refresh(tickers, ('fake',)) == {'fake': []}
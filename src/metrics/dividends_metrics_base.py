@@ -8,7 +8,7 @@ from metrics.dividends_metrics import AbstractDividendsMetrics
 from metrics.portfolio import Portfolio
 from settings import AFTER_TAX
 # Период, который является источником для статистики
-from utils.aggregation import yearly_aggregation_func
+from utils.aggregation import yearly_labels
 
 DIVIDENDS_YEARS = 5
 DIVIDENDS_MONTHS = DIVIDENDS_YEARS * 12
@@ -51,7 +51,7 @@ class BaseDividendsMetrics(AbstractDividendsMetrics):
         1 - ставка налога = AFTER_TAX указывается в модуле настроек
         """
         real_after_tax = self.real_after_tax_monthly
-        return real_after_tax.groupby(by=yearly_aggregation_func(self._portfolio.date)).sum()
+        return real_after_tax.groupby(by=yearly_labels(real_after_tax.index, self._portfolio.date)).sum()
 
     @property
     @lru_cache(maxsize=1)
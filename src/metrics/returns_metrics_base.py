@@ -9,6 +9,7 @@ from local import moex
 from metrics.portfolio import Portfolio, PORTFOLIO
 # Интервал поиска константы сглаживания
 from metrics.returns_metrics import AbstractReturnsMetrics
+from utils.aggregation import monthly_labels
 
 BOUNDS = (0.0, 1.0)
 # Интервал обычного расположения константы сглаживания - при необходимости можно расширить
@@ -33,18 +34,14 @@ class BaseReturnsMetrics(AbstractReturnsMetrics):
         """
         prices = moex.prices(self._portfolio.positions[:-2])
         prices = prices[:self._portfolio.date].fillna(method='ffill')
-        return prices.groupby(by=self._monthly_aggregation).last()
+        return prices.groupby(by=self._monthly_aggregation(prices.index)).last()
 
-    def _monthly_aggregation(self, x: pd.Timestamp):
+    def _monthly_aggregation(self, index: pd.DatetimeIndex):
         """Приводит все даты к отчетному дню портфеля в месяце - используется для месячной агригации
 
         Если день больше отчетного, то день относится к следующему месяцу
         """
-        portfolio_day = self._portfolio.date.day
-        if x.day <= portfolio_day:
-            return x + pd.DateOffset(day=portfolio_day)
-        else:
-            return x + pd.DateOffset(months=1, day=portfolio_day)
+        return monthly_labels(index, self._portfolio.date)
 
     @property
     @lru_cache(maxsize=1)
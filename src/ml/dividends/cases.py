@@ -28,13 +28,94 @@ class DividendsCasesIterator:
         self._prices = moex.prices(tickers).fillna(method='ffill', axis='index')
 
     def __iter__(self):
+        for date in self._dates():
+            yield self.cases(date)
+
+    def _dates(self):
+        """Даты, для которых формируются кейсы для обучения"""
         date = pd.Timestamp(STATISTICS_START) + pd.DateOffset(years=self._years + 1)
         end_of_period_offset = self._freq.aggregation_func(self._last_date)
         date = end_of_period_offset(date)
         while date <= self._last_date:
-            yield self.cases(date)
+            yield date
             date = end_of_period_offset(date + pd.DateOffset(days=1))
 
+    def learn_cases(self):
+        """Все кейсы для обучения в одном DataFrame - совпадает с объединением кейсов, которые выдает итератор
+
+        Месячные дивиденды, инфляция и цены рассчитываются один раз для каждого встречающегося в датах кейсов дня
+        месяца, а доходности для всех дат получаются операциями над скользящими окнами этих рядов. Строки кейсов всех
+        дат собираются в общие массивы и упорядочиваются по датам, поэтому DataFrame создается один раз
+        """
+        dates = pd.DatetimeIndex(list(self._dates()))
+        if dates.empty:
+            return pd.concat(list(self))
+        parts = [self._day_cases(dates, np.flatnonzero(dates.day == day)) for day in np.unique(dates.day)]
+        positions, index, tickers, features, labels = (np.concatenate(arrays) for arrays in zip(*parts))
+        order = np.argsort(positions, kind='stable')
+        cases = pd.DataFrame(features[order], columns=self._lags_names(), index=index[order])
+        cases.insert(0, TICKER, tickers[order])
+        cases['y'] = labels[order]
+        return cases
+
+    def _day_cases(self, dates: pd.DatetimeIndex, positions: np.ndarray):
+        """Строки кейсов для обучения для дат с одинаковым днем месяца
+
+        Кейсы для дат, у которых не хватает истории для полного окна, рассчитываются по отдельности. Для остальных дат
+        доходности рассчитываются одним массивом, из которого маской удаляются тикеры с пропусками
+
+        Returns
+        -------
+        tuple
+            Массивы номеров дат кейсов, индексов строк в кейсах даты, тикеров, признаков и меток
+        """
+        months = MONTH_IN_YEAR * (self._years + 1)
+        base_index = - MONTH_IN_YEAR - 1
+        monthly = dividends.monthly_dividends(self._tickers, dates[positions[-1]])
+        ends = monthly.index.get_indexer(dates[positions])
+        full = ends >= months - 1
+        parts = [_frame_rows(position, self.cases(dates[position])) for position in positions[~full]]
+        if full.any():
+            parts.append(self._full_window_rows(monthly, ends[full], positions[full], months, base_index))
+        return tuple(np.concatenate(arrays) for arrays in zip(*parts))
+
+    def _full_window_rows(self, monthly: pd.DataFrame, ends: np.ndarray, positions: np.ndarray, months: int,
+                          base_index: int):
+        """Строки кейсов для дат с полным окном месячных данных, заканчивающимся на строках ends"""
+        rows = ends[:, np.newaxis] + np.arange(1 - months, 1)
+        cpi = local.monthly_cpi(monthly.index[ends[-1]]).reindex(monthly.index).values[rows]
+        cpi_missing = np.isnan(cpi)
+        cum_cpi = np.cumprod(np.where(cpi_missing, 1, cpi), axis=1)
+        cum_cpi[cpi_missing] = np.nan
+        cpi_index = cum_cpi[:, [base_index]] / cum_cpi
+        after_tax_dividends = monthly.values[rows] * AFTER_TAX
+        real_after_tax_dividends = after_tax_dividends * cpi_index[:, :, np.newaxis]
+        # Окна заканчиваются датами кейсов, поэтому периоды агрегации - последовательные блоки месяцев в окне
+        periods = self._freq.times_in_year * (self._years + 1)
+        real_after_tax_dividends = pd.DataFrame(real_after_tax_dividends.reshape(len(ends) * months, -1),
+                                                columns=monthly.columns)
+        agg_dividends = real_after_tax_dividends.groupby(by=np.arange(len(ends) * months) // (months // periods)).sum()
+        tickers = monthly.columns.join(self._prices.columns, how='outer')
+        agg_dividends = agg_dividends.reindex(columns=tickers)
+        agg_dividends = agg_dividends.values.reshape(len(ends), periods, -1)
+        base_dates = monthly.index[ends + base_index + 1]
+        price = self._prices.reindex(index=base_dates, columns=tickers, method='ffill').values
+        # Доходности в разрезе дата - тикер - период, в строках маски даты, а в столбцах тикеры
+        yields = (agg_dividends / price[:, np.newaxis, :]).transpose(0, 2, 1)
+        mask = ~np.isnan(yields).any(axis=2)
+        forecast = self._freq.times_in_year
+        features = yields[:, :, :-forecast][mask]
+        # Доходность прогнозного года суммируется последовательно по периодам
+        predicted = yields[:, :, -forecast:][mask]
+        labels = predicted[:, 0].copy()
+        for period in range(1, forecast):
+            labels += predicted[:, period]
+        return (np.repeat(positions, mask.sum(axis=1)),
+                (np.cumsum(mask, axis=1) - 1)[mask],
+                np.tile(np.asarray(tickers, dtype=object), len(ends))[mask.ravel()],
+                features,
+                labels)
+
     def _real_dividends_yields(self, date: pd.Timestamp, labels: bool = True):
         """Возвращает посленалоговые дивидендные доходности в постоянных ценах для заданной даты
 
@@ -61,7 +142,11 @@ class DividendsCasesIterator:
         base_date = cpi_index.index[base_index]
         price = self._prices.reindex(index=[base_date], method='ffill').iloc[0]
         yields = agg_dividends.div(price, axis='columns')
-        yields = yields.T
+        return self._yields_table(yields.T)
+
+    @staticmethod
+    def _yields_table(yields: pd.DataFrame):
+        """Доходности тикеров без пропущенных значений - тикеры переносятся из индекса в первый столбец"""
         yields.dropna(inplace=True)
         yields.reset_index(TICKER, inplace=True)
         return yields
@@ -78,7 +163,8 @@ class DividendsCasesIterator:
         pre_tax_dividends = dividends.monthly_dividends(self._tickers, date).iloc[-months:, :]
         after_tax_dividends = pre_tax_dividends * AFTER_TAX
         real_after_tax_dividends = after_tax_dividends.mul(cpi_index, axis='index')
-        agg_dividends = real_after_tax_dividends.groupby(by=self._freq.aggregation_func(date)).sum()
+        agg_dividends = real_after_tax_dividends.groupby(
+            by=self._freq.labels(real_after_tax_dividends.index, date)).sum()
         return agg_dividends
 
     def cases(self, date: pd.Timestamp, predicted: bool = True):
@@ -88,19 +174,36 @@ class DividendsCasesIterator:
         последнем столбце годовая доходность в прогнозном году
         """
         cases = self._real_dividends_yields(date, predicted)
+        return self._format_cases(cases, predicted)
+
+    def _format_cases(self, cases: pd.DataFrame, predicted: bool):
+        """Заменяет доходности в прогнозном году их суммой и присваивает столбцам наименования"""
         if predicted:
             y = cases.iloc[:, -self._freq.times_in_year:].sum(axis='columns')
             cases.drop(columns=cases.columns[-self._freq.times_in_year:], inplace=True)
             cases['y'] = y
         else:
             cases['y'] = np.nan
-        cases.columns = [TICKER] + [f'lag - {i}' for i in range(self._years * self._freq.times_in_year, 0, -1)] + ['y']
+        cases.columns = [TICKER] + self._lags_names() + ['y']
         return cases
 
+    def _lags_names(self):
+        """Наименования столбцов с доходностями за прошлые периоды"""
+        return [f'lag - {i}' for i in range(self._years * self._freq.times_in_year, 0, -1)]
+
+
+def _frame_rows(position: int, cases: pd.DataFrame):
+    """Строки кейсов даты с номером position в виде массивов, как в DividendsCasesIterator._day_cases"""
+    return (np.full(len(cases), position),
+            np.asarray(cases.index),
+            cases[TICKER].values.astype(object),
+            cases.iloc[:, 1:-1].values,
+            cases['y'].values)
+
 
 def learn_pool_params(tickers, last_date, freq, lags):
     """Параметры для создания catboost.Pool для обучения"""
-    learn_cases = pd.concat(DividendsCasesIterator(tickers, last_date, freq, lags))
+    learn_cases = DividendsCasesIterator(tickers, last_date, freq, lags).learn_cases()
     pool_params = dict(data=learn_cases.iloc[:, :-1],
                        label=learn_cases.iloc[:, -1],
                        cat_features=[0],
@@ -1,12 +1,17 @@
 import catboost
 import collections
+import types
 import numpy as np
 import pandas as pd
+import pytest
 
+from local import local_cpi, moex
+from local.dividends import sqlite
 from metrics.dividends_metrics_base import BaseDividendsMetrics
 from metrics.portfolio import Portfolio
 from ml.dividends.cases import DividendsCasesIterator, learn_pool, predict_pool
 from utils.aggregation import Freq
+from web.labels import CPI, DATE, TICKER
 
 
 def test_iterable():
@@ -149,3 +154,32 @@ def test_monthly_quarterly_yearly():
             q_slice = slice(1 + year * 4, 1 + (year + 1) * 4)
             assert np.allclose(np.array(quarterly_data[i].get_features())[-3:, q_slice].sum(axis=1, keepdims=True),
                                np.array(yearly_data[i].get_features())[-3:, y_slice])
+
+
+@pytest.mark.parametrize('last_date, freq', [(pd.Timestamp('2018-05-18'), Freq.monthly),
+                                             (pd.Timestamp('2018-08-31'), Freq.quarterly),
+                                             (pd.Timestamp('2018-07-31'), Freq.yearly)])
+def test_learn_cases_vs_iterator(monkeypatch, last_date, freq):
+    tickers = ('AKRN', 'GMKN', 'MSTT')
+    prices_index = pd.bdate_range('2011-01-10', last_date)
+    prices = pd.DataFrame(np.random.RandomState(0).uniform(50, 150, (len(prices_index), 3)),
+                          index=prices_index, columns=pd.Index(tickers, name=TICKER))
+    prices.iloc[:300, 2] = np.nan
+    dividends_index = pd.date_range('2010-01-15', last_date, freq='45D')
+    dividends = pd.DataFrame(np.random.RandomState(1).uniform(0, 10, (len(dividends_index), 2)),
+                             index=dividends_index, columns=pd.Index(tickers[:2], name=TICKER))
+    cpi_index = pd.date_range('1991-01-31', '2018-06-30', freq='M', name=DATE)
+    cpi = pd.Series(np.random.RandomState(2).uniform(0.99, 1.02, len(cpi_index)), index=cpi_index, name=CPI)
+    monkeypatch.setattr(moex, 'prices', lambda _: prices)
+    monkeypatch.setattr(sqlite, 'tickers_dividends', lambda _: dividends)
+    monkeypatch.setattr(local_cpi, 'cpi', lambda: cpi)
+    last_update = object()
+    monkeypatch.setattr(local_cpi, 'CPIDataManager', lambda: types.SimpleNamespace(last_update=last_update))
+    local_cpi.cpi_last_update.cache_clear()
+    iterator = DividendsCasesIterator(tickers, last_date, freq, 3)
+    expected = pd.concat(iterator)
+    df = iterator.learn_cases()
+    local_cpi.cpi_last_update.cache_clear()
+    # Доходность прогнозного года суммируется в другом порядке, поэтому возможны расхождения в последних знаках
+    pd.testing.assert_frame_equal(df, expected, check_exact=False, rtol=1e-12)
+    assert list(df.columns) == list(expected.columns)
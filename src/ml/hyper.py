@@ -1,14 +1,18 @@
 """Кросс-валидация и оптимизация гиперпараметров ML-модели"""
 import functools
+import os
+from concurrent.futures import ProcessPoolExecutor
 
 import catboost
 import hyperopt
 import matplotlib.pyplot as plt
 import numpy as np
 import pandas as pd
-from hyperopt import hp
+from hyperopt import hp, pyll
 from sklearn import model_selection
 
+from ml import trial_store
+
 # Размер графика с кривой обучения
 FIG_SIZE = 8
 
@@ -24,6 +28,9 @@ TECH_PARAMS = dict(iterations=MAX_ITERATIONS,
 
 # Настройки hyperopt
 MAX_SEARCHES = 100
+# Количество процессов для одновременной кросс-валидации при поиске гиперпараметров - по умолчанию поиск
+# последовательный
+WORKERS = 1
 
 # Диапазоны поиска ключевых гиперпараметров относительно базового значения параметров
 # Рекомендации Яндекс - https://tech.yandex.com/catboost/doc/dg/concepts/parameter-tuning-docpage/
@@ -221,7 +228,8 @@ def learning_curve(params: dict, positions: tuple, date: pd.Timestamp, data_pool
     return train_sizes, train_scores_mean, test_scores_mean
 
 
-def optimize_hyper(base_params: dict, positions: tuple, date: pd.Timestamp, data_pool_func, data_space: dict):
+def optimize_hyper(base_params: dict, positions: tuple, date: pd.Timestamp, data_pool_func, data_space: dict,
+                   workers: int = WORKERS, store=None, local_workers: int = None):
     """Ищет и  возвращает лучший набор гиперпараметров без количества итераций в окрестности базового набора параметров
 
     Parameters
@@ -236,6 +244,16 @@ def optimize_hyper(base_params: dict, positions: tuple, date: pd.Timestamp, data
         Функция получения данных для тренировки модели
     data_space
         Функция для формирования пространства поиска вариантов данных для модели
+    workers
+        Количество процессов для одновременной кросс-валидации. Если больше 1, то варианты параметров предлагаются
+        пакетами по количеству процессов, а функция получения данных должна поддерживать pickle
+    store
+        Путь к базе данных хранилища вариантов параметров. Если указан, то варианты пакетами по workers передаются
+        через хранилище рабочим процессам, в том числе запущенным на других компьютерах командой
+        python -m ml.trial_store <путь к базе данных>, а сохраненный в хранилище поиск с теми же тикерами, датой,
+        базовыми параметрами, пространством поиска, MAX_SEARCHES и SEED продолжается
+    local_workers
+        Количество рабочих процессов, запускаемых на этом компьютере при использовании хранилища - по умолчанию workers
     Returns
     -------
     dict
@@ -245,12 +263,72 @@ def optimize_hyper(base_params: dict, positions: tuple, date: pd.Timestamp, data
     objective = functools.partial(cv_model, positions=positions, date=date, data_pool_func=data_pool_func)
     param_space = dict(data=data_space,
                        model=make_model_space(base_params))
-    best = hyperopt.fmin(objective,
-                         space=param_space,
-                         algo=hyperopt.tpe.suggest,
-                         max_evals=MAX_SEARCHES,
-                         rstate=np.random.RandomState(SEED))
+    if store is not None:
+        # Текстовое представление пространства поиска не зависит от адресов объектов hyperopt в памяти
+        search = trial_store.search_name(positions, date, base_params, str(pyll.as_apply(param_space)), MAX_SEARCHES,
+                                         SEED)
+        best = _stored_fmin(objective, param_space, workers, store, search, local_workers)
+    elif workers > 1:
+        best = _parallel_fmin(objective, param_space, workers)
+    else:
+        best = hyperopt.fmin(objective,
+                             space=param_space,
+                             algo=hyperopt.tpe.suggest,
+                             max_evals=MAX_SEARCHES,
+                             rstate=np.random.RandomState(SEED))
     # Преобразование из внутреннего представление в исходное пространство
     best_params = hyperopt.space_eval(param_space, best)
     check_model_bounds(best_params, base_params)
     return best_params
+
+
+def _cv_model_worker(params: dict, positions: tuple, date: pd.Timestamp, data_pool_func, thread_count: int):
+    """Кросс-валидация в отдельном процессе с ограничением количества потоков catboost"""
+    params = dict(params, model=dict(params['model'], thread_count=thread_count))
+    result = cv_model(params, positions, date, data_pool_func)
+    del result['model']['thread_count']
+    return result
+
+
+def _parallel_fmin(objective, param_space: dict, workers: int):
+    """Аналог hyperopt.fmin с TPE, рассчитывающий варианты параметров пакетами в пуле процессов
+
+    Потоки процессора делятся между процессами поровну. Начальные значения генератора случайных чисел для каждого
+    варианта получаются из SEED, а результаты пакета записываются в порядке предложения вариантов, поэтому результат
+    поиска не зависит от порядка завершения процессов
+    """
+    domain = hyperopt.Domain(objective, param_space)
+    trials = hyperopt.Trials()
+    rstate = np.random.RandomState(SEED)
+    thread_count = max(1, (os.cpu_count() or 1) // workers)
+    worker = functools.partial(_cv_model_worker, thread_count=thread_count, **objective.keywords)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        while len(trials.trials) < MAX_SEARCHES:
+            docs = trial_store.suggest_batch(domain, trials, rstate, min(workers, MAX_SEARCHES - len(trials.trials)))
+            params = [trial_store.trial_params(param_space, doc) for doc in docs]
+            for doc, result in zip(docs, executor.map(worker, params)):
+                doc['state'] = hyperopt.JOB_STATE_DONE
+                doc['result'] = result
+            trials.refresh()
+    return trials.argmin
+
+
+def _stored_fmin(objective, param_space: dict, workers: int, store, search: str, local_workers: int = None):
+    """Поиск с расчетом вариантов параметров рабочими процессами через хранилище
+
+    На этом компьютере запускается local_workers рабочих процессов, между которыми потоки процессора делятся поровну.
+    Процессы завершаются после окончания поиска
+    """
+    local_workers = workers if local_workers is None else local_workers
+    worker = functools.partial(_cv_model_worker, **objective.keywords)
+    trials_store = trial_store.TrialStore(store)
+    thread_count = max(1, (os.cpu_count() or 1) // max(local_workers, 1))
+    with ProcessPoolExecutor(max_workers=max(local_workers, 1)) as executor:
+        futures = [executor.submit(trial_store.work, store, search, thread_count) for _ in range(local_workers)]
+        try:
+            best = trial_store.fmin(trials_store, search, worker, param_space, MAX_SEARCHES, workers, SEED)
+        finally:
+            trials_store.finish(search)
+        for future in futures:
+            future.result()
+    return best
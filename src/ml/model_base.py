@@ -1,4 +1,5 @@
 """Абстрактный класс ML-модели"""
+import functools
 from abc import ABC, abstractmethod
 
 import catboost
@@ -6,6 +7,7 @@ import numpy as np
 import pandas as pd
 
 from ml import hyper
+from ml import pool_cache
 
 
 class AbstractModel(ABC):
@@ -52,8 +54,13 @@ class AbstractModel(ABC):
 
     @property
     def _learn_pool_func(self):
-        """catboost.Pool с данными для обучения"""
-        return lambda *args, **kwargs: catboost.Pool(**self._learn_pool_params(*args, **kwargs))
+        """catboost.Pool с данными для обучения - повторные запросы с теми же параметрами данных берутся из кэша"""
+        return functools.partial(pool_cache.pool, self._learn_pool_params)
+
+    @property
+    def _cached_learn_pool_params(self):
+        """Параметры для создания catboost.Pool для обучения - повторные запросы берутся из кэша"""
+        return functools.partial(pool_cache.pool_params, self._learn_pool_params)
 
     @staticmethod
     @abstractmethod
@@ -109,13 +116,16 @@ class AbstractModel(ABC):
         return dict(data=self._cv_result['data'],
                     model=self._cv_result['model'])
 
-    def find_better_model(self):
-        """Ищет оптимальную модель и сравнивает с базовой - результаты сравнения распечатываются"""
+    def find_better_model(self, workers: int = hyper.WORKERS):
+        """Ищет оптимальную модель и сравнивает с базовой - результаты сравнения распечатываются
+
+        Поиск может осуществляться в нескольких процессах - их количество задается workers
+        """
         positions = self._positions
         date = self._date
         base_cv_results = self._cv_result
         find_params = hyper.optimize_hyper(self.PARAMS, positions, date,
-                                           self._learn_pool_func, self._make_data_space())
+                                           self._learn_pool_func, self._make_data_space(), workers)
         self._check_data_space_bounds(find_params)
         best_cv_results = hyper.cv_model(find_params, positions, date, self._learn_pool_func)
         if base_cv_results['loss'] < best_cv_results['loss']:
@@ -139,4 +149,4 @@ class AbstractModel(ABC):
 
     def learning_curve(self, fractions=np.linspace(0.1, 1.0, 10)):
         """Рисует кривую обучения для заданных долей от общего количества данных"""
-        hyper.learning_curve(self.params, self.positions, self.date, self._learn_pool_params, fractions)
+        hyper.learning_curve(self.params, self.positions, self.date, self._cached_learn_pool_params, fractions)
@@ -0,0 +1,254 @@
+"""Кэш данных для обучения ML-моделей
+
+При поиске гиперпараметров и кросс-валидации одни и те же данные для обучения запрашиваются многократно для
+повторяющихся параметров данных. Кэш хранит параметры для создания catboost.Pool и сами catboost.Pool для каждого
+сочетания функции формирования данных, тикеров, даты, параметров данных и версии локальных данных - каталога
+данных, базы данных дивидендов и времени обновления инфляции. Объем кэша в памяти ограничен, при его превышении
+удаляются давно не использовавшиеся данные. Дополнительно параметры для создания catboost.Pool могут сохраняться на
+диск и использоваться повторно после перезапуска программы
+"""
+import collections
+import json
+import os
+import pickle
+import threading
+from pathlib import Path
+
+import catboost
+import pandas as pd
+
+from local import local_cpi
+from local.dividends import sqlite
+from utils import catalog
+
+# Максимальный объем данных в памяти в байтах
+MAX_MEMORY = 2 ** 30
+# Расширение файлов с сохраненными на диск данными
+CACHE_FILE_EXTENSION = '.pickle'
+# Размер заголовка файла базы данных SQLite и положение в нем счетчика изменений, увеличивающегося при каждой записи
+SQLITE_HEADER_SIZE = 100
+SQLITE_CHANGE_COUNTER = slice(24, 28)
+
+# Последняя рассчитанная версия данных и состояние файлов, для которого она рассчитана
+_VERSION = dict(state=None, version=None)
+
+
+def _file_state(path):
+    """Время изменения и размер файла или None при его отсутствии"""
+    try:
+        stat = path.stat()
+    except FileNotFoundError:
+        return None
+    return stat.st_mtime_ns, stat.st_size
+
+
+def _dividends_state():
+    """Состояние базы данных дивидендов - счетчик изменений из заголовка, время изменения и размер файла"""
+    path = Path(sqlite.DATABASE)
+    state = _file_state(path)
+    if state is None:
+        return None
+    with open(path, 'rb') as file:
+        header = file.read(SQLITE_HEADER_SIZE)
+    return (int.from_bytes(header[SQLITE_CHANGE_COUNTER], 'big'),) + state
+
+
+def data_version():
+    """Версия локальных данных - контрольная сумма описаний всех серий из каталога данных, состояния базы данных
+    дивидендов и времени обновления инфляции
+
+    Любое обновление локальных данных изменяет каталог или базу данных дивидендов, поэтому данные для обучения,
+    созданные до обновления, больше не используются. Версия пересчитывается только при изменении файлов каталога или
+    базы данных дивидендов
+    """
+    path = catalog.catalog_path()
+    dividends = _dividends_state()
+    state = (path, _file_state(path), dividends)
+    if _VERSION['state'] != state:
+        entries = catalog.catalog()
+        checksums = json.dumps(list(zip(entries[catalog.CATEGORY].fillna('').astype(str), entries.index.astype(str),
+                                        entries[catalog.CHECKSUM].astype(str))))
+        cpi = catalog.entry(None, local_cpi.CPI_NAME)
+        cpi_update = None if cpi is None else cpi[catalog.LAST_UPDATE]
+        version = catalog.make_checksum(checksums.encode(), json.dumps([cpi_update, dividends]).encode())
+        _VERSION.update(state=state, version=version)
+    return _VERSION['version']
+
+
+def _memory_usage(pool_params: dict):
+    """Объем памяти, занимаемый данными для обучения, в байтах"""
+    size = 0
+    for value in pool_params.values():
+        if isinstance(value, pd.DataFrame):
+            size += int(value.memory_usage(deep=True).sum())
+        elif isinstance(value, pd.Series):
+            size += int(value.memory_usage(deep=True))
+    return size
+
+
+def _func_name(func):
+    """Полное имя функции или вызываемого объекта"""
+    name = getattr(func, '__qualname__', type(func).__qualname__)
+    return f'{func.__module__}.{name}'
+
+
+class PoolCache:
+    """Ограниченный по объему кэш данных для обучения с удалением давно не использовавшихся данных
+
+    Parameters
+    ----------
+    max_memory
+        Максимальный объем данных в памяти в байтах. Объем catboost.Pool принимается равным объему параметров для его
+        создания
+    """
+
+    def __init__(self, max_memory: int = MAX_MEMORY):
+        self._max_memory = max_memory
+        self._lock = threading.RLock()
+        self._entries = collections.OrderedDict()
+        self._memory = 0
+        self._directory = None
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def memory(self):
+        """Объем данных в памяти в байтах"""
+        return self._memory
+
+    def persist(self, directory):
+        """Включает сохранение данных для обучения в каталог на диске или выключает его, если каталог None"""
+        self._directory = None if directory is None else Path(directory)
+
+    def clear(self):
+        """Удаляет все данные из памяти"""
+        with self._lock:
+            self._entries.clear()
+            self._memory = 0
+
+    def pool_params(self, pool_params_func, tickers: tuple, last_date: pd.Timestamp, **data_params):
+        """Параметры для создания catboost.Pool для обучения
+
+        Parameters
+        ----------
+        pool_params_func
+            Функция формирования параметров для создания catboost.Pool, принимающая тикеры, дату и параметры данных
+        tickers
+            Кортеж тикеров
+        last_date
+            Последняя дата, на которую нужно подготовить данные
+        data_params
+            Параметры данных
+
+        Returns
+        -------
+        dict
+            Параметры для создания catboost.Pool - одни и те же объекты для повторных запросов, поэтому их нельзя
+            изменять
+        """
+        return self._entry(pool_params_func, tickers, last_date, data_params)['params']
+
+    def pool(self, pool_params_func, tickers: tuple, last_date: pd.Timestamp, **data_params):
+        """catboost.Pool для обучения - параметры аналогичны pool_params
+
+        catboost.Pool создается без блокировки кэша, поэтому запросы других данных не ждут его создания
+        """
+        entry = self._entry(pool_params_func, tickers, last_date, data_params)
+        if entry['pool'] is not None:
+            return entry['pool']
+        pool = catboost.Pool(**entry['params'])
+        with self._lock:
+            if entry['pool'] is None:
+                entry['pool'] = pool
+                if self._entries.get(entry['key']) is entry:
+                    self._memory += entry['size']
+                entry['size'] *= 2
+                self._evict()
+            return entry['pool']
+
+    def _entry(self, pool_params_func, tickers, last_date, data_params):
+        """Данные из кэша или вновь созданные данные
+
+        Данные загружаются с диска или создаются без блокировки кэша, поэтому одновременные запросы разных данных не
+        ждут друг друга. Под блокировкой только ищутся и добавляются данные
+        """
+        key = (_func_name(pool_params_func),
+               tuple(tickers),
+               pd.Timestamp(last_date),
+               tuple(sorted(data_params.items())))
+        with self._lock:
+            version = data_version()
+            entry = self._entries.get(key)
+            if entry is not None and entry['version'] == version:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return entry
+            self.misses += 1
+        params = self._load(key, version)
+        if params is None:
+            params = pool_params_func(tuple(tickers), last_date, **data_params)
+            with self._lock:
+                version = data_version()
+            self._save(key, version, params)
+        entry = dict(key=key, version=version, params=params, pool=None, size=_memory_usage(params))
+        with self._lock:
+            self._discard(key)
+            self._entries[key] = entry
+            self._memory += entry['size']
+            self._evict()
+        return entry
+
+    def _discard(self, key):
+        """Удаляет данные из памяти"""
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._memory -= entry['size']
+
+    def _evict(self):
+        """Удаляет давно не использовавшиеся данные при превышении допустимого объема памяти
+
+        Последние добавленные данные возвращаются вызывающей функции, даже если они сами превышают допустимый объем
+        """
+        while self._memory > self._max_memory and self._entries:
+            self._discard(next(iter(self._entries)))
+
+    def _path(self, key, version: str):
+        """Путь к файлу с сохраненными на диск данными"""
+        name = catalog.make_checksum(repr(key).encode(), version.encode())
+        return self._directory / f'{name}{CACHE_FILE_EXTENSION}'
+
+    def _load(self, key, version: str):
+        """Загружает сохраненные на диск данные или возвращает None при их отсутствии или повреждении"""
+        if self._directory is None:
+            return None
+        path = self._path(key, version)
+        try:
+            with open(path, 'rb') as file:
+                return pickle.loads(file.read())
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _save(self, key, version: str, params: dict):
+        """Сохраняет данные на диск, если сохранение включено"""
+        if self._directory is None:
+            return
+        self._directory.mkdir(parents=True, exist_ok=True)
+        path = self._path(key, version)
+        temp_path = path.with_name(f'{path.name}.{os.getpid()}.{threading.get_ident()}.tmp')
+        with open(temp_path, 'wb') as file:
+            file.write(pickle.dumps(params, protocol=pickle.HIGHEST_PROTOCOL))
+        os.replace(temp_path, path)
+
+
+# Общий кэш данных для обучения всех ML-моделей
+POOL_CACHE = PoolCache()
+
+
+def pool(pool_params_func, tickers: tuple, last_date: pd.Timestamp, **data_params):
+    """catboost.Pool для обучения из общего кэша - в отличие от методов кэша функция поддерживает pickle"""
+    return POOL_CACHE.pool(pool_params_func, tickers, last_date, **data_params)
+
+
+def pool_params(pool_params_func, tickers: tuple, last_date: pd.Timestamp, **data_params):
+    """Параметры для создания catboost.Pool для обучения из общего кэша"""
+    return POOL_CACHE.pool_params(pool_params_func, tickers, last_date, **data_params)
@@ -5,6 +5,9 @@ import pandas as pd
 
 from local import moex
 
+# Тип данных признаков по умолчанию
+FEATURES_DTYPE = 'float64'
+
 
 class ReturnsCasesIterator:
     def __init__(self, tickers: tuple, last_date: pd.Timestamp, ew_lags: float, returns_lags: int):
@@ -34,9 +37,59 @@ class ReturnsCasesIterator:
         self._ew_std = ewm.std()
 
     def __iter__(self):
-        for date in self._returns.index[1 + max(int(self._ew_lags), self._lags):]:
+        for date in self._returns.index[self._first_index():]:
             yield self.cases(date)
 
+    def _first_index(self):
+        """Номер первой даты, для которой формируются кейсы для обучения"""
+        return 1 + max(int(self._ew_lags), self._lags)
+
+    def learn_cases(self, dtype=FEATURES_DTYPE):
+        """Все кейсы для обучения в одном DataFrame - совпадает с объединением кейсов, которые выдает итератор
+
+        Окна доходностей для всех дат берутся из матрицы доходностей без копирования, нормируются на СКО и
+        записываются в заранее выделенный массив признаков с типом dtype и отдельный массив меток, из которых затем
+        удаляются строки с пропусками
+
+        Parameters
+        ----------
+        dtype
+            Тип данных признаков - для экономии памяти на большом количестве тикеров можно использовать float32.
+            Метки всегда сохраняются в float64
+
+        Returns
+        -------
+        pd.DataFrame
+            Кейсы для обучения - тикер, СКО, нормированные среднее и лаги доходности и метка
+        """
+        lags = self._lags
+        returns = np.ascontiguousarray(self._returns.values, dtype='float64')
+        first_index = self._first_index()
+        dates = len(returns) - first_index
+        tickers = returns.shape[1]
+        if dates <= 0:
+            return pd.concat(list(self))
+        row_stride, column_stride = returns.strides
+        windows = np.lib.stride_tricks.as_strided(returns[first_index - lags:],
+                                                  shape=(dates, tickers, lags + 1),
+                                                  strides=(row_stride, column_stride, row_stride),
+                                                  writeable=False)
+        std = self._ew_std.values[first_index - 1:-1]
+        mean = self._ew_mean.values[first_index - 1:-1]
+        features = np.empty((dates, tickers, lags + 2), dtype=dtype)
+        features[:, :, 0] = std
+        features[:, :, 1] = mean / std
+        np.divide(windows[:, :, :-1], std[:, :, np.newaxis], out=features[:, :, 2:])
+        labels = windows[:, :, -1] / std
+        full = ~(np.isnan(features).any(axis=2) | np.isnan(labels))
+        index = (np.cumsum(full, axis=1) - 1)[full]
+        names = ['std', 'mean'] + [f'lag - {i}' for i in range(self._lags, 0, -1)]
+        cases = pd.DataFrame(features[full], columns=names, index=index)
+        columns = self._returns.columns
+        cases.insert(0, columns.name or 'index', np.tile(np.asarray(columns, dtype=object), dates)[full.ravel()])
+        cases['y'] = labels[full]
+        return cases
+
     def cases(self, date: pd.Timestamp, labels: bool = True):
         """Кейсы для заданной даты с возможностью отключения меток"""
         lags = self._lags
@@ -65,9 +118,10 @@ class ReturnsCasesIterator:
         return cases.reset_index()
 
 
-def learn_pool_params(tickers: tuple, last_date: pd.Timestamp, ew_lags: float, returns_lags: int):
+def learn_pool_params(tickers: tuple, last_date: pd.Timestamp, ew_lags: float, returns_lags: int,
+                      dtype=FEATURES_DTYPE):
     """Параметры для создания catboost.Pool для обучения"""
-    learn_cases = pd.concat(ReturnsCasesIterator(tickers, last_date, ew_lags, returns_lags))
+    learn_cases = ReturnsCasesIterator(tickers, last_date, ew_lags, returns_lags).learn_cases(dtype)
     pool_params = dict(data=learn_cases.iloc[:, :-1],
                        label=learn_cases.iloc[:, -1],
                        cat_features=[0],
@@ -4,6 +4,7 @@ import numpy as np
 import pandas as pd
 import pytest
 
+from local import moex
 from ml.returns.cases import ReturnsCasesIterator, learn_pool, predict_pool
 from web.labels import TICKER
 
@@ -72,3 +73,22 @@ def test_pools():
     assert features[3][4] == pytest.approx(-0.17948931455612183)
     assert features[4][5] == pytest.approx(0.015230 / 0.047723)
     assert predict.get_label() is None
+
+
+def test_learn_cases_vs_iterator(monkeypatch):
+    index = pd.date_range('2010-01-31', periods=90, freq='M')
+    returns = pd.DataFrame(np.random.RandomState(0).normal(0, 0.1, (90, 4)), index=index,
+                           columns=pd.Index(['AKRN', 'GMKN', 'MSTT', 'MTSS'], name=TICKER))
+    returns.iloc[:40, 2] = np.nan
+    returns.iloc[60, 3] = np.nan
+    monkeypatch.setattr(moex, 'log_returns_with_div', lambda tickers, last_date: returns)
+    data = ReturnsCasesIterator(tuple(returns.columns), index[-1], 9, 3)
+    expected = pd.concat(data)
+    df = data.learn_cases()
+    assert df.equals(expected)
+    assert list(df.columns) == list(expected.columns)
+
+    df = data.learn_cases('float32')
+    assert (df.dtypes[1:-1] == np.float32).all()
+    assert df['y'].dtype == np.float64
+    assert np.allclose(df.iloc[:, 1:].values.astype(float), expected.iloc[:, 1:].values)
@@ -1,3 +1,4 @@
+import catboost
 import hyperopt
 import numpy as np
 import pandas as pd
@@ -184,3 +185,25 @@ def test_learning_curve(monkeypatch):
     assert np.allclose(train_sizes, [16, 26, 33])
     assert np.allclose(train_scores, [0.05153206, 0.05238434, 0.05219597])
     assert np.allclose(test_scores, [0.06292444, 0.05833155, 0.05949058])
+
+
+def fake_learn_pool(tickers, last_date, freq, lags):
+    rng = np.random.RandomState(lags)
+    features = pd.DataFrame(rng.normal(size=(60, 3)), columns=['a', 'b', 'c'])
+    label = features['a'] * lags + rng.normal(scale=0.5, size=60)
+    return catboost.Pool(data=features, label=label)
+
+
+def test_optimize_hyper_parallel(monkeypatch):
+    space = {'freq': hyper.make_choice_space('freq', Freq),
+             'lags': hyper.make_choice_space('lags_range', range(1, 4))}
+    monkeypatch.setattr(hyper, 'MAX_SEARCHES', 5)
+    monkeypatch.setattr(hyper, 'MAX_ITERATIONS', 50)
+    monkeypatch.setattr(hyper, 'TECH_PARAMS', dict(hyper.TECH_PARAMS, iterations=40, loss_function='RMSE'))
+    params = dict(BASE_PARAMS, data=dict(freq=Freq.yearly, lags=1))
+    date = pd.Timestamp('2018-09-03')
+    results = [hyper.optimize_hyper(params, ('AKRN',), date, fake_learn_pool, space, workers=2) for _ in range(2)]
+    assert results[0] == results[1]
+    assert set(results[0]['data']) == {'freq', 'lags'}
+    assert 'thread_count' not in results[0]['model']
+    assert len(results[0]['model']) == 7
@@ -0,0 +1,145 @@
+import contextlib
+import pathlib
+import threading
+
+import catboost
+import numpy as np
+import pandas as pd
+import pytest
+
+import settings
+from local.dividends import sqlite
+from ml import pool_cache
+from utils.aggregation import Freq
+from utils.data_file import DataFile
+
+DATE = pd.Timestamp('2018-10-09')
+
+
+@pytest.fixture(autouse=True)
+def data_path(tmpdir, monkeypatch):
+    path = pathlib.Path(tmpdir.mkdir('test_pool_cache'))
+    monkeypatch.setattr(settings, 'DATA_PATH', path)
+    monkeypatch.setattr(sqlite, 'DATABASE', str(path / 'dividends.db'))
+    return path
+
+
+class FakePoolParams:
+    def __init__(self):
+        self.calls = 0
+
+    def __call__(self, tickers, last_date, freq, lags, rows=20):
+        self.calls += 1
+        data = pd.DataFrame({'TICKER': [tickers[i % len(tickers)] for i in range(rows)],
+                             'lag': np.arange(rows, dtype='float64') * lags})
+        return dict(data=data,
+                    label=pd.Series(np.arange(rows, dtype='float64')),
+                    cat_features=[0],
+                    feature_names=list(data.columns))
+
+
+def test_pool_cache_hits():
+    func = FakePoolParams()
+    cache = pool_cache.PoolCache()
+    params = cache.pool_params(func, ('AKRN', 'GMKN'), DATE, freq=Freq.yearly, lags=1)
+    assert cache.pool_params(func, ('AKRN', 'GMKN'), DATE, lags=1, freq=Freq.yearly) is params
+    pool = cache.pool(func, tickers=('AKRN', 'GMKN'), last_date=DATE, freq=Freq.yearly, lags=1)
+    assert isinstance(pool, catboost.Pool)
+    assert pool.num_row() == 20
+    assert cache.pool(func, ('AKRN', 'GMKN'), DATE, freq=Freq.yearly, lags=1) is pool
+    assert func.calls == 1
+    cache.pool_params(func, ('AKRN', 'GMKN'), DATE, freq=Freq.yearly, lags=2)
+    assert func.calls == 2
+    assert (cache.hits, cache.misses) == (3, 2)
+
+
+def test_pool_cache_data_version():
+    func = FakePoolParams()
+    cache = pool_cache.PoolCache()
+    cache.pool_params(func, ('AKRN',), DATE, freq=Freq.yearly, lags=1)
+    DataFile(None, 'cpi').value = pd.Series([1.0])
+    cache.pool_params(func, ('AKRN',), DATE, freq=Freq.yearly, lags=1)
+    cache.pool_params(func, ('AKRN',), DATE, freq=Freq.yearly, lags=1)
+    assert func.calls == 2
+
+
+def test_pool_cache_dividends_version():
+    func = FakePoolParams()
+    cache = pool_cache.PoolCache()
+    with contextlib.closing(sqlite.connect()):
+        pass
+    cache.pool_params(func, ('AKRN',), DATE, freq=Freq.yearly, lags=1)
+    cache.pool_params(func, ('AKRN',), DATE, freq=Freq.yearly, lags=1)
+    assert func.calls == 1
+    with contextlib.closing(sqlite.connect()) as connection:
+        connection.execute(f'INSERT INTO {sqlite.TABLE} (TICKER, DATE, DIVIDENDS) VALUES (?, ?, ?)',
+                           ('AKRN', '2018-05-10', 10.0))
+    cache.pool_params(func, ('AKRN',), DATE, freq=Freq.yearly, lags=1)
+    assert func.calls == 2
+
+
+def test_pool_cache_eviction():
+    func = FakePoolParams()
+    size = pool_cache._memory_usage(func(('AKRN',), DATE, Freq.yearly, 1))
+    cache = pool_cache.PoolCache(max_memory=2 * size)
+    for lags in [1, 2, 1, 3, 2]:
+        cache.pool_params(func, ('AKRN',), DATE, freq=Freq.yearly, lags=lags)
+    assert cache.memory == 2 * size
+    assert func.calls == 1 + 4
+    cache.pool(func, ('AKRN',), DATE, freq=Freq.yearly, lags=2)
+    assert cache.memory == 2 * size
+    cache.pool_params(func, ('AKRN',), DATE, freq=Freq.yearly, lags=3)
+    assert func.calls == 1 + 5
+
+
+def test_pool_cache_persist(data_path):
+    func = FakePoolParams()
+    cache = pool_cache.PoolCache()
+    cache.persist(data_path / 'pools')
+    params = cache.pool_params(func, ('AKRN',), DATE, freq=Freq.quarterly, lags=3)
+    cache = pool_cache.PoolCache()
+    cache.persist(data_path / 'pools')
+    loaded = cache.pool_params(func, ('AKRN',), DATE, freq=Freq.quarterly, lags=3)
+    assert func.calls == 1
+    assert loaded['data'].equals(params['data'])
+    assert loaded['label'].equals(params['label'])
+    cache.persist(None)
+    cache.clear()
+    cache.pool_params(func, ('AKRN',), DATE, freq=Freq.quarterly, lags=3)
+    assert func.calls == 2
+
+
+def test_pool_cache_persist_corrupted(data_path):
+    func = FakePoolParams()
+    cache = pool_cache.PoolCache()
+    cache.persist(data_path / 'pools')
+    cache.pool_params(func, ('AKRN',), DATE, freq=Freq.quarterly, lags=3)
+    path, = (data_path / 'pools').glob(f'*{pool_cache.CACHE_FILE_EXTENSION}')
+    path.write_bytes(path.read_bytes()[:10])
+    cache = pool_cache.PoolCache()
+    cache.persist(data_path / 'pools')
+    params = cache.pool_params(func, ('AKRN',), DATE, freq=Freq.quarterly, lags=3)
+    assert func.calls == 2
+    assert len(params['data']) == 20
+    assert list((data_path / 'pools').glob('*.tmp')) == []
+
+
+def test_pool_cache_concurrent_build():
+    func = FakePoolParams()
+    built = threading.Event()
+
+    def waiting_func(tickers, last_date, freq, lags):
+        if lags == 1:
+            assert built.wait(10)
+        else:
+            built.set()
+        return func(tickers, last_date, freq, lags)
+
+    cache = pool_cache.PoolCache()
+    params = dict(freq=Freq.yearly, lags=1)
+    thread = threading.Thread(target=cache.pool, args=(waiting_func, ('AKRN',), DATE), kwargs=params)
+    thread.start()
+    cache.pool_params(waiting_func, ('AKRN',), DATE, freq=Freq.yearly, lags=2)
+    thread.join()
+    assert func.calls == 2
+    assert cache.memory == 3 * pool_cache._memory_usage(func(('AKRN',), DATE, Freq.yearly, 1))
@@ -0,0 +1,101 @@
+import threading
+import time
+
+import hyperopt
+import pandas as pd
+import pytest
+
+from ml import hyper
+from ml import trial_store
+from ml.tests import test_hyper
+from ml.tests.test_hyper import fake_learn_pool
+from utils.aggregation import Freq
+
+BASE_PARAMS = dict(test_hyper.BASE_PARAMS, data=dict(freq=Freq.yearly, lags=1))
+
+
+def fake_objective(params, thread_count):
+    if params['x'] < 0:
+        raise ValueError('negative')
+    return dict(loss=params['x'] ** 2, status=hyperopt.STATUS_OK, thread_count=thread_count)
+
+
+def test_trial_store_pull(tmpdir):
+    store = trial_store.TrialStore(tmpdir / 'trials.db')
+    store.start('search', fake_objective)
+    docs = [dict(tid=0), dict(tid=1)]
+    store.push('search', docs, [dict(x=2), dict(x=-1)])
+    assert store.pull('worker', 'other') is None
+    search, tid, params, objective = store.pull('worker')
+    assert (search, tid, params) == ('search', 0, dict(x=2))
+    store.complete(search, tid, objective(params, thread_count=1))
+    assert store.pull('worker', 'search')[1] == 1
+    assert store.pull('worker', 'search') is None
+    store.requeue('search', timeout=0)
+    assert store.pull('worker', 'search')[1] == 1
+    store.finish('search')
+    assert store.finished('search')
+    assert store.pull('worker') is None
+    assert [row[:2] for row in store.trials('search')] == [(0, trial_store.DONE), (1, trial_store.RUNNING)]
+    assert store.trials('search')[0][3] == dict(loss=4, status=hyperopt.STATUS_OK, thread_count=1)
+
+
+def test_work(tmpdir):
+    path = tmpdir / 'trials.db'
+    store = trial_store.TrialStore(path)
+    store.start('search', fake_objective)
+    store.push('search', [dict(tid=0), dict(tid=1)], [dict(x=-1), dict(x=3)])
+    worker = threading.Thread(target=trial_store.work, args=(path, 'search', 2, 0.01))
+    worker.start()
+    while any(row[1] in (trial_store.PENDING, trial_store.RUNNING) for row in store.trials('search')):
+        time.sleep(0.01)
+    store.finish('search')
+    worker.join()
+    rows = store.trials('search')
+    assert [row[1] for row in rows] == [trial_store.FAILED, trial_store.DONE]
+    assert rows[0][3]['status'] == hyperopt.STATUS_FAIL
+    assert rows[1][3] == dict(loss=9, status=hyperopt.STATUS_OK, thread_count=2)
+
+
+@pytest.fixture
+def search_settings(monkeypatch):
+    monkeypatch.setattr(hyper, 'MAX_ITERATIONS', 50)
+    monkeypatch.setattr(hyper, 'TECH_PARAMS', dict(hyper.TECH_PARAMS, iterations=40, loss_function='RMSE'))
+    return {'freq': hyper.make_choice_space('freq', Freq),
+            'lags': hyper.make_choice_space('lags_range', range(1, 4))}
+
+
+def test_optimize_hyper_store(tmpdir, monkeypatch, search_settings):
+    path = tmpdir / 'trials.db'
+    date = pd.Timestamp('2018-09-03')
+    fmin = trial_store.fmin
+    searches = []
+
+    def interrupted_fmin(store, search, objective, param_space, max_evals, *args):
+        searches.append(search)
+        return fmin(store, search, objective, param_space, min(max_evals, interrupt_after), *args)
+
+    monkeypatch.setattr(trial_store, 'fmin', interrupted_fmin)
+    monkeypatch.setattr(hyper, 'MAX_SEARCHES', 6)
+    interrupt_after = 4
+    hyper.optimize_hyper(BASE_PARAMS, ('AKRN',), date, fake_learn_pool, search_settings, workers=2, store=path)
+    interrupt_after = 6
+    result = hyper.optimize_hyper(BASE_PARAMS, ('AKRN',), date, fake_learn_pool, search_settings,
+                                  workers=2, store=path, local_workers=1)
+    expected = hyper.optimize_hyper(BASE_PARAMS, ('AKRN',), date, fake_learn_pool, search_settings, workers=2)
+    assert result == expected
+    assert searches[0] == searches[1]
+    store = trial_store.TrialStore(path)
+    assert store.finished(searches[0])
+    rows = store.trials(searches[0])
+    assert [row[:2] for row in rows] == [(tid, trial_store.DONE) for tid in range(6)]
+    assert all('thread_count' not in row[3]['model'] for row in rows)
+
+    monkeypatch.setattr(hyper, 'MAX_SEARCHES', 2)
+    hyper.optimize_hyper(BASE_PARAMS, ('AKRN',), date, fake_learn_pool, search_settings,
+                         workers=2, store=path, local_workers=1)
+    search_settings['lags'] = hyper.make_choice_space('lags_range', range(1, 3))
+    hyper.optimize_hyper(BASE_PARAMS, ('AKRN',), date, fake_learn_pool, search_settings,
+                         workers=2, store=path, local_workers=1)
+    assert len(set(searches)) == 3
+    assert [len(store.trials(search)) for search in searches[2:]] == [2, 2]
@@ -0,0 +1,318 @@
+"""Хранилище вариантов параметров для распределенного поиска гиперпараметров
+
+Варианты параметров, предложенные TPE, и результаты их кросс-валидации хранятся в базе данных SQLite. Координатор
+предлагает пакеты вариантов и ждет их расчета, а рабочие процессы, в том числе на других компьютерах с общей файловой
+системой, забирают из базы ожидающие расчета варианты и записывают в нее результаты. Все предложенные варианты
+сохраняются, поэтому прерванный поиск можно продолжить с того же места
+
+Рабочий процесс на другом компьютере запускается командой python -m ml.trial_store <путь к базе данных>
+"""
+import contextlib
+import hashlib
+import os
+import pickle
+import socket
+import sqlite3
+import sys
+import time
+
+import hyperopt
+import numpy as np
+
+# Таблица поисков с функцией расчета вариантов и признаком окончания поиска
+SEARCHES = 'SEARCHES'
+# Таблица вариантов параметров
+TRIALS = 'TRIALS'
+
+# Состояния вариантов параметров
+PENDING = 'pending'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+
+# Время ожидания блокировки базы данных другим процессом в секундах
+TIMEOUT = 60
+# Пауза между проверками наличия вариантов для расчета или результатов расчета в секундах
+POLL_INTERVAL = 1.0
+# Время, после которого вариант, расчет которого не завершен, считается брошенным и снова ожидает расчета
+RUNNING_TIMEOUT = 24 * 60 * 60
+
+
+def search_name(*parts):
+    """Наименование поиска на основе описывающих его параметров"""
+    return hashlib.md5(repr(parts).encode()).hexdigest()
+
+
+def suggest_batch(domain, trials, rstate, size: int):
+    """Предлагает пакет вариантов параметров с помощью TPE
+
+    Еще не рассчитанные варианты пакета считаются TPE неудачными, поэтому варианты внутри пакета не повторяются. Для
+    каждого варианта из rstate берется одно начальное значение генератора случайных чисел
+
+    Returns
+    -------
+    list
+        Описания предложенных вариантов, хранящиеся в trials
+    """
+    tids = []
+    for _ in range(size):
+        new_ids = trials.new_trial_ids(1)
+        trials.insert_trial_docs(hyperopt.tpe.suggest(new_ids, domain, trials, rstate.randint(2 ** 31 - 1)))
+        trials.refresh()
+        tids.extend(new_ids)
+    return [doc for doc in trials.trials if doc['tid'] in tids]
+
+
+def trial_params(param_space: dict, doc: dict):
+    """Параметры в исходном пространстве для описания варианта"""
+    return hyperopt.space_eval(param_space, {label: values[0] for label, values in doc['misc']['vals'].items()
+                                             if values})
+
+
+class TrialStore:
+    """Хранилище вариантов параметров в базе данных SQLite
+
+    Parameters
+    ----------
+    path
+        Путь к базе данных - при отсутствии создается
+    """
+
+    def __init__(self, path):
+        self._path = str(path)
+        with self._connect() as connection:
+            connection.execute(f'CREATE TABLE IF NOT EXISTS {SEARCHES} ('
+                               f'NAME TEXT PRIMARY KEY, '
+                               f'OBJECTIVE BLOB NOT NULL, '
+                               f'FINISHED INTEGER NOT NULL DEFAULT 0)')
+            connection.execute(f'CREATE TABLE IF NOT EXISTS {TRIALS} ('
+                               f'SEARCH TEXT NOT NULL, '
+                               f'TID INTEGER NOT NULL, '
+                               f'STATE TEXT NOT NULL, '
+                               f'DOC BLOB NOT NULL, '
+                               f'PARAMS BLOB NOT NULL, '
+                               f'RESULT BLOB, '
+                               f'WORKER TEXT, '
+                               f'UPDATED REAL NOT NULL, '
+                               f'PRIMARY KEY (SEARCH, TID))')
+            connection.execute(f'CREATE INDEX IF NOT EXISTS {TRIALS}_STATE ON {TRIALS} (STATE, SEARCH, TID)')
+
+    @contextlib.contextmanager
+    def _connect(self):
+        """Соединение в режиме автоматической фиксации изменений, которое закрывается при выходе"""
+        connection = sqlite3.connect(self._path, timeout=TIMEOUT, isolation_level=None)
+        try:
+            yield connection
+        finally:
+            connection.close()
+
+    def start(self, search: str, objective):
+        """Начинает или возобновляет поиск
+
+        Parameters
+        ----------
+        search
+            Наименование поиска
+        objective
+            Функция расчета варианта, принимающая параметры и количество потоков thread_count. Должна поддерживать
+            pickle
+        """
+        with self._connect() as connection:
+            connection.execute(f'INSERT OR REPLACE INTO {SEARCHES} (NAME, OBJECTIVE, FINISHED) VALUES (?, ?, 0)',
+                               (search, pickle.dumps(objective)))
+
+    def finish(self, search: str):
+        """Отмечает окончание поиска - рабочие процессы этого поиска завершаются"""
+        with self._connect() as connection:
+            connection.execute(f'UPDATE {SEARCHES} SET FINISHED = 1 WHERE NAME = ?', (search,))
+
+    def finished(self, search: str):
+        """Закончен ли поиск"""
+        with self._connect() as connection:
+            row = connection.execute(f'SELECT FINISHED FROM {SEARCHES} WHERE NAME = ?', (search,)).fetchone()
+        return row is not None and bool(row[0])
+
+    def push(self, search: str, docs: list, params: list):
+        """Добавляет варианты параметров, ожидающие расчета"""
+        now = time.time()
+        rows = [(search, doc['tid'], PENDING, pickle.dumps(doc), pickle.dumps(value), now)
+                for doc, value in zip(docs, params)]
+        with self._connect() as connection:
+            connection.executemany(f'INSERT INTO {TRIALS} (SEARCH, TID, STATE, DOC, PARAMS, UPDATED) '
+                                   f'VALUES (?, ?, ?, ?, ?, ?)', rows)
+
+    def trials(self, search: str):
+        """Все варианты поиска в порядке предложения
+
+        Returns
+        -------
+        list
+            Кортежи из номера, состояния, описания варианта и результата расчета или None
+        """
+        with self._connect() as connection:
+            rows = connection.execute(f'SELECT TID, STATE, DOC, RESULT FROM {TRIALS} WHERE SEARCH = ? ORDER BY TID',
+                                      (search,)).fetchall()
+        return [(tid, state, pickle.loads(doc), None if result is None else pickle.loads(result))
+                for tid, state, doc, result in rows]
+
+    def pull(self, worker: str, search: str = None):
+        """Забирает для расчета самый ранний ожидающий расчета вариант незаконченного поиска
+
+        Parameters
+        ----------
+        worker
+            Наименование рабочего процесса
+        search
+            Наименование поиска - если не указано, то вариант берется из любого поиска
+
+        Returns
+        -------
+        tuple or None
+            Наименование поиска, номер варианта, параметры и функция расчета или None при отсутствии вариантов
+        """
+        query = (f'SELECT T.SEARCH, T.TID, T.PARAMS, S.OBJECTIVE FROM {TRIALS} AS T '
+                 f'JOIN {SEARCHES} AS S ON S.NAME = T.SEARCH '
+                 f'WHERE T.STATE = ? AND S.FINISHED = 0')
+        args = [PENDING]
+        if search is not None:
+            query += ' AND T.SEARCH = ?'
+            args.append(search)
+        query += ' ORDER BY T.UPDATED, T.TID LIMIT 1'
+        with self._connect() as connection:
+            connection.execute('BEGIN IMMEDIATE')
+            row = connection.execute(query, args).fetchone()
+            if row is not None:
+                connection.execute(f'UPDATE {TRIALS} SET STATE = ?, WORKER = ?, UPDATED = ? '
+                                   f'WHERE SEARCH = ? AND TID = ?', (RUNNING, worker, time.time(), row[0], row[1]))
+            connection.execute('COMMIT')
+        if row is None:
+            return None
+        search, tid, params, objective = row
+        return search, tid, pickle.loads(params), pickle.loads(objective)
+
+    def complete(self, search: str, tid: int, result: dict, state: str = DONE):
+        """Записывает результат расчета варианта"""
+        with self._connect() as connection:
+            connection.execute(f'UPDATE {TRIALS} SET STATE = ?, RESULT = ?, UPDATED = ? WHERE SEARCH = ? AND TID = ?',
+                               (state, pickle.dumps(result), time.time(), search, tid))
+
+    def requeue(self, search: str, timeout: float = RUNNING_TIMEOUT):
+        """Возвращает в ожидание расчета варианты, расчет которых начат более timeout секунд назад"""
+        with self._connect() as connection:
+            connection.execute(f'UPDATE {TRIALS} SET STATE = ?, WORKER = NULL '
+                               f'WHERE SEARCH = ? AND STATE = ? AND UPDATED < ?',
+                               (PENDING, search, RUNNING, time.time() - timeout))
+
+
+def fmin(store: TrialStore, search: str, objective, param_space: dict, max_evals: int, batch_size: int, seed: int,
+         poll_interval: float = POLL_INTERVAL):
+    """Аналог hyperopt.fmin с TPE, рассчитывающий варианты параметров рабочими процессами через хранилище
+
+    Варианты предлагаются пакетами по batch_size и следующий пакет предлагается после расчета предыдущего. Начальные
+    значения генератора случайных чисел для каждого варианта получаются из seed, поэтому результат не зависит от
+    количества и скорости рабочих процессов. Если в хранилище уже есть варианты поиска, то они загружаются и поиск
+    продолжается. Варианты, расчет которых начат более RUNNING_TIMEOUT секунд назад, снова ожидают расчета
+
+    Parameters
+    ----------
+    store
+        Хранилище вариантов
+    search
+        Наименование поиска
+    objective
+        Функция расчета варианта, принимающая параметры и количество потоков thread_count. Должна поддерживать pickle
+    param_space
+        Пространство поиска параметров
+    max_evals
+        Общее количество рассчитываемых вариантов
+    batch_size
+        Количество вариантов, рассчитываемых одновременно
+    seed
+        Начальное значение генератора случайных чисел
+    poll_interval
+        Пауза между проверками результатов расчета
+
+    Returns
+    -------
+    dict
+        Лучший вариант во внутреннем представлении hyperopt
+    """
+    store.start(search, objective)
+    # Варианты, расчет которых не завершился при прерывании предыдущего запуска поиска, рассчитываются заново
+    store.requeue(search, 0)
+    domain = hyperopt.Domain(objective, param_space)
+    trials = hyperopt.Trials()
+    rstate = np.random.RandomState(seed)
+    stored = store.trials(search)
+    for _, _, doc, _ in stored:
+        rstate.randint(2 ** 31 - 1)
+        doc['state'] = hyperopt.JOB_STATE_NEW
+        doc['result'] = {'status': hyperopt.STATUS_NEW}
+    trials.new_trial_ids(len(stored))
+    trials.insert_trial_docs([doc for _, _, doc, _ in stored])
+    trials.refresh()
+    docs = {doc['tid']: doc for doc in trials.trials}
+    while True:
+        waiting = _sync_results(store, search, docs)
+        trials.refresh()
+        if waiting:
+            store.requeue(search)
+            time.sleep(poll_interval)
+        elif len(trials.trials) < max_evals:
+            new_docs = suggest_batch(domain, trials, rstate, min(batch_size, max_evals - len(trials.trials)))
+            store.push(search, new_docs, [trial_params(param_space, doc) for doc in new_docs])
+            docs.update((doc['tid'], doc) for doc in new_docs)
+        else:
+            break
+    store.finish(search)
+    return trials.argmin
+
+
+def _sync_results(store: TrialStore, search: str, docs: dict):
+    """Переносит результаты расчета из хранилища в описания вариантов и возвращает количество нерассчитанных"""
+    waiting = 0
+    for tid, state, _, result in store.trials(search):
+        doc = docs[tid]
+        if state in (DONE, FAILED):
+            if doc['state'] != hyperopt.JOB_STATE_DONE:
+                doc['state'] = hyperopt.JOB_STATE_DONE
+                doc['result'] = result
+        else:
+            waiting += 1
+    return waiting
+
+
+def work(path, search: str = None, thread_count: int = None, poll_interval: float = POLL_INTERVAL):
+    """Рабочий процесс - рассчитывает варианты из хранилища
+
+    Parameters
+    ----------
+    path
+        Путь к базе данных хранилища
+    search
+        Наименование поиска - процесс завершается после окончания поиска. Если не указано, то рассчитываются варианты
+        всех поисков и процесс не завершается
+    thread_count
+        Количество потоков для расчета варианта - по умолчанию все потоки процессора
+    poll_interval
+        Пауза между проверками наличия вариантов для расчета
+    """
+    store = TrialStore(path)
+    worker = f'{socket.gethostname()}:{os.getpid()}'
+    thread_count = thread_count or os.cpu_count() or 1
+    while search is None or not store.finished(search):
+        task = store.pull(worker, search)
+        if task is None:
+            time.sleep(poll_interval)
+            continue
+        trial_search, tid, params, objective = task
+        try:
+            result = objective(params, thread_count=thread_count)
+        except Exception as error:
+            store.complete(trial_search, tid, dict(status=hyperopt.STATUS_FAIL, error=repr(error)), FAILED)
+        else:
+            store.complete(trial_search, tid, result)
+
+
+if __name__ == '__main__':
+    work(sys.argv[1])
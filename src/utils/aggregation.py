@@ -2,6 +2,7 @@
 import functools
 from enum import Enum
 
+import numpy as np
 import pandas as pd
 
 
@@ -118,6 +119,104 @@ def monthly_aggregation_func(end_of_month: pd.Timestamp):
     return functools.partial(monthly_aggregator, end_of_month=end_of_month)
 
 
+def _labels(index: pd.DatetimeIndex, years, months, end_day: int):
+    """Векторный аналог прибавления pd.DateOffset(years=years, months=months, day=end_day) к каждой дате индекса
+
+    Как и pd.DateOffset, при отсутствии дня end_day в месяце берется последний день месяца, а время сохраняется
+
+    Parameters
+    ----------
+    index
+        Индекс дат
+    years
+        Массив с количеством лет для каждой даты
+    months
+        Массив с номером месяца с учетом количества добавляемых месяцев для каждой даты
+    end_day
+        Число месяца
+
+    Returns
+    -------
+    pd.DatetimeIndex
+        Индекс с датами окончания периодов
+    """
+    values = index.values
+    months_from_epoch = (np.asarray(index.year) + years - 1970) * 12 + months - 1
+    month_start = months_from_epoch.astype('datetime64[M]').astype('datetime64[D]')
+    next_month_start = (months_from_epoch + 1).astype('datetime64[M]').astype('datetime64[D]')
+    days_in_month = (next_month_start - month_start).astype('int64')
+    days = np.minimum(end_day, days_in_month) - 1
+    time_of_day = values - values.astype('datetime64[D]')
+    labels = (month_start + days).astype('datetime64[ns]') + time_of_day
+    return pd.DatetimeIndex(labels, name=index.name)
+
+
+def yearly_labels(index: pd.DatetimeIndex, end_of_year: pd.Timestamp):
+    """Векторный аналог yearly_aggregator для всех дат индекса"""
+    month = np.asarray(index.month)
+    day = np.asarray(index.day)
+    end_month = end_of_year.month
+    end_day = end_of_year.day
+    this_year = (month < end_month) | ((month == end_month) & (day <= end_day))
+    return _labels(index, np.where(this_year, 0, 1), end_month, end_day)
+
+
+def quarterly_labels(index: pd.DatetimeIndex, end_of_quarter: pd.Timestamp):
+    """Векторный аналог quarterly_aggregator для всех дат индекса"""
+    month = np.asarray(index.month)
+    day = np.asarray(index.day)
+    end_day = end_of_quarter.day
+    months_to_end_of_quarter = (end_of_quarter.month - month) % 3
+    this_quarter = (months_to_end_of_quarter > 0) | (day <= end_day)
+    return _labels(index, 0, month + np.where(this_quarter, months_to_end_of_quarter, 3), end_day)
+
+
+def monthly_labels(index: pd.DatetimeIndex, end_of_month: pd.Timestamp):
+    """Векторный аналог monthly_aggregator для всех дат индекса"""
+    month = np.asarray(index.month)
+    day = np.asarray(index.day)
+    end_day = end_of_month.day
+    return _labels(index, 0, month + np.where(day <= end_day, 0, 1), end_day)
+
+
+def monthly_index(first_date: pd.Timestamp, months: int, day: int, name=None):
+    """Даты на заданный день месяца для months месяцев, начиная с месяца first_date
+
+    Совпадает с рядом дат с частотой pd.DateOffset(months=1, day=day) - если в месяце меньше дней, то используется
+    последний день месяца
+
+    Parameters
+    ----------
+    first_date
+        Дата в первом месяце ряда
+    months
+        Количество месяцев
+    day
+        Число месяца
+    name
+        Наименование индекса
+
+    Returns
+    -------
+    pd.DatetimeIndex
+        Индекс дат
+    """
+    month = np.datetime64(first_date, 'M') + np.arange(months)
+    dates = np.minimum(month.astype('datetime64[D]') + (day - 1), (month + 1).astype('datetime64[D]') - 1)
+    return pd.DatetimeIndex(dates.astype('datetime64[ns]'), name=name)
+
+
+def months_between(first_date: pd.Timestamp, last_date: pd.Timestamp):
+    """Количество месяцев с месяца first_date по месяц last_date включительно"""
+    return (last_date.year - first_date.year) * 12 + last_date.month - first_date.month + 1
+
+
+# Векторные функции агрегации для различных периодов
+LABELS_FUNCS = dict(monthly=monthly_labels,
+                    quarterly=quarterly_labels,
+                    yearly=yearly_labels)
+
+
 class Freq(Enum):
     """Различные периоды агригации данных"""
     monthly = (monthly_aggregation_func, 12)
@@ -144,6 +243,26 @@ class Freq(Enum):
         """Количество периодов в году"""
         return self._times_in_year
 
+    def labels(self, index: pd.DatetimeIndex, end_date: pd.Timestamp):
+        """Векторный аналог функции агрегации - даты окончания периодов для всех дат индекса
+
+        Результат совпадает с применением aggregation_func(end_date) к каждой дате, но рассчитывается одной операцией
+        над массивом, поэтому подходит для группировки больших DataFrame
+
+        Parameters
+        ----------
+        index
+            Индекс дат
+        end_date
+            Дата окончания периода - ее месяц и число используются для агрегации
+
+        Returns
+        -------
+        pd.DatetimeIndex
+            Даты окончания периодов для каждой даты индекса
+        """
+        return LABELS_FUNCS[self.name](index, end_date)
+
 
 if __name__ == '__main__':
     mon = Freq.monthly
@@ -0,0 +1,241 @@
+"""Каталог локальных данных
+
+Небольшой файл в корне глобального каталога данных с описанием всех сохраненных серий: время обновления, количество
+строк, первое и последнее значение индекса и контрольная сумма. Позволяет проверять актуальность данных и находить
+данные, требующие обновления, без загрузки самих данных
+
+Каталог может изменяться одновременно несколькими процессами, например, при параллельном поиске гиперпараметров,
+поэтому изменения делаются под блокировкой файла и с повторным чтением каталога
+"""
+import contextlib
+import hashlib
+import json
+import os
+import threading
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+import numpy as np
+import pandas as pd
+
+import settings
+
+CATALOG_FILE = 'catalog.json'
+# Расширение файлов блокировки данных, изменяемых несколькими процессами
+LOCK_EXTENSION = '.lock'
+
+# Поля описания серии данных
+CATEGORY = 'category'
+NAME = 'name'
+LAST_UPDATE = 'last_update'
+ROWS = 'rows'
+FIRST = 'first'
+LAST = 'last'
+CHECKSUM = 'checksum'
+FIELDS = [CATEGORY, NAME, LAST_UPDATE, ROWS, FIRST, LAST, CHECKSUM]
+
+# Каталог может изменяться из нескольких потоков
+_LOCK = threading.RLock()
+# Загруженная версия каталога - путь, время изменения файла и описания серий
+_CACHE = dict(path=None, mtime=None, entries={})
+
+
+def catalog_path():
+    """Путь к файлу каталога в глобальной директории данных из файла настроек"""
+    return settings.DATA_PATH / CATALOG_FILE
+
+
+def _key(data_category, data_name: str):
+    """Ключ серии данных в каталоге"""
+    return f'{data_category or ""}/{data_name}'
+
+
+@contextlib.contextmanager
+def file_lock(path):
+    """Блокировка между потоками и процессами на основе файла блокировки с путем path
+
+    Файл блокировки создается при необходимости. Блокировка не повторно входимая внутри процесса. При отсутствии
+    модуля fcntl блокирует только потоки своего процесса
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, 'a') as file:
+        if fcntl is not None:
+            fcntl.flock(file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(file, fcntl.LOCK_UN)
+
+
+def _load(force: bool = False):
+    """Загружает каталог, если он изменился с момента последней загрузки или если загрузка принудительная"""
+    path = catalog_path()
+    mtime = path.stat().st_mtime_ns if path.exists() else None
+    if force or _CACHE['path'] != path or _CACHE['mtime'] != mtime:
+        entries = {}
+        if mtime is not None:
+            with open(path, encoding='utf-8') as file:
+                entries = json.load(file)
+        _CACHE.update(path=path, mtime=mtime, entries=entries)
+    return _CACHE['entries']
+
+
+def _save(entries: dict):
+    """Атомарно сохраняет каталог"""
+    path = catalog_path()
+    if not path.parent.exists():
+        path.parent.mkdir(parents=True)
+    temp_path = path.with_name(path.name + f'.{os.getpid()}.{threading.get_ident()}.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(entries, file, ensure_ascii=False, indent=0)
+    os.replace(temp_path, path)
+    _CACHE.update(path=path, mtime=path.stat().st_mtime_ns, entries=entries)
+
+
+def _label(value):
+    """Представление значения индекса для хранения в каталоге"""
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return pd.Timestamp(value).isoformat()
+    if isinstance(value, np.generic):
+        return value.item()
+    if value is None or isinstance(value, (str, int, float)):
+        return value
+    return str(value)
+
+
+def make_checksum(*parts, previous: str = None):
+    """Контрольная сумма для набора байтовых строк или массивов
+
+    Если указана предыдущая контрольная сумма, то она включается в расчет - так формируется контрольная сумма для
+    данных, к которым дописаны новые строки
+    """
+    md5 = hashlib.md5()
+    if previous is not None:
+        md5.update(previous.encode())
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            if part.dtype == object:
+                part = json.dumps([_label(value) for value in part], ensure_ascii=False).encode()
+            else:
+                part = np.ascontiguousarray(part).tobytes()
+        md5.update(part)
+    return md5.hexdigest()
+
+
+def entry(data_category, data_name: str):
+    """Описание серии данных из каталога или None, если серия в каталоге отсутствует
+
+    Parameters
+    ----------
+    data_category
+        Категория данных - может быть None для данных в корне глобального каталога данных
+    data_name
+        Название серии данных
+
+    Returns
+    -------
+    dict or None
+        Словарь с ключами category, name, last_update, rows, first, last, checksum
+    """
+    with _LOCK:
+        value = _load().get(_key(data_category, data_name))
+        if value is None:
+            return None
+        return dict(value)
+
+
+def _update(data_category, data_name: str, make_entry):
+    """Изменяет описание серии данных под блокировкой между процессами
+
+    Каталог перечитывается под блокировкой, поэтому изменения, сделанные другими процессами, не теряются. Функция
+    make_entry получает старое описание серии или None и возвращает новое
+    """
+    key = _key(data_category, data_name)
+    with _LOCK, file_lock(catalog_path().with_name(CATALOG_FILE + LOCK_EXTENSION)):
+        entries = dict(_load(force=True))
+        entries[key] = make_entry(entries.get(key))
+        _save(entries)
+
+
+def _new_entry(data_category, data_name: str, value, last_update: float, checksum: str):
+    """Описание серии данных"""
+    rows = first = last = None
+    if isinstance(value, (pd.DataFrame, pd.Series)):
+        rows = len(value)
+        if rows:
+            first, last = _label(value.index[0]), _label(value.index[-1])
+    return {CATEGORY: data_category,
+            NAME: data_name,
+            LAST_UPDATE: last_update,
+            ROWS: rows,
+            FIRST: first,
+            LAST: last,
+            CHECKSUM: checksum}
+
+
+def register(data_category, data_name: str, value, last_update: float, checksum: str):
+    """Записывает в каталог описание сохраненной серии данных
+
+    Для pd.DataFrame и pd.Series сохраняется количество строк и крайние значения индекса, для остальных типов данных
+    эта информация отсутствует
+    """
+    new = _new_entry(data_category, data_name, value, last_update, checksum)
+    _update(data_category, data_name, lambda old: new)
+
+
+def register_append(data_category, data_name: str, value, last_update: float, checksum: str):
+    """Обновляет в каталоге описание серии данных, к которой дописаны новые строки value"""
+
+    def make_entry(old):
+        if old is None or old[ROWS] is None:
+            return _new_entry(data_category, data_name, value, last_update, checksum)
+        new = dict(old)
+        new.update({LAST_UPDATE: last_update, CHECKSUM: checksum})
+        if len(value):
+            new[ROWS] = old[ROWS] + len(value)
+            new[LAST] = _label(value.index[-1])
+            if old[FIRST] is None:
+                new[FIRST] = _label(value.index[0])
+        return new
+
+    _update(data_category, data_name, make_entry)
+
+
+def touch(data_category, data_name: str, last_update: float):
+    """Обновляет в каталоге время обновления серии данных, содержимое которой не изменилось"""
+
+    def make_entry(old):
+        return dict(old, **{LAST_UPDATE: last_update})
+
+    _update(data_category, data_name, make_entry)
+
+
+def catalog(data_category=None):
+    """Описание всех серий данных из каталога
+
+    Parameters
+    ----------
+    data_category
+        Если указана категория, то возвращаются только серии данной категории
+
+    Returns
+    -------
+    pd.DataFrame
+        В строках описания серий данных, индекс - название серии
+        В столбцах категория, время обновления, количество строк, первое и последнее значение индекса и контрольная
+        сумма
+    """
+    with _LOCK:
+        entries = list(_load().values())
+    df = pd.DataFrame(entries, columns=FIELDS)
+    if data_category is not None:
+        df = df[df[CATEGORY] == data_category]
+    return df.set_index(NAME)
+
+
+if __name__ == '__main__':
+    print(catalog())
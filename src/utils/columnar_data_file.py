@@ -0,0 +1,350 @@
+"""Хранение локальных данных в колоночном формате с отображением файлов в память"""
+import json
+import os
+import pickle
+import shutil
+import time
+
+import numpy as np
+import pandas as pd
+
+import settings
+from utils import catalog
+from utils.data_file import DATA_FILE_EXTENSION
+
+COLUMNAR_EXTENSION = '.columns'
+META_FILE = 'meta.json'
+INDEX_FILE = 'index.npy'
+
+# Признак вида сохраненных данных
+FRAME = 'frame'
+SERIES = 'series'
+
+# Признак индекса из дат - хранится в виде int64 с количеством наносекунд
+DATETIME_INDEX = 'datetime'
+ARRAY_INDEX = 'array'
+
+# Дописанные строки хранятся в отдельных сегментах, которые объединяются с основными данными при достижении лимита
+DELTA_PREFIX = 'delta'
+MAX_DELTAS = 20
+# Основные данные каждой перезаписи хранятся в новом каталоге с номером поколения
+BASE_PREFIX = 'base'
+
+
+class ColumnarDataFile:
+    """Альтернатива DataFile - хранит pd.DataFrame или pd.Series по колонкам
+
+    Каждая колонка и индекс хранятся в отдельном npy-файле и при загрузке отображаются в память, поэтому чтение почти
+    не требует копирования, а загрузка одной колонки не приводит к десериализации остальных. Индекс из дат хранится в
+    виде int64. Служебная информация (время обновления, наименования и типы колонок) хранится в небольшом json-файле
+
+    Новые строки могут дописываться в небольшие отдельные сегменты без перезаписи всей истории, а периодически
+    сегменты объединяются с основными данными
+
+    Служебная информация записывается атомарно после колонок и определяет, какие файлы относятся к данным. При
+    перезаписи основные данные сохраняются в каталог нового поколения, а файлы предыдущих поколений и сегменты
+    удаляются только после записи служебной информации, поэтому прерванная запись не нарушает соответствие колонок и
+    служебной информации
+
+    Если колоночные данные отсутствуют, но есть данные в формате DataFile, то они однократно конвертируются с
+    сохранением времени последнего обновления. Исходный файл не удаляется
+
+    Все изменения регистрируются в каталоге данных
+    """
+
+    def __init__(self, data_category, data_name: str):
+        """
+        Parameters
+        ----------
+        data_category
+            Каталог в котором хранятся однородные данные - может быть None, тогда данные будут сохраняться в корне
+            глобального каталога данных
+        data_name
+            Название серии данных
+        """
+        self._data_category = data_category
+        self._data_name = data_name
+        self._index = None
+        self._value = None
+        self._meta = self._load_meta()
+
+    def __str__(self):
+        last_update = None if self.last_update is None else time.ctime(self.last_update)
+        return (f'{self.__class__.__name__}('
+                f'data_category={self.data_category}, '
+                f'data_name={self.data_name}, '
+                f'last_update={last_update})')
+
+    @property
+    def data_category(self):
+        """Категория данных"""
+        return self._data_category
+
+    @property
+    def data_name(self):
+        """Название данных"""
+        return self._data_name
+
+    @property
+    def data_path(self):
+        """Возвращает путь к каталогу с колонками и при необходимости создает необходимые директории
+
+        Директории создаются в глобальной директории данных из файла настроек
+        """
+        folder = settings.DATA_PATH
+        if self._data_category is not None:
+            folder = folder / self._data_name
+            file = f'{self._data_category}{COLUMNAR_EXTENSION}'
+        else:
+            file = f'{self._data_name}{COLUMNAR_EXTENSION}'
+        folder = folder / file
+        if not folder.exists():
+            folder.mkdir(parents=True, exist_ok=True)
+        return folder
+
+    @property
+    def legacy_path(self):
+        """Путь к файлу с данными в формате DataFile"""
+        folder = settings.DATA_PATH
+        if self._data_category is not None:
+            return folder / self._data_name / f'{self._data_category}{DATA_FILE_EXTENSION}'
+        return folder / f'{self._data_name}{DATA_FILE_EXTENSION}'
+
+    def _load_meta(self):
+        """Загружает служебную информацию, а при ее отсутствии конвертирует данные в формате DataFile"""
+        meta_path = self.data_path / META_FILE
+        if meta_path.exists():
+            with open(meta_path, encoding='utf-8') as meta_file:
+                meta = json.load(meta_file)
+            entry = catalog.entry(self._data_category, self._data_name)
+            if entry is None or entry[catalog.LAST_UPDATE] != meta['last_update']:
+                self._meta = meta
+                catalog.register(self._data_category, self._data_name, self.index.to_series(),
+                                 meta['last_update'], meta.get('checksum'))
+                self._index = None
+            return meta
+        legacy_path = self.legacy_path
+        if legacy_path.exists():
+            with open(legacy_path, 'rb') as data_file:
+                data = pickle.load(data_file)
+            if isinstance(data.value, (pd.DataFrame, pd.Series)):
+                return self._save(data.value, data.last_update)
+        return None
+
+    @property
+    def columns(self):
+        """Наименования сохраненных колонок. Для pd.Series - список из одного наименования"""
+        if self._meta is None:
+            return None
+        return list(self._meta['columns'])
+
+    @property
+    def deltas(self):
+        """Количество дописанных сегментов, которые еще не объединены с основными данными"""
+        if self._meta is None:
+            return 0
+        return self._meta['deltas']
+
+    def _segments(self):
+        """Каталоги с основными данными и дописанными сегментами в порядке записи
+
+        Данные, сохраненные до появления поколений, хранятся в корне каталога с колонками
+        """
+        folder = self.data_path
+        generation = self._meta.get('generation')
+        base = folder if generation is None else folder / f'{BASE_PREFIX}{generation}'
+        return [base] + [folder / f'{DELTA_PREFIX}{number}' for number in range(1, self.deltas + 1)]
+
+    @property
+    def index(self):
+        """Индекс сохраненных данных"""
+        if self._meta is None:
+            return None
+        if self._index is None:
+            array = self._load_arrays(INDEX_FILE, self._meta['index_dtype'])
+            if self._meta['index_kind'] == DATETIME_INDEX:
+                self._index = pd.DatetimeIndex(array.view('datetime64[ns]'), name=self._meta['index_name'])
+            else:
+                self._index = pd.Index(array, name=self._meta['index_name'])
+        return self._index
+
+    def column(self, column):
+        """Загружает только одну колонку данных
+
+        Parameters
+        ----------
+        column
+            Наименование колонки
+
+        Returns
+        -------
+        pd.Series
+            Колонка с данными
+        """
+        position = self._meta['columns'].index(column)
+        array = self._load_arrays(f'{position}.npy', self._meta['dtypes'][position])
+        return pd.Series(array, index=self.index, name=column)
+
+    def _load_arrays(self, file: str, dtype: str):
+        """Загружает массив из основных данных и склеивает его с массивами из дописанных сегментов
+
+        Числовые массивы отображаются в память с копированием при записи
+        """
+        if dtype == 'object':
+            arrays = [np.load(folder / file, allow_pickle=True) for folder in self._segments()]
+        else:
+            arrays = [np.load(folder / file, mmap_mode='c') for folder in self._segments()]
+        if len(arrays) == 1:
+            return arrays[0]
+        return np.concatenate(arrays)
+
+    @property
+    def value(self):
+        """Возвращает сохраненное значение данных. Если сохраненного значения нет, то None"""
+        if self._meta is None:
+            return None
+        if self._value is None:
+            columns = self._meta['columns']
+            if self._meta['kind'] == SERIES:
+                self._value = self.column(columns[0]).rename(self._meta['name'])
+            else:
+                self._value = pd.DataFrame({column: self.column(column) for column in columns},
+                                           index=self.index,
+                                           columns=columns)
+        return self._value
+
+    @value.setter
+    def value(self, value):
+        """Сохраняет новое значение данных"""
+        self._index = None
+        self._value = None
+        self._meta = self._save(value)
+
+    @property
+    def last_update(self):
+        """Время обновления данных - epoch. Если сохраненного значения нет, то None"""
+        if self._meta is None:
+            return None
+        return self._meta['last_update']
+
+    def append(self, value):
+        """Дописывает новые строки в отдельный небольшой сегмент рядом с основными данными
+
+        Читающие данные склеивают основные данные и сегменты автоматически. При достижении MAX_DELTAS сегментов, а так
+        же при несовпадении колонок или их типов, данные полностью перезаписываются с объединением всех сегментов
+        Время обновления данных обновляется даже при отсутствии новых строк
+        """
+        if self._meta is None:
+            self.value = value
+            return
+        kind, _, frame, index_kind, index_array = _split(value)
+        meta = self._meta
+        if len(frame):
+            dtypes = [str(frame.iloc[:, position].values.dtype) for position in range(frame.shape[1])]
+            compatible = (kind == meta['kind'] and list(frame.columns) == meta['columns'] and dtypes == meta['dtypes']
+                          and index_kind == meta['index_kind'] and str(index_array.dtype) == meta['index_dtype'])
+            if not compatible or meta['deltas'] + 1 >= MAX_DELTAS:
+                self.value = pd.concat([self.value, value])
+                return
+            number = meta['deltas'] + 1
+            folder = self.data_path / f'{DELTA_PREFIX}{number}'
+            if not folder.exists():
+                folder.mkdir(exist_ok=True)
+            arrays = _save_segment(folder, frame, index_array)
+            meta['deltas'] = number
+            meta['checksum'] = catalog.make_checksum(index_array, *arrays, previous=meta.get('checksum'))
+        meta['last_update'] = time.time()
+        _save_json(self.data_path / META_FILE, meta)
+        catalog.register_append(self._data_category, self._data_name, frame, meta['last_update'], meta['checksum'])
+        self._index = None
+        self._value = None
+
+    def compact(self):
+        """Объединяет дописанные сегменты с основными данными"""
+        if self.deltas:
+            last_update = self.last_update
+            value = self.value
+            self._index = None
+            self._value = None
+            self._meta = self._save(value, last_update)
+
+    def _save(self, value, last_update=None):
+        """Сохраняет колонки, индекс и служебную информацию и возвращает служебную информацию
+
+        Колонки сохраняются в каталог нового поколения, а после записи служебной информации удаляются предыдущие
+        поколения, дописанные ранее сегменты и колонки, сохраненные до появления поколений
+        """
+        kind, name, frame, index_kind, index_array = _split(value)
+        folder = self.data_path
+        generation = 1 + max([int(path.name[len(BASE_PREFIX):]) for path in folder.glob(f'{BASE_PREFIX}*')
+                              if path.name[len(BASE_PREFIX):].isdigit()], default=0)
+        base = folder / f'{BASE_PREFIX}{generation}'
+        base.mkdir()
+        arrays = _save_segment(base, frame, index_array)
+        meta = dict(last_update=time.time() if last_update is None else last_update,
+                    kind=kind,
+                    name=name,
+                    columns=list(frame.columns),
+                    dtypes=[str(array.dtype) for array in arrays],
+                    index_name=frame.index.name,
+                    index_kind=index_kind,
+                    index_dtype=str(index_array.dtype),
+                    deltas=0,
+                    generation=generation,
+                    checksum=catalog.make_checksum(index_array, *arrays))
+        _save_json(folder / META_FILE, meta)
+        for path in folder.iterdir():
+            if path.is_dir() and path != base and path.name.startswith((DELTA_PREFIX, BASE_PREFIX)):
+                shutil.rmtree(path)
+            elif path.suffix == '.npy':
+                path.unlink()
+        catalog.register(self._data_category, self._data_name, frame, meta['last_update'], meta['checksum'])
+        return meta
+
+
+def _split(value):
+    """Разбивает pd.DataFrame или pd.Series на составляющие для хранения"""
+    name = None
+    if isinstance(value, pd.Series):
+        kind = SERIES
+        name = value.name
+        value = value.to_frame()
+    elif isinstance(value, pd.DataFrame):
+        kind = FRAME
+    else:
+        raise TypeError(f'ColumnarDataFile хранит только pd.DataFrame и pd.Series')
+    index = value.index
+    if isinstance(index, pd.DatetimeIndex):
+        return kind, name, value, DATETIME_INDEX, index.values.view('int64')
+    return kind, name, value, ARRAY_INDEX, index.values
+
+
+def _save_segment(folder, frame, index_array):
+    """Сохраняет индекс и колонки в каталог и возвращает массивы с сохраненными колонками"""
+    _save_array(folder / INDEX_FILE, index_array)
+    arrays = []
+    for position in range(frame.shape[1]):
+        array = frame.iloc[:, position].values
+        arrays.append(array)
+        _save_array(folder / f'{position}.npy', array)
+    return arrays
+
+
+def _save_array(path, array):
+    """Атомарно записывает массив в npy-файл"""
+    temp_path = path.with_name(path.name + '.tmp')
+    with open(temp_path, 'wb') as file:
+        np.save(file, array, allow_pickle=array.dtype == object)
+    os.replace(temp_path, path)
+
+
+def _save_json(path, data):
+    """Атомарно записывает json-файл"""
+    temp_path = path.with_name(path.name + '.tmp')
+    with open(temp_path, 'w', encoding='utf-8') as file:
+        json.dump(data, file, ensure_ascii=False)
+    os.replace(temp_path, path)
+
+
+if __name__ == '__main__':
+    print(ColumnarDataFile('quotes', 'AKRN').value)
@@ -1,8 +1,12 @@
 """Хранение локальных данных"""
 
 import pickle
+import time
+
+import pandas as pd
 
 import settings
+from utils import catalog
 from utils.data import Data
 
 PICKLE_VERSION = pickle.HIGHEST_PROTOCOL
@@ -15,6 +19,10 @@ class DataFile:
     Данные хранятся в каталоге установленном в глобальных настройках
     Каждая наименование данных в отдельной подкаталоге
     Каждый категория данных в отдельном файле в формате Pickle
+
+    Данные загружаются при первом обращении к ним, а время последнего обновления берется из каталога данных без
+    загрузки самих данных. Если данные не изменились, то время обновления может быть изменено только в каталоге без
+    перезаписи файла
     """
 
     def __init__(self, data_category, data_name: str):
@@ -29,17 +37,36 @@ class DataFile:
         """
         self._data_category = data_category
         self._data_name = data_name
-        if self.data_path.exists():
-            with open(self.data_path, 'rb') as data_file:
-                self._data = pickle.load(data_file)
-        else:
-            self._data = Data()
+        self._data = None
 
     def __str__(self):
         return (f'{self.__class__.__name__}('
                 f'data_category={self.data_category}, '
                 f'data_name={self.data_name}, '
-                f'data={self._data})')
+                f'data={self._load()})')
+
+    def _load(self):
+        """Загружает данные при первом обращении
+
+        Если данные отсутствуют в каталоге, их контрольная сумма не совпадает с каталогом или в каталоге указано более
+        раннее время обновления, то каталог обновляется. Более позднее время в каталоге означает, что данные
+        обновлялись без изменений с помощью touch
+        """
+        if self._data is None:
+            data_path = self.data_path
+            if data_path.exists():
+                with open(data_path, 'rb') as data_file:
+                    content = data_file.read()
+                self._data = pickle.loads(content)
+                checksum = catalog.make_checksum(content)
+                entry = catalog.entry(self._data_category, self._data_name)
+                if (entry is None or entry[catalog.CHECKSUM] != checksum or entry[catalog.LAST_UPDATE] is None
+                        or entry[catalog.LAST_UPDATE] < self._data.last_update):
+                    catalog.register(self._data_category, self._data_name, self._data.value,
+                                     self._data.last_update, checksum)
+            else:
+                self._data = Data()
+        return self._data
 
     @property
     def data_category(self):
@@ -61,7 +88,7 @@ class DataFile:
         if self._data_category is not None:
             folder = folder / self._data_name
         if not folder.exists():
-            folder.mkdir(parents=True)
+            folder.mkdir(parents=True, exist_ok=True)
         if self._data_category:
             file = f'{self._data_category}{DATA_FILE_EXTENSION}'
         else:
@@ -71,19 +98,52 @@ class DataFile:
     @property
     def value(self):
         """Возвращает сохраненное значение данных. Если сохраненного значения нет, то None"""
-        return self._data.value
+        return self._load().value
 
     @value.setter
     def value(self, value):
-        """Сохраняет новое значение данных"""
+        """Сохраняет новое значение данных и регистрирует его в каталоге"""
+        if self._data is None:
+            self._data = Data()
         self._data.value = value
+        content = pickle.dumps(self._data, protocol=PICKLE_VERSION)
         with open(self.data_path, 'wb') as data_file:
-            pickle.dump(self._data, data_file, protocol=PICKLE_VERSION)
+            data_file.write(content)
+        catalog.register(self._data_category, self._data_name, value,
+                         self._data.last_update, catalog.make_checksum(content))
 
     @property
     def last_update(self):
-        """Время обновления данных - epoch. Если сохраненного значения нет, то None"""
-        return self._data.last_update
+        """Время обновления данных - epoch. Если сохраненного значения нет, то None
+
+        Время берется из каталога, так как оно может быть обновлено без перезаписи данных. Данные загружаются, только
+        если они отсутствуют в каталоге
+        """
+        if self.data_path.exists():
+            entry = catalog.entry(self._data_category, self._data_name)
+            if entry is None:
+                self._load()
+                entry = catalog.entry(self._data_category, self._data_name)
+            if entry is not None:
+                return entry[catalog.LAST_UPDATE]
+        return self._load().last_update
+
+    def touch(self):
+        """Обновляет время обновления сохраненных данных, которые не изменились, без перезаписи файла"""
+        if self.last_update is not None:
+            catalog.touch(self._data_category, self._data_name, time.time())
+
+    def append(self, value):
+        """Дописывает новые строки к сохраненным pd.DataFrame или pd.Series
+
+        Формат Pickle не поддерживает частичную запись, поэтому данные перезаписываются полностью
+        """
+        if self.value is None:
+            self.value = value
+        elif len(value):
+            self.value = pd.concat([self.value, value])
+        else:
+            self.value = self.value
 
 
 if __name__ == '__main__':
@@ -6,6 +6,7 @@ import arrow
 import numpy as np
 import pandas as pd
 
+from utils import catalog
 from utils.data_file import DataFile
 
 # Часовой пояс MOEX
@@ -14,6 +15,41 @@ MARKET_TIME_ZONE = 'Europe/Moscow'
 END_OF_TRADING_DAY = dict(hour=19, minute=45, second=0, microsecond=0)
 
 
+def next_update(last_update):
+    """Время следующего планового обновления данных, обновленных в last_update - arrow в часовом поясе MOEX"""
+    last_update = arrow.get(last_update).to(MARKET_TIME_ZONE)
+    end_of_trading_day = last_update.replace(**END_OF_TRADING_DAY)
+    if last_update > end_of_trading_day:
+        return end_of_trading_day.shift(days=1)
+    return end_of_trading_day
+
+
+def stale_data(data_category, data_names):
+    """Названия данных, которые еще не созданы или требуют планового обновления
+
+    Для проверки используется только каталог данных, поэтому сами данные не загружаются
+
+    Parameters
+    ----------
+    data_category
+        Категория данных
+    data_names
+        Названия серий данных
+
+    Returns
+    -------
+    list
+        Названия серий данных, которые отсутствуют в каталоге или должны быть обновлены
+    """
+    now = arrow.now()
+    stale = []
+    for data_name in data_names:
+        entry = catalog.entry(data_category, data_name)
+        if entry is None or entry[catalog.LAST_UPDATE] is None or next_update(entry[catalog.LAST_UPDATE]) < now:
+            stale.append(data_name)
+    return stale
+
+
 class AbstractDataManager(ABC):
     """Организация создания, обновления и предоставления локальных DataFrame"""
 
@@ -22,6 +58,8 @@ class AbstractDataManager(ABC):
     is_monotonic = True
     # Нужно ли перезаписать новыми данными с нуля при обновлении
     update_from_scratch = False
+    # Формат хранения данных - DataFile или ColumnarDataFile для больших pd.DataFrame и pd.Series
+    data_file_class = DataFile
 
     def __init__(self, data_category, data_name: str):
         """
@@ -33,7 +71,7 @@ class AbstractDataManager(ABC):
         data_name
             Название серии данных
         """
-        self._data = DataFile(data_category, data_name)
+        self._data = self.data_file_class(data_category, data_name)
         if self._data.last_update is None:
             self.create()
         elif self.next_update < arrow.now():
@@ -68,11 +106,7 @@ class AbstractDataManager(ABC):
     @property
     def next_update(self):
         """Время следующего планового обновления данных - arrow в часовом поясе MOEX"""
-        last_update = self.last_update
-        end_of_trading_day = last_update.replace(**END_OF_TRADING_DAY)
-        if last_update > end_of_trading_day:
-            return end_of_trading_day.shift(days=1)
-        return end_of_trading_day
+        return next_update(self.last_update)
 
     @abstractmethod
     def download_all(self):
@@ -110,6 +144,7 @@ class AbstractDataManager(ABC):
         При наличии флага перезапись с нуля используется метод создания новых данных
         При отсутствии реализации функции частичной загрузки данных будет осуществлена их полная загрузка
         Во время обновления проверяется совпадение новых данных со существующими
+        Если новые строки идут строго после существующих, то они дописываются без перезаписи всей истории
         Индекс всех данных проверяется на уникальность и монотонность
         """
         if self.update_from_scratch:
@@ -122,10 +157,28 @@ class AbstractDataManager(ABC):
         except NotImplementedError:
             df_new = self.download_all()
         self._validate_new(df_old, df_new)
-        old_elements = df_old.index.difference(df_new.index)
-        df = df_old.loc[old_elements].append(df_new)
-        self._validate_index(df)
-        self._data.value = df
+        df_append = df_new[~df_new.index.isin(df_old.index)]
+        if self._is_appendable(df_old, df_append):
+            self._data.append(df_append)
+        else:
+            old_elements = df_old.index.difference(df_new.index)
+            df = df_old.loc[old_elements].append(df_new)
+            self._validate_index(df)
+            self._data.value = df
+
+    def _is_appendable(self, df_old, df_append):
+        """Проверяет, что новые строки можно дописать в конец существующих данных без их перезаписи
+
+        Для этого индекс данных должен возрастать монотонно, а новые строки идти строго после существующих
+        """
+        if not self.is_monotonic or len(df_old) == 0:
+            return False
+        if len(df_append) == 0:
+            return True
+        index = df_append.index
+        if self.is_unique and not index.is_unique:
+            return False
+        return index.is_monotonic_increasing and index[0] > df_old.index[-1]
 
     def _validate_new(self, df_old, df_new):
         """Проверяет соответствие новых данных существующим"""
@@ -1,5 +1,7 @@
 import pandas as pd
+import pytest
 
+from utils.aggregation import Freq
 from utils.aggregation import monthly_aggregator, monthly_aggregation_func, quarterly_aggregator, \
     quarterly_aggregation_func
 from utils.aggregation import yearly_aggregator, yearly_aggregation_func
@@ -68,3 +70,34 @@ def test_monthly_aggregation_func():
     assert result(pd.Timestamp('2014-01-31')) == pd.Timestamp('2014-02-11')
     assert result(pd.Timestamp('2012-02-28')) == pd.Timestamp('2012-03-11')
     assert result(pd.Timestamp('2015-09-13')) == pd.Timestamp('2015-10-11')
+
+
+END_DATES = ['2018-10-24', '2012-02-29', '2013-02-28', '2013-01-31', '2013-03-31', '2013-04-30', '2013-12-31',
+             '2014-06-01']
+
+
+@pytest.mark.parametrize('freq', list(Freq))
+@pytest.mark.parametrize('end_date', END_DATES)
+def test_labels_match_aggregation_func(freq, end_date):
+    end_date = pd.Timestamp(end_date)
+    index = pd.date_range('2011-01-01', '2016-12-31', freq='D', name='DATE')
+    labels = freq.labels(index, end_date)
+    assert isinstance(labels, pd.DatetimeIndex)
+    assert labels.name == 'DATE'
+    assert labels.equals(index.map(freq.aggregation_func(end_date)))
+
+
+def test_labels_keep_time():
+    index = pd.DatetimeIndex(['2018-01-31 10:00', '2018-02-28 23:59', '2018-03-01 00:01'])
+    labels = Freq.monthly.labels(index, pd.Timestamp('2018-10-31'))
+    assert labels.equals(pd.DatetimeIndex(['2018-01-31 10:00', '2018-02-28 23:59', '2018-03-31 00:01']))
+
+
+def test_labels_groupby():
+    index = pd.date_range('2017-01-01', '2018-12-31', freq='D', name='DATE')
+    df = pd.DataFrame({'A': range(len(index))}, index=index)
+    end_date = pd.Timestamp('2018-12-15')
+    for freq in Freq:
+        expected = df.groupby(by=freq.aggregation_func(end_date)).sum()
+        result = df.groupby(by=freq.labels(df.index, end_date)).sum()
+        pd.testing.assert_frame_equal(result, expected)
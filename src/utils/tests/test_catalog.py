@@ -0,0 +1,110 @@
+import pickle
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import settings
+from utils import catalog
+from utils.columnar_data_file import ColumnarDataFile
+from utils.data import Data
+from utils.data_file import DataFile
+
+FRAME = pd.DataFrame(data={'CLOSE_PRICE': [1.5, 2.5, 3.5]},
+                     index=pd.DatetimeIndex(['2018-01-03', '2018-01-04', '2018-01-05'], name='DATE'))
+
+
+@pytest.fixture(autouse=True)
+def make_temp_dir(tmpdir, monkeypatch):
+    monkeypatch.setattr(settings, 'DATA_PATH', Path(tmpdir))
+
+
+def test_no_entry():
+    assert catalog.entry('cat1', 'data1') is None
+    assert catalog.catalog().empty
+
+
+def test_data_file_register():
+    data = DataFile('cat1', 'data1')
+    data.value = FRAME
+    entry = catalog.entry('cat1', 'data1')
+    assert entry[catalog.LAST_UPDATE] == data.last_update
+    assert entry[catalog.ROWS] == 3
+    assert entry[catalog.FIRST] == '2018-01-03T00:00:00'
+    assert entry[catalog.LAST] == '2018-01-05T00:00:00'
+    with open(data.data_path, 'rb') as file:
+        assert entry[catalog.CHECKSUM] == catalog.make_checksum(file.read())
+
+
+def test_not_pandas_register():
+    DataFile(None, 'data2').value = 42
+    entry = catalog.entry(None, 'data2')
+    assert entry[catalog.ROWS] is None
+    assert entry[catalog.FIRST] is None
+
+
+def test_legacy_file_register():
+    folder = settings.DATA_PATH / 'data3'
+    folder.mkdir()
+    legacy = Data(FRAME)
+    path = DataFile('cat1', 'data3').data_path
+    with open(path, 'wb') as file:
+        pickle.dump(legacy, file)
+    assert catalog.entry('cat1', 'data3') is None
+    assert DataFile('cat1', 'data3').last_update == legacy.last_update
+    assert catalog.entry('cat1', 'data3')[catalog.LAST_UPDATE] == legacy.last_update
+
+
+def test_columnar_append():
+    data = ColumnarDataFile('cat2', 'data1')
+    data.value = FRAME
+    checksum = catalog.entry('cat2', 'data1')[catalog.CHECKSUM]
+    new = pd.DataFrame(data={'CLOSE_PRICE': [4.5]}, index=pd.DatetimeIndex(['2018-01-08'], name='DATE'))
+    data.append(new)
+    entry = catalog.entry('cat2', 'data1')
+    assert entry[catalog.ROWS] == 4
+    assert entry[catalog.FIRST] == '2018-01-03T00:00:00'
+    assert entry[catalog.LAST] == '2018-01-08T00:00:00'
+    assert entry[catalog.LAST_UPDATE] == data.last_update
+    assert entry[catalog.CHECKSUM] != checksum
+    assert entry[catalog.CHECKSUM] == catalog.make_checksum(new.index.values.view('int64'),
+                                                            new['CLOSE_PRICE'].values,
+                                                            previous=checksum)
+
+
+def test_columnar_self_heal():
+    ColumnarDataFile('cat2', 'data2').value = FRAME
+    catalog.catalog_path().unlink()
+    data = ColumnarDataFile('cat2', 'data2')
+    entry = catalog.entry('cat2', 'data2')
+    assert entry[catalog.LAST_UPDATE] == data.last_update
+    assert entry[catalog.ROWS] == 3
+
+
+def test_catalog_frame():
+    DataFile('cat3', 'data1').value = FRAME
+    DataFile('cat3', 'data2').value = FRAME.iloc[:2]
+    DataFile('cat4', 'data1').value = FRAME
+    df = catalog.catalog('cat3')
+    assert list(df.index) == ['data1', 'data2']
+    assert list(df[catalog.ROWS]) == [3, 2]
+    assert len(catalog.catalog()) == 3
+
+
+def test_checksum_object_arrays():
+    array = np.array(['a', 'b'], dtype=object)
+    assert catalog.make_checksum(array) == catalog.make_checksum(array.copy())
+
+
+def register_many(process: int):
+    for number in range(20):
+        catalog.register(f'cat{process}', f'data{number}', FRAME, float(number), str(number))
+
+
+def test_register_processes():
+    with ProcessPoolExecutor(max_workers=4) as executor:
+        list(executor.map(register_many, range(4)))
+    assert len(catalog.catalog()) == 4 * 20
+    assert not list(settings.DATA_PATH.glob('*.tmp'))
@@ -0,0 +1,231 @@
+import json
+import pickle
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+import pytest
+
+import settings
+from utils import columnar_data_file
+from utils.columnar_data_file import ColumnarDataFile
+from utils.data import Data
+from utils.data_file import DATA_FILE_EXTENSION
+
+FRAME = pd.DataFrame(data={'CLOSE_PRICE': [1.5, 2.5, np.nan], 'VOLUME': [10, 20, 30], 'TEXT': ['a', 'b', 'c']},
+                     index=pd.DatetimeIndex(['2018-01-03', '2018-01-04', '2018-01-05'], name='DATE'))
+
+
+save_json = columnar_data_file._save_json
+
+
+@pytest.fixture(autouse=True)
+def make_temp_dir(tmpdir, monkeypatch):
+    monkeypatch.setattr(settings, 'DATA_PATH', Path(tmpdir))
+
+
+def test_no_data():
+    data = ColumnarDataFile('cat1', 'data1')
+    assert data.value is None
+    assert data.last_update is None
+    assert data.columns is None
+    assert data.index is None
+    assert data.data_path.parts[-1] == 'cat1.columns'
+    assert data.data_path.parts[-2] == 'data1'
+
+
+def test_data_path_no_cat():
+    data = ColumnarDataFile(None, 'data1')
+    assert data.data_path.parts[-1] == 'data1.columns'
+    assert data.data_path.parent == settings.DATA_PATH
+
+
+def test_save_and_load_frame():
+    time0 = time.time()
+    data = ColumnarDataFile('cat1', 'data1')
+    data.value = FRAME
+    assert data.value.equals(FRAME)
+    assert data.last_update >= time0
+
+    data = ColumnarDataFile('cat1', 'data1')
+    assert data.value.equals(FRAME)
+    assert data.value.index.name == 'DATE'
+    assert list(data.value.columns) == ['CLOSE_PRICE', 'VOLUME', 'TEXT']
+    assert data.value['VOLUME'].dtype == np.int64
+    assert data.last_update >= time0
+
+
+def test_load_one_column():
+    data = ColumnarDataFile('cat1', 'data1')
+    data.value = FRAME
+    data = ColumnarDataFile('cat1', 'data1')
+    column = data.column('VOLUME')
+    assert column.equals(FRAME['VOLUME'])
+    assert data.columns == ['CLOSE_PRICE', 'VOLUME', 'TEXT']
+    assert isinstance(data.index, pd.DatetimeIndex)
+
+
+def test_loaded_value_is_writable():
+    data = ColumnarDataFile('cat1', 'data1')
+    data.value = FRAME
+    df = ColumnarDataFile('cat1', 'data1').value
+    df.iloc[0, 0] = 100.0
+    assert ColumnarDataFile('cat1', 'data1').value.iloc[0, 0] == 1.5
+
+
+def test_series():
+    series = pd.Series([1.0, 2.0], index=pd.DatetimeIndex(['2018-01-03', '2018-01-04'], name='DATE'), name='AKRN')
+    data = ColumnarDataFile('cat2', 'data1')
+    data.value = series
+    loaded = ColumnarDataFile('cat2', 'data1').value
+    assert isinstance(loaded, pd.Series)
+    assert loaded.name == 'AKRN'
+    assert loaded.equals(series)
+
+
+def test_not_pandas():
+    data = ColumnarDataFile('cat3', 'data1')
+    with pytest.raises(TypeError):
+        data.value = 42
+
+
+def test_convert_legacy_file():
+    folder = settings.DATA_PATH / 'data2'
+    folder.mkdir()
+    legacy = Data(FRAME)
+    with open(folder / f'cat1{DATA_FILE_EXTENSION}', 'wb') as file:
+        pickle.dump(legacy, file)
+    data = ColumnarDataFile('cat1', 'data2')
+    assert data.last_update == legacy.last_update
+    assert data.value.equals(FRAME)
+    assert (data.data_path / 'meta.json').exists()
+
+
+def test_str():
+    assert str(ColumnarDataFile('cat4', 'data3')) == ('ColumnarDataFile(data_category=cat4, data_name=data3, '
+                                                      'last_update=None)')
+
+
+def make_rows(start, periods):
+    index = pd.date_range(start, periods=periods, freq='D', name='DATE')
+    return pd.DataFrame(data={'CLOSE_PRICE': np.arange(periods, dtype=float),
+                              'VOLUME': np.arange(periods, dtype=np.int64)},
+                        index=index)
+
+
+def test_append_delta():
+    base = make_rows('2018-01-01', 5)
+    new = make_rows('2018-01-06', 2)
+    data = ColumnarDataFile('cat5', 'data1')
+    data.value = base
+    time0 = data.last_update
+    data.append(new)
+    assert data.deltas == 1
+    assert (data.data_path / 'delta1' / 'index.npy').exists()
+    assert data.last_update > time0
+
+    data = ColumnarDataFile('cat5', 'data1')
+    assert data.deltas == 1
+    assert data.value.equals(pd.concat([base, new]))
+    assert data.column('VOLUME').equals(pd.concat([base, new])['VOLUME'])
+
+
+def test_append_empty():
+    data = ColumnarDataFile('cat5', 'data1')
+    data.value = make_rows('2018-01-01', 5)
+    time0 = data.last_update
+    data.append(make_rows('2018-01-06', 0))
+    assert data.deltas == 0
+    assert data.last_update > time0
+    assert ColumnarDataFile('cat5', 'data1').last_update == data.last_update
+
+
+def test_append_to_empty_file():
+    data = ColumnarDataFile('cat5', 'data1')
+    data.append(make_rows('2018-01-01', 3))
+    assert data.deltas == 0
+    assert data.value.equals(make_rows('2018-01-01', 3))
+
+
+def test_append_other_dtypes():
+    data = ColumnarDataFile('cat5', 'data1')
+    data.value = make_rows('2018-01-01', 5)
+    new = make_rows('2018-01-06', 2)
+    new['VOLUME'] = new['VOLUME'].astype(float)
+    data.append(new)
+    assert data.deltas == 0
+    assert data.value.equals(pd.concat([make_rows('2018-01-01', 5), new]))
+
+
+def test_auto_compaction(monkeypatch):
+    monkeypatch.setattr(columnar_data_file, 'MAX_DELTAS', 3)
+    data = ColumnarDataFile('cat5', 'data1')
+    data.value = make_rows('2018-01-01', 5)
+    data.append(make_rows('2018-01-06', 1))
+    data.append(make_rows('2018-01-07', 1))
+    assert data.deltas == 2
+    data.append(make_rows('2018-01-08', 1))
+    assert data.deltas == 0
+    assert not (data.data_path / 'delta1').exists()
+    expected = pd.concat([make_rows('2018-01-01', 5),
+                          make_rows('2018-01-06', 1),
+                          make_rows('2018-01-07', 1),
+                          make_rows('2018-01-08', 1)])
+    assert ColumnarDataFile('cat5', 'data1').value.equals(expected)
+
+
+def test_compact():
+    data = ColumnarDataFile('cat5', 'data1')
+    data.value = make_rows('2018-01-01', 5)
+    data.append(make_rows('2018-01-06', 2))
+    last_update = data.last_update
+    data.compact()
+    assert data.deltas == 0
+    assert data.last_update == last_update
+    expected = pd.concat([make_rows('2018-01-01', 5), make_rows('2018-01-06', 2)])
+    assert ColumnarDataFile('cat5', 'data1').value.equals(expected)
+
+
+def test_interrupted_rewrite(monkeypatch):
+    data = ColumnarDataFile('cat6', 'data1')
+    data.value = make_rows('2018-01-01', 5)
+    data.append(make_rows('2018-01-06', 1))
+    assert data.deltas == 1
+
+    def fail(path, meta):
+        raise OSError
+
+    monkeypatch.setattr(columnar_data_file, '_save_json', fail)
+    with pytest.raises(OSError):
+        ColumnarDataFile('cat6', 'data1').value = make_rows('2018-02-01', 3)[['VOLUME']]
+    monkeypatch.setattr(columnar_data_file, '_save_json', save_json)
+    expected = pd.concat([make_rows('2018-01-01', 5), make_rows('2018-01-06', 1)])
+    assert ColumnarDataFile('cat6', 'data1').value.equals(expected)
+
+
+def test_rewrite_removes_old_files():
+    data = ColumnarDataFile('cat6', 'data1')
+    data.value = make_rows('2018-01-01', 5)
+    data.append(make_rows('2018-01-06', 1))
+    data.value = make_rows('2018-02-01', 3)[['VOLUME']]
+    files = sorted(path.relative_to(data.data_path).as_posix() for path in data.data_path.rglob('*'))
+    assert files == ['base2', 'base2/0.npy', 'base2/index.npy', 'meta.json']
+    assert ColumnarDataFile('cat6', 'data1').value.equals(make_rows('2018-02-01', 3)[['VOLUME']])
+
+
+def test_layout_without_generations():
+    data = ColumnarDataFile('cat6', 'data1')
+    data.value = FRAME
+    folder = data.data_path
+    for path in (folder / 'base1').iterdir():
+        path.rename(folder / path.name)
+    (folder / 'base1').rmdir()
+    meta = json.loads((folder / 'meta.json').read_text())
+    del meta['generation']
+    (folder / 'meta.json').write_text(json.dumps(meta))
+    data = ColumnarDataFile('cat6', 'data1')
+    assert data.value.equals(FRAME)
+    data.value = FRAME.iloc[:2]
+    assert sorted(path.name for path in folder.iterdir()) == ['base1', 'meta.json']
+    assert ColumnarDataFile('cat6', 'data1').value.equals(FRAME.iloc[:2])
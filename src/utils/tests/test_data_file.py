@@ -1,6 +1,8 @@
+import pickle
 import time
 from pathlib import Path
 
+import pandas as pd
 import pytest
 
 import settings
@@ -53,3 +55,41 @@ def test_data_path_no_cat():
 def test_str():
     result = 'DataFile(data_category=cat2, data_name=data3, data=Data(value=None, last_update=None))'
     assert str(DataFile('cat2', 'data3')) == result
+
+
+def test_append():
+    data = DataFile('cat5', 'data5')
+    data.append(pd.Series([1, 2], index=[0, 1]))
+    assert data.value.equals(pd.Series([1, 2], index=[0, 1]))
+    time0 = data.last_update
+    data.append(pd.Series([3], index=[2]))
+    assert data.value.equals(pd.Series([1, 2, 3]))
+    assert data.last_update >= time0
+    data.append(pd.Series([], dtype='int64'))
+    assert DataFile('cat5', 'data5').value.equals(pd.Series([1, 2, 3]))
+
+
+def test_lazy_load_from_catalog(monkeypatch):
+    data = DataFile('cat6', 'data6')
+    data.value = 5
+    last_update = data.last_update
+
+    def fail_load(_):
+        raise AssertionError('Данные не должны загружаться')
+
+    monkeypatch.setattr(pickle, 'loads', fail_load)
+    assert DataFile('cat6', 'data6').last_update == last_update
+
+
+def test_touch():
+    data = DataFile('cat7', 'data7')
+    data.value = pd.Series([1, 2])
+    last_update = data.last_update
+    mtime = data.data_path.stat().st_mtime_ns
+    time.sleep(0.01)
+    data.touch()
+    assert data.last_update > last_update
+    assert data.data_path.stat().st_mtime_ns == mtime
+    loaded = DataFile('cat7', 'data7')
+    assert loaded.value.equals(pd.Series([1, 2]))
+    assert loaded.last_update == data.last_update
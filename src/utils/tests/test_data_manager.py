@@ -6,6 +6,7 @@ import pytest
 
 import settings
 from utils import data_manager
+from utils.columnar_data_file import ColumnarDataFile
 
 
 @pytest.fixture(scope='module', autouse=True)
@@ -143,3 +144,28 @@ def test_utcoffset(data_manager_class):
     data = data_manager_class('cat8', 'data5')
     assert data.last_update.utcoffset().seconds == 10800
     assert data.next_update.utcoffset().seconds == 10800
+
+
+def test_append_update():
+    class DataManager(data_manager.AbstractDataManager):
+        data_file_class = ColumnarDataFile
+
+        def download_all(self):
+            return pd.Series(data=[1.0, 2.0], index=[2, 5])
+
+        def download_update(self):
+            return pd.Series(data=[2.0, 4.0, 6.0], index=[5, 6, 7])
+
+    data = DataManager('cat3', 'data8')
+    data.update()
+    assert data._data.deltas == 1
+    assert data.value.equals(pd.Series(data=[1.0, 2.0, 4.0, 6.0], index=[2, 5, 6, 7]))
+    assert DataManager('cat3', 'data8').value.equals(pd.Series(data=[1.0, 2.0, 4.0, 6.0], index=[2, 5, 6, 7]))
+
+
+def test_stale_data(monkeypatch, data_manager_class):
+    data_manager_class('cat9', 'data1')
+    assert data_manager.stale_data('cat9', ['data1', 'data2']) == ['data2']
+    time = arrow.now().shift(days=1).replace(hour=20)
+    monkeypatch.setattr(arrow, 'now', lambda: time)
+    assert data_manager.stale_data('cat9', ['data1', 'data2']) == ['data1', 'data2']
@@ -8,7 +8,7 @@ from selenium.webdriver.support import expected_conditions
 from selenium.webdriver.support import wait
 
 from web.dividends import parser
-from web.dividends.parser import date_parser, div_parser
+from web.dividends.parser import date_column_parser, div_column_parser
 from web.labels import DATE
 
 # Время ожидания загрузки
@@ -29,18 +29,21 @@ HEADER_SIZE = 2
 DATE_COLUMN = parser.DataColumn(5,
                                 {0: 'Дата закрытия реестра акционеров',
                                  1: 'Под выплату дивидендов'},
-                                date_parser)
+                                date_column_parser,
+                                True)
 
 COMMON_TICKER_LENGTH = 4
 COMMON_COLUMN = parser.DataColumn(7,
                                   {0: 'Размер дивидендов\nна одну акцию, руб.',
                                    1: 'АОИ'},
-                                  div_parser)
+                                  div_column_parser,
+                                  True)
 PREFERRED_TICKER_ENDING = 'P'
 PREFERRED_COLUMN = parser.DataColumn(8,
                                      {0: 'Размер дивидендов\nна одну акцию, руб.',
                                       1: 'АПИ'},
-                                     div_parser)
+                                     div_column_parser,
+                                     True)
 
 
 def xpath_await(driver, xpath: str, waiting_time: int = WAITING_TIME):
@@ -68,14 +71,50 @@ def load_dividends_table(driver):
     xpath_await(driver, DIVIDENDS_TABLE)
 
 
-def get_html(ticker: str):
-    """Возвращает html-код страницы с данными по дивидендам с сайта https://www.conomy.ru/"""
-    driver_options = options.Options()
-    driver_options.headless = True
-    with webdriver.Firefox(options=driver_options) as driver:
-        load_ticker_page(driver, ticker)
-        load_dividends_table(driver)
-        return driver.page_source
+class Browser:
+    """Браузер без графического интерфейса для загрузки нескольких страниц
+
+    Запускается при первом обращении, поэтому при отсутствии необходимости загрузки данных не создается. Может
+    использоваться как контекстный менеджер, закрывающий браузер при выходе
+    """
+
+    def __init__(self):
+        self._driver = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        self.close()
+
+    @property
+    def driver(self):
+        """Запущенный браузер"""
+        if self._driver is None:
+            driver_options = options.Options()
+            driver_options.headless = True
+            self._driver = webdriver.Firefox(options=driver_options)
+        return self._driver
+
+    def close(self):
+        """Закрывает браузер, если он был запущен"""
+        if self._driver is not None:
+            self._driver.quit()
+            self._driver = None
+
+
+def get_html(ticker: str, browser: Browser = None):
+    """Возвращает html-код страницы с данными по дивидендам с сайта https://www.conomy.ru/
+
+    Если браузер не передан, то для загрузки запускается отдельный браузер
+    """
+    if browser is None:
+        with Browser() as browser:
+            return get_html(ticker, browser)
+    driver = browser.driver
+    load_ticker_page(driver, ticker)
+    load_dividends_table(driver)
+    return driver.page_source
 
 
 def is_common(ticker: str):
@@ -87,13 +126,15 @@ def is_common(ticker: str):
     raise ValueError(f'Некорректный тикер {ticker}')
 
 
-def dividends_conomy(ticker: str):
+def dividends_conomy(ticker: str, browser: Browser = None):
     """Возвращает Series с дивидендами упорядоченными по возрастанию даты закрытия реестра
 
     Parameters
     ----------
     ticker
         Тикер
+    browser
+        Браузер для загрузки страницы - позволяет загружать данные нескольких тикеров в одном браузере
 
     Returns
     -------
@@ -101,7 +142,7 @@ def dividends_conomy(ticker: str):
         Строки - даты закрытия реестра упорядоченные по возрастанию
         Значения - дивиденды
     """
-    html = get_html(ticker)
+    html = get_html(ticker, browser)
     table = parser.HTMLTableParser(html, TABLE_INDEX)
     columns = [DATE_COLUMN]
     if is_common(ticker):
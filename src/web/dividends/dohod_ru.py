@@ -1,10 +1,9 @@
 """Загружает дивиденды и даты закрытия с сайта www.dohod.ru"""
-import ssl
 import urllib.error
-import urllib.request
 
 import pandas as pd
 
+from web import session
 from web.dividends import parser
 from web.labels import DATE
 
@@ -13,11 +12,13 @@ HEADER_SIZE = 1
 
 DATE_COLUMN = parser.DataColumn(0,
                                 {0: 'Дата закрытия реестра'},
-                                parser.date_parser)
+                                parser.date_column_parser,
+                                True)
 
 DIVIDENDS_COLUMN = parser.DataColumn(2,
                                      {0: 'Дивиденд (руб.)'},
-                                     parser.div_parser)
+                                     parser.div_column_parser,
+                                     True)
 
 
 def make_url(ticker: str):
@@ -29,8 +30,7 @@ def make_url(ticker: str):
 def get_html(url: str):
     """Получает html-код для url"""
     try:
-        with urllib.request.urlopen(url, context=ssl.SSLContext()) as response:
-            return response.read()
+        return session.get(url, verify=False)
     except urllib.error.HTTPError as error:
         if error.code == 404:
             raise urllib.error.URLError(f'Неверный url: {url}')
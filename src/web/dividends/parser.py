@@ -1,12 +1,14 @@
 """Парсер html-таблиц"""
 import re
+from html.parser import HTMLParser
 from typing import NamedTuple, Callable
 
-import bs4
+import numpy as np
 import pandas as pd
 
 DIV_PATTERN = r'.*\d'
 DATE_PATTERN = r'\d{2}\.\d{2}\.\d{4}'
+DATE_FORMAT = '%d.%m.%Y'
 
 
 class DataColumn(NamedTuple):
@@ -20,11 +22,15 @@ class DataColumn(NamedTuple):
     validation_dict
         Словарь должен содержать индекс строки и ожидаемое значение
     parser_func
-        Функция для преобразования значений с одним аргументом str
+        Функция для преобразования значений с одним аргументом str или, если vectorized, функция для преобразования
+        всего столбца с одним аргументом pd.Series со строками
+    vectorized
+        Преобразуется ли столбец целиком
     """
     index: int
     validation_dict: dict
     parser_func: Callable
+    vectorized: bool = False
 
 
 def date_parser(data: str):
@@ -46,22 +52,180 @@ def div_parser(data: str):
     return None
 
 
+def date_column_parser(data: pd.Series):
+    """Функция парсинга всей колонки с датами закрытия реестра - при отсутствии даты NaT"""
+    result = data.str.extract(f'({DATE_PATTERN})', expand=False)
+    return pd.to_datetime(result, format=DATE_FORMAT)
+
+
+def div_column_parser(data: pd.Series):
+    """Функция парсинга всей колонки с дивидендами - при отсутствии значения NaN"""
+    result = data.str.extract(f'({DIV_PATTERN})', expand=False)
+    result = result.str.replace(',', '.', regex=False)
+    result = result.str.replace(' ', '', regex=False)
+    return result.astype('float64')
+
+
+# Размер фрагмента html-кода, передаваемого потоковому парсеру - после окончания нужной таблицы парсинг прекращается
+CHUNK_SIZE = 1 << 16
+# Поиск кодировки в начале html-кода и кодировки, используемые при ее отсутствии
+CHARSET_PATTERN = rb'charset\s*=\s*["\']?([\w-]+)'
+CHARSET_SEARCH_SIZE = 4096
+DEFAULT_ENCODINGS = ('utf-8', 'cp1251')
+
+# Пробельные символы, из которых состоит текст между тегами, заменяемый одним пробелом или переводом строки
+ASCII_SPACES = ' \n\t\x0c\r'
+
+# Состояния поиска tbody в таблице
+TBODY_NOT_SEEN = 0
+TBODY_OPEN = 1
+TBODY_CLOSED = 2
+
+
+def decode_html(html):
+    """Декодирует html-код с учетом указанной в нем кодировки"""
+    if isinstance(html, str):
+        return html
+    encodings = list(DEFAULT_ENCODINGS)
+    declared = re.search(CHARSET_PATTERN, html[:CHARSET_SEARCH_SIZE], re.IGNORECASE)
+    if declared:
+        encodings.insert(0, declared.group(1).decode('ascii'))
+    for encoding in encodings:
+        try:
+            return html.decode(encoding)
+        except (LookupError, UnicodeDecodeError):
+            pass
+    return html.decode(DEFAULT_ENCODINGS[0], errors='replace')
+
+
+class _TableExtractor(HTMLParser):
+    """Потоковый поиск таблицы с заданным номером на странице и сбор ее ячеек
+
+    Таблицы нумеруются в порядке открывающих тегов. Для каждой строки таблицы запоминаются ячейки в виде текста,
+    rowspan и colspan, а так же признак нахождения строки в первом tbody. Содержимое вложенных таблиц считается
+    текстом ячейки, в которой они находятся. Текст между тегами, состоящий только из пробельных символов, заменяется
+    переводом строки, если он его содержит, или пробелом
+    """
+
+    def __init__(self, table_index: int):
+        super().__init__(convert_charrefs=True)
+        self._table_index = table_index
+        self._tables = 0
+        self._depth = 0
+        self._tbody = TBODY_NOT_SEEN
+        self._row = None
+        self._cell = None
+        self._text = []
+        self.found = False
+        self.done = False
+        self.rows = []
+
+    @property
+    def has_tbody(self):
+        """Есть ли в таблице tbody"""
+        return self._tbody != TBODY_NOT_SEEN
+
+    def handle_starttag(self, tag, attrs):
+        self._flush_text()
+        if tag == 'table':
+            if self._depth:
+                self._depth += 1
+            else:
+                if self._tables == self._table_index:
+                    self.found = True
+                    self._depth = 1
+                self._tables += 1
+        elif self._depth != 1:
+            return
+        elif tag == 'tbody':
+            if self._tbody == TBODY_NOT_SEEN:
+                self._tbody = TBODY_OPEN
+        elif tag == 'tr':
+            self._close_row()
+            self._row = []
+        elif tag in ('td', 'th'):
+            self._close_cell()
+            if self._row is None:
+                self._row = []
+            attrs = dict(attrs)
+            self._cell = ([], int(attrs.get('rowspan') or 1), int(attrs.get('colspan') or 1))
+
+    def handle_endtag(self, tag):
+        self._flush_text()
+        if tag == 'table' and self._depth:
+            self._depth -= 1
+            if self._depth == 0:
+                self._close_row()
+                self.done = True
+        elif self._depth != 1:
+            return
+        elif tag in ('td', 'th'):
+            self._close_cell()
+        elif tag == 'tr':
+            self._close_row()
+        elif tag == 'tbody' and self._tbody == TBODY_OPEN:
+            self._close_row()
+            self._tbody = TBODY_CLOSED
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._text.append(data)
+
+    def handle_comment(self, data):
+        self._flush_text()
+
+    def _flush_text(self):
+        """Добавляет в ячейку текст, накопленный с предыдущего тега"""
+        if self._text:
+            text = ''.join(self._text)
+            self._text = []
+            if not text.strip(ASCII_SPACES):
+                text = '\n' if '\n' in text else ' '
+            self._cell[0].append(text)
+
+    def _close_cell(self):
+        """Завершает текущую ячейку"""
+        if self._cell is not None:
+            parts, row_span, col_span = self._cell
+            self._row.append((''.join(parts), row_span, col_span))
+            self._cell = None
+
+    def _close_row(self):
+        """Завершает текущую строку"""
+        self._close_cell()
+        if self._row is not None:
+            self.rows.append((self._tbody == TBODY_OPEN, self._row))
+            self._row = None
+
+    def finish(self):
+        """Завершает незакрытую таблицу в конце документа"""
+        self._flush_text()
+        self._close_row()
+
+
 class HTMLTableParser:
     """Парсер html-таблиц - если таблица содержит tbody, то парсится только tbody
 
     По номеру таблицы на странице формирует представление ее ячеек в виде списка списков. Ячейки с rowspan и colspan
     представляются в виде набора атомарных ячеек с одинаковыми значениями
+
+    Документ разбирается потоково до окончания нужной таблицы без построения дерева всей страницы, а ячейки
+    размещаются в заранее выделенной таблице нужного размера
     """
 
-    def __init__(self, html: str, table_index: int):
-        soup = bs4.BeautifulSoup(html, 'lxml')
-        try:
-            self._table = soup.find_all('table')[table_index]
-        except IndexError:
+    def __init__(self, html, table_index: int):
+        html = decode_html(html)
+        extractor = _TableExtractor(table_index)
+        for start in range(0, len(html), CHUNK_SIZE):
+            extractor.feed(html[start:start + CHUNK_SIZE])
+            if extractor.done:
+                break
+        else:
+            extractor.close()
+            extractor.finish()
+        if not extractor.found:
             raise IndexError(f'На странице нет таблицы {table_index}')
-        table_body = self._table.find('tbody')
-        if table_body:
-            self._table = table_body
+        self._rows = [row for in_tbody, row in extractor.rows if in_tbody or not extractor.has_tbody]
         self._parsed_table = []
 
     @property
@@ -69,44 +233,40 @@ class HTMLTableParser:
         """Распарсенная html-таблица в виде списка списков ячеек"""
         if self._parsed_table:
             return self._parsed_table
-        table = self._table
-        row_pos = 0
-        col_pos = 0
-        for row in table.find_all('tr'):
-            for cell in row.find_all(['th', 'td']):
-                col_pos = self._find_empty_cell(row_pos, col_pos)
-                row_span = int(cell.get('rowspan', 1))
-                col_span = int(cell.get('colspan', 1))
-                self._insert_cells(cell.text, row_pos, col_pos, row_span, col_span)
-            row_pos += 1
-            col_pos = 0
+        grid, lengths = self._make_grid()
+        self._parsed_table = [grid[row_pos, :length].tolist() for row_pos, length in enumerate(lengths)]
         return self._parsed_table
 
-    def _find_empty_cell(self, row_pos, col_pos):
-        """Ищет первую незаполненную ячейку в ряду и возвращает ее координату"""
-        parse_table = self._parsed_table
-        if row_pos >= len(parse_table):
-            return col_pos
-        row = parse_table[row_pos]
-        while col_pos < len(row) and row[col_pos] is not None:
-            col_pos += 1
-        return col_pos
-
-    def _insert_cells(self, value, row, col, row_span, col_span):
-        """Заполняет таблицу значениями с учетом rowspan и colspan ячейки"""
-        for row_pos in range(row, row + row_span):
-            for col_pos in range(col, col + col_span):
-                self._insert_cell(value, row_pos, col_pos)
-
-    def _insert_cell(self, value, row_pos, col_pos):
-        """Заполняет значение, при необходимости расширяя таблицу"""
-        parse_table = self._parsed_table
-        while row_pos >= len(parse_table):
-            parse_table.append([None])
-        row = parse_table[row_pos]
-        while col_pos >= len(row):
-            row.append(None)
-        row[col_pos] = value
+    def _make_grid(self):
+        """Размещает ячейки с учетом rowspan и colspan в заранее выделенной таблице
+
+        Returns
+        -------
+        tuple
+            Таблица ячеек в виде массива и длины строк - каждая строка заканчивается последней заполненной ячейкой
+        """
+        occupied = dict()
+        placed = []
+        lengths = []
+        for row_pos, row in enumerate(self._rows):
+            col_pos = 0
+            row_occupied = occupied.setdefault(row_pos, set())
+            for value, row_span, col_span in row:
+                while col_pos in row_occupied:
+                    col_pos += 1
+                if row_span <= 0 or col_span <= 0:
+                    continue
+                placed.append((value, row_pos, col_pos, row_span, col_span))
+                end_col = col_pos + col_span
+                for span_row in range(row_pos, row_pos + row_span):
+                    occupied.setdefault(span_row, set()).update(range(col_pos, end_col))
+                    while span_row >= len(lengths):
+                        lengths.append(1)
+                    lengths[span_row] = max(lengths[span_row], end_col)
+        grid = np.full((len(lengths), max(lengths, default=0)), None, dtype=object)
+        for value, row_pos, col_pos, row_span, col_span in placed:
+            grid[row_pos:row_pos + row_span, col_pos:col_pos + col_span] = value
+        return grid, lengths
 
     def make_df(self, columns: list, drop_header: int = 0, drop_footer: int = 0):
         """Преобразует таблицу в DataFrame
@@ -128,8 +288,8 @@ class HTMLTableParser:
             Данные преобразованные в соответствии с описание
         """
         self._validate_columns(columns)
-        parsed_rows = self._yield_rows(columns, drop_header, drop_footer)
-        return pd.DataFrame(parsed_rows)
+        parsed_columns = self._parse_columns(columns, drop_header, drop_footer)
+        return pd.DataFrame(dict(enumerate(parsed_columns)))
 
     def _validate_columns(self, columns):
         """Проверка значений в колонках"""
@@ -139,11 +299,15 @@ class HTMLTableParser:
                 if table[row][column.index] != value:
                     raise ValueError(f'Значение в таблице {table[row][column.index]!r} - должно быть {value!r}')
 
-    def _yield_rows(self, columns, drop_header, drop_footer):
-        """Генерирует строки с избранными колонками со значениями после парсинга"""
+    def _parse_columns(self, columns, drop_header, drop_footer):
+        """Преобразует избранные колонки - целиком или, если функция не векторная, по отдельным значениям"""
         table = self._crop_table(drop_header, drop_footer)
-        for row in table:
-            yield [column.parser_func(row[column.index]) for column in columns]
+        for column in columns:
+            values = [row[column.index] for row in table]
+            if column.vectorized:
+                yield column.parser_func(pd.Series(values, dtype=object)).reset_index(drop=True)
+            else:
+                yield pd.Series([column.parser_func(value) for value in values])
 
     def _crop_table(self, drop_header, drop_footer):
         """Отбрасывает строки в начале и конце таблицы"""
@@ -15,12 +15,14 @@ TICKER_COLUMN = parser.DataColumn(1,
 DATE_COLUMN = parser.DataColumn(4,
                                 {0: 'дата отсечки',
                                  -1: '\n+добавить дивиденды\nИстория выплаченных дивидендов\n'},
-                                parser.date_parser)
+                                parser.date_column_parser,
+                                True)
 
 DIVIDENDS_COLUMN = parser.DataColumn(7,
                                      {0: 'дивиденд,руб',
                                       -1: '\n+добавить дивиденды\nИстория выплаченных дивидендов\n'},
-                                     parser.div_parser)
+                                     parser.div_column_parser,
+                                     True)
 
 
 def dividends_smart_lab():
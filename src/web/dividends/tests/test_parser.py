@@ -123,3 +123,49 @@ def test_make_df_fail_validate():
     with pytest.raises(ValueError) as error:
         table.make_df(columns)
         assert error.value == 'Значение в таблице "5.55 (сов)" - должно быть "test"'
+
+
+def test_implied_closes_and_encoding():
+    html = ('<html><head><meta charset="windows-1251"></head><body>'
+            '<table><tr><td>0</td></tr></table>'
+            '<table><tr><th>Дата<td rowspan=2>1<table><tr><td>вложенная</td></tr></table>'
+            '<tr><td>2'
+            '</table><p>хвост без таблиц').encode('cp1251')
+    table = parser.HTMLTableParser(html, 1)
+    assert table.parsed_table == [['Дата', '1вложенная'], ['2', '1вложенная']]
+    with pytest.raises(IndexError) as error:
+        parser.HTMLTableParser(html, 3)
+    assert str(error.value) == 'На странице нет таблицы 3'
+
+
+@pytest.mark.parametrize('chunk_size', [parser.CHUNK_SIZE, 7])
+def test_whitespace_between_tags(monkeypatch, chunk_size):
+    monkeypatch.setattr(parser, 'CHUNK_SIZE', chunk_size)
+    html = """
+    <table>
+    <tr>
+        <td colspan="2" class="right">
+        <div style="float: left;"><a href="/dividends/add/">+добавить дивиденды</a></div>
+        <a href="/dividends/history/">История выплаченных дивидендов</a>
+        </td>
+        <td><b>x</b>   <i>y</i>\t</td>
+        <td>a <!-- c --> b</td>
+    </tr>
+    </table>"""
+    table = parser.HTMLTableParser(html, 0)
+    footer = '\n+добавить дивиденды\nИстория выплаченных дивидендов\n'
+    assert table.parsed_table == [[footer, footer, 'x y ', 'a  b']]
+
+
+def test_column_parsers():
+    dates = pd.Series(['-', '30.11.2018 (рек.)', '19.07.2017'])
+    assert parser.date_column_parser(dates).equals(pd.Series([parser.date_parser(date) for date in dates]))
+    div = pd.Series(['2.23', '30,4', '4', '66.8 (рек.)', '78,9 (прогноз)', '2 097', '-'])
+    assert parser.div_column_parser(div).equals(pd.Series([parser.div_parser(value) for value in div]))
+
+
+def test_make_df_vectorized():
+    table = parser.HTMLTableParser(HTML, 1)
+    columns = [parser.DataColumn(i, {}, parser.div_column_parser, True) for i in range(5)]
+    df = pd.DataFrame(DF_DATA)
+    assert df.equals(table.make_df(columns))
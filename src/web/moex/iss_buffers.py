@@ -0,0 +1,84 @@
+"""Накопление выбранных колонок из постраничных ответов http://iss.moex.com в массивах NumPy"""
+import numpy as np
+import pandas as pd
+
+# Типы колонок
+DATE_COLUMN = 'date'
+FLOAT_COLUMN = 'float'
+NUMBER_COLUMN = 'number'
+TEXT_COLUMN = 'text'
+
+# Типы массивов для хранения колонок
+BUFFER_DTYPES = {DATE_COLUMN: 'datetime64[D]',
+                 FLOAT_COLUMN: 'float64',
+                 NUMBER_COLUMN: 'float64',
+                 TEXT_COLUMN: 'object'}
+
+# Начальный размер массивов - при заполнении размер удваивается
+INITIAL_CAPACITY = 1024
+
+
+class ColumnBuffers:
+    """Растущие массивы NumPy для выбранных колонок ответа сервера
+
+    Из каждой страницы ответа выбираются только необходимые колонки, которые дописываются в заранее выделенные
+    массивы. DataFrame формируется один раз после загрузки всех страниц
+
+    Колонки задаются кортежами (наименование в ответе ISS, наименование в DataFrame, тип колонки). Колонки типа
+    NUMBER_COLUMN преобразуются в int64, если все значения целые, и в float64 в противном случае - так же, как это
+    делает pd.to_numeric
+    """
+
+    def __init__(self, columns, capacity: int = INITIAL_CAPACITY):
+        self._columns = columns
+        self._size = 0
+        self._arrays = [np.empty(max(capacity, 1), dtype=BUFFER_DTYPES[kind]) for _, _, kind in columns]
+        self._integer = [kind == NUMBER_COLUMN for _, _, kind in columns]
+
+    def __len__(self):
+        return self._size
+
+    def extend(self, json_data):
+        """Дописывает колонки из страницы ответа сервера со списками data и columns"""
+        rows = json_data['data']
+        rows_count = len(rows)
+        if rows_count == 0:
+            return
+        self._reserve(self._size + rows_count)
+        header = json_data['columns']
+        end = self._size + rows_count
+        for number, (name, _, kind) in enumerate(self._columns):
+            position = header.index(name)
+            values = [row[position] for row in rows]
+            if kind == NUMBER_COLUMN and self._integer[number]:
+                self._integer[number] = np.array(values).dtype.kind in 'iu'
+            if kind in (FLOAT_COLUMN, NUMBER_COLUMN):
+                values = np.array(values, dtype='float64')
+            self._arrays[number][self._size:end] = values
+        self._size = end
+
+    def _reserve(self, size: int):
+        """Увеличивает размер массивов при необходимости"""
+        capacity = len(self._arrays[0])
+        if size <= capacity:
+            return
+        while capacity < size:
+            capacity *= 2
+        for number, array in enumerate(self._arrays):
+            new_array = np.empty(capacity, dtype=array.dtype)
+            new_array[:self._size] = array[:self._size]
+            self._arrays[number] = new_array
+
+    def to_df(self):
+        """Формирует DataFrame из накопленных данных"""
+        data = dict()
+        for number, (_, label, kind) in enumerate(self._columns):
+            array = self._arrays[number][:self._size]
+            if kind == DATE_COLUMN:
+                array = array.astype('datetime64[ns]')
+            elif kind == NUMBER_COLUMN and self._integer[number]:
+                array = array.astype('int64')
+            else:
+                array = array.copy()
+            data[label] = array
+        return pd.DataFrame(data, columns=[label for _, label, _ in self._columns])
@@ -0,0 +1,60 @@
+"""Загружает итоги торгов всех акций за одну дату с http://iss.moex.com"""
+from urllib import parse
+
+import pandas as pd
+
+from web.labels import CLOSE_PRICE, DATE, TICKER, VOLUME
+from web.moex.iss_buffers import DATE_COLUMN, FLOAT_COLUMN, NUMBER_COLUMN, TEXT_COLUMN
+from web.moex.iss_quotes import Quotes, MAX_WORKERS
+
+
+class MarketHistory(Quotes):
+    """Представление ответа сервера по итогам торгов всех акций за одну дату в виде итератора
+
+    Если режим торгов не указан, то загружаются итоги торгов во всех режимах
+    """
+    _BASE_URL = 'https://iss.moex.com/iss/history/engines/stock/markets/shares/{board}securities.json?{query}'
+    _COLUMNS = (('SECID', TICKER, TEXT_COLUMN),
+                ('TRADEDATE', DATE, DATE_COLUMN),
+                ('CLOSE', CLOSE_PRICE, FLOAT_COLUMN),
+                ('VOLUME', VOLUME, NUMBER_COLUMN))
+
+    def __init__(self, date: pd.Timestamp, board: str = None, max_workers: int = MAX_WORKERS):
+        super().__init__(None, None, max_workers)
+        self._date = date
+        self._board = board
+
+    def url(self, block_position):
+        """Создает url для запроса к серверу http://iss.moex.com"""
+        query = parse.urlencode(dict(date=self._date.date(), start=block_position))
+        board = f'boards/{self._board}/' if self._board else ''
+        return self._BASE_URL.format(board=board, query=query)
+
+    def _validate_response(self, block_position, json_data):
+        """В неторговые дни ответ пустой - проверка не нужна"""
+        pass
+
+
+def market_history(date: pd.Timestamp, board: str = None):
+    """
+    Возвращает итоги торгов всех акций за дату
+
+    Parameters
+    ----------
+    date
+        Дата торгов
+    board
+        Режим торгов, например, 'TQBR'. Если None, то загружаются итоги во всех режимах
+
+    Returns
+    -------
+    pandas.DataFrame
+        В строках итоги торгов акции в одном из режимов
+        В столбцах [TICKER, DATE, CLOSE, VOLUME] тикер, дата, цена закрытия и оборот в штуках
+    """
+    df = MarketHistory(date, board).to_df()
+    return df.drop_duplicates().reset_index(drop=True)
+
+
+if __name__ == '__main__':
+    print(market_history(pd.Timestamp('2018-10-24'), 'TQBR'))
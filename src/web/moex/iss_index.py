@@ -3,7 +3,8 @@
 import pandas as pd
 
 from web.labels import CLOSE_PRICE, DATE
-from web.moex.iss_quotes import Quotes
+from web.moex.iss_buffers import DATE_COLUMN, FLOAT_COLUMN
+from web.moex.iss_quotes import Quotes, MAX_WORKERS
 
 
 class Index(Quotes):
@@ -14,18 +15,17 @@ class Index(Quotes):
     """
     _BASE_URL = ('http://iss.moex.com/iss/history/engines/stock/markets/index/boards/RTSI/securities/'
                  '{ticker}.json?{query}')
+    _COLUMNS = (('TRADEDATE', DATE, DATE_COLUMN),
+                ('CLOSE', CLOSE_PRICE, FLOAT_COLUMN))
     _ticker = 'MCFTRR'
 
-    def __init__(self, start_date):
-        super().__init__(self._ticker, start_date)
+    def __init__(self, start_date, max_workers: int = MAX_WORKERS):
+        super().__init__(self._ticker, start_date, max_workers)
 
-    def get_df(self, block_position):
-        """Выбирает из сырого DataFrame только с необходимые колонки - даты и цены закрытия"""
-        json_data = self.get_json_data(block_position)
-        df = pd.DataFrame(**json_data)
-        df[DATE] = pd.to_datetime(df['TRADEDATE'])
-        df[CLOSE_PRICE] = pd.to_numeric(df['CLOSE'])
-        return df[[DATE, CLOSE_PRICE]].set_index(DATE)
+    @classmethod
+    def make_df(cls, json_data):
+        """Выбирает из блока данных только необходимые колонки - даты и цены закрытия"""
+        return super().make_df(json_data).set_index(DATE)
 
 
 def index(start=None):
@@ -46,7 +46,8 @@ def index(start=None):
         В строках даты торгов
         В столбцах цена закрытия индекса полной доходности
     """
-    return pd.concat(Index(start))[CLOSE_PRICE]
+    df = Index(start).to_df().set_index(DATE)[CLOSE_PRICE]
+    return df[~df.index.duplicated()]
 
 
 if __name__ == '__main__':
@@ -1,13 +1,15 @@
 """Загружает котировки и объемы торгов для тикеров с http://iss.moex.com"""
-import json
-from urllib import request, parse
+from concurrent.futures import ThreadPoolExecutor
+from urllib import parse
 
 import pandas as pd
 
+from web import session
 from web.labels import CLOSE_PRICE, DATE, VOLUME
+from web.moex.iss_buffers import ColumnBuffers, DATE_COLUMN, FLOAT_COLUMN, NUMBER_COLUMN
 
-# Время ожидания для повторной загрузки при невозможности получить данные
-TIMEOUT = 60
+# Количество одновременно загружаемых блоков данных
+MAX_WORKERS = 8
 
 
 class Quotes:
@@ -15,22 +17,60 @@ class Quotes:
 
     При большом запросе сервер ISS возвращает данные блоками обычно по 100 значений, поэтому класс является итератором
     Если начальная дата не указана, то загружается вся доступная история котировок
+
+    Первый ответ сервера содержит общее количество строк и размер блока, поэтому остальные блоки загружаются
+    одновременно в max_workers потоков, а затем последовательно догружаются строки, которые могли появиться за время
+    загрузки. При отсутствии этой информации блоки загружаются последовательно
+
+    Метод to_df накапливает только необходимые колонки всех блоков в массивах NumPy и формирует DataFrame один раз
     """
     _BASE_URL = ('https://iss.moex.com/iss/history/engines/stock/markets/shares/securities/'
                  '{ticker}.json?{query}')
+    # Необходимые колонки - наименование в ответе ISS, наименование в DataFrame и тип колонки
+    _COLUMNS = (('TRADEDATE', DATE, DATE_COLUMN),
+                ('CLOSE', CLOSE_PRICE, FLOAT_COLUMN),
+                ('VOLUME', VOLUME, NUMBER_COLUMN))
 
-    def __init__(self, ticker: str, start_date):
+    def __init__(self, ticker: str, start_date, max_workers: int = MAX_WORKERS):
         self._ticker, self._start_date = ticker, start_date
+        self._max_workers = max_workers
 
     def __iter__(self):
-        block_position = 0
+        for json_data in self._pages():
+            yield self.make_df(json_data)
+
+    def to_df(self):
+        """Загружает все блоки данных и формирует из них один DataFrame"""
+        buffers = ColumnBuffers(self._COLUMNS)
+        for json_data in self._pages():
+            buffers.extend(json_data)
+        return buffers.to_df()
+
+    def _pages(self):
+        """Последовательно возвращает непустые блоки данных со списками data и columns"""
+        json_data = self._load_json(0)
+        page = _history(json_data)
+        block_position = len(page['data'])
+        if block_position == 0:
+            return
+        yield page
+        cursor = json_data.get('history.cursor')
+        if self._max_workers > 1 and cursor and cursor['data']:
+            cursor = dict(zip(cursor['columns'], cursor['data'][0]))
+            total, page_size = cursor['TOTAL'], cursor['PAGESIZE']
+            positions = range(block_position, total, page_size)
+            with ThreadPoolExecutor(max_workers=self._max_workers) as executor:
+                for page in executor.map(self.get_json_data, positions):
+                    block_position += len(page['data'])
+                    yield page
+            block_position = max(block_position, total)
         while True:
-            df = self.get_df(block_position)
-            df_len = len(df)
-            if df_len == 0:
+            page = self.get_json_data(block_position)
+            page_len = len(page['data'])
+            if page_len == 0:
                 break
-            block_position += df_len
-            yield df
+            block_position += page_len
+            yield page
 
     def url(self, block_position):
         """Создает url для запроса к серверу http://iss.moex.com"""
@@ -41,12 +81,15 @@ class Quotes:
             query_args['from'] = self._start_date.date()
         return self._BASE_URL.format(ticker=self._ticker, query=parse.urlencode(query_args))
 
+    def _load_json(self, block_position):
+        """Загружает и проверяет полный ответ сервера"""
+        json_data = session.get_json(self.url(block_position))
+        self._validate_response(block_position, json_data)
+        return json_data
+
     def get_json_data(self, block_position):
         """Загружает и проверяет json с данными"""
-        with request.urlopen(self.url(block_position), timeout=TIMEOUT) as response:
-            json_data = json.load(response)
-        self._validate_response(block_position, json_data)
-        return {key: json_data['history'][key] for key in ['data', 'columns']}
+        return _history(self._load_json(block_position))
 
     def _validate_response(self, block_position, json_data):
         """Первый запрос должен содержать не нулевое количество строк"""
@@ -54,13 +97,20 @@ class Quotes:
             raise ValueError(f'Пустой ответ. Проверьте запрос: {self.url(block_position)}')
 
     def get_df(self, block_position):
-        """Формирует DataFrame и выбирает необходимые колонки - даты, цены закрытия и объемы"""
-        json_data = self.get_json_data(block_position)
-        df = pd.DataFrame(**json_data)
-        df[DATE] = pd.to_datetime(df['TRADEDATE'])
-        df[CLOSE_PRICE] = pd.to_numeric(df['CLOSE'])
-        df[VOLUME] = pd.to_numeric(df['VOLUME'])
-        return df[[DATE, CLOSE_PRICE, VOLUME]]
+        """Загружает блок данных в виде DataFrame"""
+        return self.make_df(self.get_json_data(block_position))
+
+    @classmethod
+    def make_df(cls, json_data):
+        """Формирует DataFrame из блока данных и выбирает необходимые колонки - даты, цены закрытия и объемы"""
+        buffers = ColumnBuffers(cls._COLUMNS, len(json_data['data']))
+        buffers.extend(json_data)
+        return buffers.to_df()
+
+
+def _history(json_data):
+    """Выбирает из ответа сервера данные и наименования колонок"""
+    return {key: json_data['history'][key] for key in ['data', 'columns']}
 
 
 def quotes(ticker, start=None):
@@ -83,8 +133,7 @@ def quotes(ticker, start=None):
         В строках даты торгов
         В столбцах [CLOSE, VOLUME] цена закрытия и оборот в штуках
     """
-    gen = Quotes(ticker, start)
-    df = pd.concat(gen, ignore_index=True)
+    df = Quotes(ticker, start).to_df().drop_duplicates()
     # Для каждой даты выбирается режим торгов с максимальным оборотом
     df = df.loc[df.groupby(DATE)[VOLUME].idxmax()]
     df = df.set_index(DATE)
@@ -39,14 +39,10 @@ def quotes_t2(ticker, start=None):
         В строках даты торгов
         В столбцах [CLOSE, VOLUME] цена закрытия и оборот в штуках
     """
-    gen = QuotesT2(ticker, start)
-    try:
-        df = pd.concat(gen, ignore_index=True)
-    except ValueError:
+    df = QuotesT2(ticker, start).to_df().drop_duplicates()
+    if df.empty:
         return pd.DataFrame()
-    else:
-        df = df.set_index(DATE)
-        return df
+    return df.set_index(DATE)
 
 
 if __name__ == '__main__':
@@ -1,9 +1,7 @@
 """Загружает информацию о тикерах с http://iss.moex.com"""
-import json
-from urllib import request
-
 import pandas as pd
 
+from web import session
 from web.labels import LAST_PRICE, LOT_SIZE, COMPANY_NAME, REG_NUMBER, TICKER
 
 MIN_TICKERS_AMOUNT = 200
@@ -19,8 +17,7 @@ def make_url(tickers: tuple):
 def get_json(tickers: tuple):
     """Загружает и проверяет json"""
     url = make_url(tickers)
-    with request.urlopen(url) as response:
-        data = json.load(response)
+    data = session.get_json(url)
     validate_response(data, tickers)
     return data
 
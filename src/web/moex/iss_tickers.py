@@ -1,18 +1,19 @@
 """Загружает информацию о тикерах для данного регистрационного номера с http://iss.moex.com"""
 
-import json
-from urllib import request
+from web import session
+from web.labels import REG_NUMBER, TICKER
+from web.moex.iss_buffers import ColumnBuffers, TEXT_COLUMN
 
-# Время ожидания для повторной загрузки при невозможности получить данные
-TIMEOUT = 60
+# Перечень всех акций, включая не торгуемые в настоящий момент
+LISTING_URL = 'https://iss.moex.com/iss/securities.json?engine=stock&market=shares&start={start}'
+LISTING_COLUMNS = (('secid', TICKER, TEXT_COLUMN),
+                   ('regnumber', REG_NUMBER, TEXT_COLUMN))
 
 
 def get_json(reg_number: str):
     """Получает json с http://iss.moex.com"""
     url = f'http://iss.moex.com/iss/securities.json?q={reg_number}'
-    with request.urlopen(url, timeout=TIMEOUT) as response:
-        data = json.load(response)
-    return data
+    return session.get_json(url)
 
 
 def validate(reg_number: str, tickers: tuple):
@@ -52,6 +53,28 @@ def reg_number_tickers(reg_number: str):
     return tickers
 
 
+def securities_listing():
+    """
+    Возвращает тикеры и регистрационные номера всех акций с http://iss.moex.com
+
+    Перечень загружается постранично и содержит в том числе тикеры, которые в настоящий момент не торгуются
+
+    Returns
+    -------
+    pandas.DataFrame
+        В строках акции
+        В столбцах [TICKER, REG_NUMBER] тикер и регистрационный номер
+    """
+    buffers = ColumnBuffers(LISTING_COLUMNS)
+    while True:
+        raw_json = session.get_json(LISTING_URL.format(start=len(buffers)))
+        page = raw_json['securities']
+        if len(page['data']) == 0:
+            break
+        buffers.extend(page)
+    return buffers.to_df()
+
+
 if __name__ == '__main__':
     print(reg_number_tickers('1-02-65104-D'))
     print(reg_number_tickers('10301481B'))
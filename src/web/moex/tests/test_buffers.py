@@ -0,0 +1,51 @@
+import numpy as np
+import pandas as pd
+
+from web.moex.iss_buffers import ColumnBuffers, DATE_COLUMN, FLOAT_COLUMN, NUMBER_COLUMN, TEXT_COLUMN
+
+COLUMNS = (('SECID', 'TICKER', TEXT_COLUMN),
+           ('TRADEDATE', 'DATE', DATE_COLUMN),
+           ('CLOSE', 'CLOSE', FLOAT_COLUMN),
+           ('VOLUME', 'VOLUME', NUMBER_COLUMN))
+HEADER = ['BOARDID', 'TRADEDATE', 'SECID', 'VOLUME', 'CLOSE']
+
+
+def make_page(start, size):
+    data = [['TQBR', str((pd.Timestamp('2018-01-01') + pd.DateOffset(days=day)).date()), f'T{day}', day, day + 0.5]
+            for day in range(start, start + size)]
+    return dict(data=data, columns=HEADER)
+
+
+def test_same_as_data_frame():
+    pages = [make_page(0, 100), make_page(100, 100), make_page(200, 37)]
+    buffers = ColumnBuffers(COLUMNS, capacity=10)
+    for page in pages:
+        buffers.extend(page)
+    assert len(buffers) == 237
+    df = buffers.to_df()
+    expected = pd.concat([pd.DataFrame(**page) for page in pages], ignore_index=True)
+    assert list(df.columns) == ['TICKER', 'DATE', 'CLOSE', 'VOLUME']
+    assert df['TICKER'].equals(expected['SECID'].rename('TICKER'))
+    assert df['DATE'].equals(pd.to_datetime(expected['TRADEDATE']).rename('DATE'))
+    assert df['CLOSE'].equals(pd.to_numeric(expected['CLOSE']))
+    assert df['VOLUME'].equals(pd.to_numeric(expected['VOLUME']))
+    assert df['VOLUME'].dtype == np.int64
+
+
+def test_missing_values():
+    page = make_page(0, 3)
+    page['data'][1][3] = None
+    page['data'][2][4] = None
+    buffers = ColumnBuffers(COLUMNS)
+    buffers.extend(page)
+    df = buffers.to_df()
+    assert df['VOLUME'].dtype == np.float64
+    assert np.isnan(df.loc[1, 'VOLUME'])
+    assert np.isnan(df.loc[2, 'CLOSE'])
+
+
+def test_empty():
+    df = ColumnBuffers(COLUMNS).to_df()
+    assert df.empty
+    assert list(df.columns) == ['TICKER', 'DATE', 'CLOSE', 'VOLUME']
+    assert df['DATE'].dtype == 'datetime64[ns]'
@@ -0,0 +1,28 @@
+import pandas as pd
+
+from web.labels import CLOSE_PRICE, DATE, TICKER, VOLUME
+from web.moex.iss_history import MarketHistory, market_history
+
+
+def test_url():
+    assert MarketHistory(pd.Timestamp('2018-10-24')).url(100) == (
+        'https://iss.moex.com/iss/history/engines/stock/markets/shares/securities.json?date=2018-10-24&start=100')
+    assert MarketHistory(pd.Timestamp('2018-10-24'), 'TQBR').url(0) == (
+        'https://iss.moex.com/iss/history/engines/stock/markets/shares/boards/TQBR/securities.json?'
+        'date=2018-10-24&start=0')
+
+
+def test_market_history():
+    df = market_history(pd.Timestamp('2018-03-05'), 'TQBR')
+    assert list(df.columns) == [TICKER, DATE, CLOSE_PRICE, VOLUME]
+    assert len(df) > 200
+    assert df[TICKER].is_unique
+    moex = df.set_index(TICKER).loc['MOEX']
+    assert moex[CLOSE_PRICE] == 117
+    assert moex[VOLUME] == 4553310
+
+
+def test_no_trading_day():
+    df = market_history(pd.Timestamp('2018-03-04'), 'TQBR')
+    assert df.empty
+    assert list(df.columns) == [TICKER, DATE, CLOSE_PRICE, VOLUME]
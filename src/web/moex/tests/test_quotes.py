@@ -1,4 +1,4 @@
-from collections import Iterable
+from collections.abc import Iterable
 
 import pandas as pd
 
@@ -30,3 +30,46 @@ def test_quotes():
     assert df.shape[0] > 100
     assert df.loc['2018-03-05', CLOSE_PRICE] == 117
     assert df.loc['2018-03-05', VOLUME] == 4553310
+
+
+def make_fake_load_json(rows, total, calls):
+    """Имитирует постраничные ответы сервера ISS с блоком cursor"""
+    columns = ['TRADEDATE', 'CLOSE', 'VOLUME']
+    dates = pd.date_range('2018-01-01', periods=rows, freq='D')
+    data = [[str(date.date()), float(number), number] for number, date in enumerate(dates)]
+
+    def fake_load_json(self, block_position):
+        calls.append(block_position)
+        return {'history': {'columns': columns, 'data': data[block_position:block_position + 100]},
+                'history.cursor': {'columns': ['INDEX', 'TOTAL', 'PAGESIZE'], 'data': [[block_position, total, 100]]}}
+
+    return fake_load_json
+
+
+def test_parallel_pages(monkeypatch):
+    calls = []
+    monkeypatch.setattr(Quotes, '_load_json', make_fake_load_json(450, 450, calls))
+    df = quotes('AKRN')
+    assert sorted(calls) == [0, 100, 200, 300, 400, 450]
+    assert calls[-1] == 450
+    assert df.index.is_monotonic_increasing
+    assert df.index.is_unique
+    assert len(df) == 450
+    assert list(df[VOLUME]) == list(range(450))
+
+
+def test_parallel_pages_with_new_rows(monkeypatch):
+    calls = []
+    monkeypatch.setattr(Quotes, '_load_json', make_fake_load_json(520, 450, calls))
+    df = quotes('AKRN')
+    assert sorted(calls) == [0, 100, 200, 300, 400, 500, 520]
+    assert len(df) == 520
+    assert df.index.is_unique
+
+
+def test_serial_pages(monkeypatch):
+    calls = []
+    monkeypatch.setattr(Quotes, '_load_json', make_fake_load_json(250, 250, calls))
+    df = pd.concat(Quotes('AKRN', None, max_workers=1), ignore_index=True)
+    assert calls == [0, 100, 200, 250]
+    assert len(df) == 250
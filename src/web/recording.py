@@ -0,0 +1,107 @@
+"""Запись ответов web-источников для последующего воспроизведения без доступа к сети
+
+Ответы хранятся в каталоге записи в подкаталогах для каждого сервера и ресурса. Ресурс определяется путем и
+параметрами запроса за исключением номера первой строки блока данных start. Постраничные ответы сохраняются в
+отдельных файлах для каждого значения start, что позволяет записывать одновременно загружаемые страницы и собирать
+из них полные данные при воспроизведении. Остальные ответы сохраняются в неизменном виде
+"""
+import json
+import os
+import threading
+from pathlib import Path
+from urllib import parse
+
+# Параметр запроса с номером первой строки блока данных и параметр с начальной датой
+START_PARAM = 'start'
+FROM_PARAM = 'from'
+# Файл для ответов без постраничной загрузки
+RAW_FILE = 'response'
+PAGE_EXTENSION = '.json'
+# Окончание наименования блока ISS с информацией об общем количестве строк и размере страницы
+CURSOR_SUFFIX = '.cursor'
+
+
+def split_url(url: str):
+    """Разбивает url на сервер, ресурс и номер первой строки блока данных или None"""
+    parts = parse.urlsplit(url)
+    query = parse.parse_qsl(parts.query, keep_blank_values=True)
+    start = None
+    params = []
+    for name, value in query:
+        if name == START_PARAM:
+            start = int(value)
+        else:
+            params.append((name, value))
+    return parts.netloc, make_key(parts.path, params), start
+
+
+def make_key(path: str, params):
+    """Ресурс - путь и параметры запроса"""
+    if params:
+        return f'{path}?{parse.urlencode(params)}'
+    return path
+
+
+def resource_path(directory, host: str, key: str):
+    """Каталог для хранения ответов по ресурсу"""
+    return Path(directory) / host / parse.quote(key, safe='')
+
+
+def save(directory, url: str, body: bytes):
+    """Сохраняет ответ сервера на запрос url"""
+    host, key, start = split_url(url)
+    folder = resource_path(directory, host, key)
+    folder.mkdir(parents=True, exist_ok=True)
+    if start is None:
+        path = folder / RAW_FILE
+    else:
+        path = folder / f'{start}{PAGE_EXTENSION}'
+    temp_path = path.with_name(f'{path.name}.{threading.get_ident()}.tmp')
+    with open(temp_path, 'wb') as file:
+        file.write(body)
+    os.replace(temp_path, path)
+
+
+def load_raw(directory, host: str, key: str):
+    """Сохраненный ответ без постраничной загрузки или None при его отсутствии"""
+    path = resource_path(directory, host, key) / RAW_FILE
+    if not path.exists():
+        return None
+    with open(path, 'rb') as file:
+        return file.read()
+
+
+def load_pages(directory, host: str, key: str):
+    """Собирает все сохраненные страницы ресурса в единый ответ или возвращает None при их отсутствии
+
+    Строки каждой страницы размещаются в соответствии с ее номером первой строки. Блоки с информацией о количестве
+    строк в ответ не включаются, но для каждого блока данных сохраняется признак их наличия
+
+    Returns
+    -------
+    tuple or None
+        Словарь с блоками данных, содержащими списки columns и data, и множество блоков, для которых в исходных
+        ответах была информация о количестве строк
+    """
+    folder = resource_path(directory, host, key)
+    pages = sorted(folder.glob(f'*{PAGE_EXTENSION}'), key=lambda page_path: int(page_path.stem))
+    if not pages:
+        return None
+    blocks = dict()
+    cursors = set()
+    for page_path in pages:
+        start = int(page_path.stem)
+        with open(page_path, 'rb') as file:
+            page = json.loads(file.read().decode('utf-8'))
+        for name, block in page.items():
+            if name.endswith(CURSOR_SUFFIX):
+                cursors.add(name[:-len(CURSOR_SUFFIX)])
+                continue
+            merged = blocks.setdefault(name, dict(columns=block['columns'], data=[]))
+            data = merged['data']
+            if len(data) < start:
+                data.extend([None] * (start - len(data)))
+            data[start:start + len(block['data'])] = block['data']
+    for block in blocks.values():
+        block['data'] = [row for row in block['data'] if row is not None]
+    return blocks, cursors
@@ -0,0 +1,245 @@
+"""Общий HTTP-клиент для всех web-источников
+
+Поддерживает постоянные соединения с пулом для каждого сервера, повторные попытки загрузки с увеличивающейся паузой и
+бюджет запросов к одному серверу - ограничение количества одновременных запросов и минимальный интервал между
+началами последовательных запросов
+"""
+import http.client
+import io
+import json
+import ssl
+import threading
+import time
+import urllib.error
+from urllib import parse
+
+from web import recording
+
+# Время ожидания ответа сервера
+TIMEOUT = 60
+# Количество повторных попыток загрузки и пауза перед первой повторной попыткой, которая удваивается с каждой попыткой
+RETRIES = 3
+BACKOFF = 1.0
+# Ответы сервера, после которых имеет смысл повторить запрос
+RETRY_CODES = frozenset({429, 500, 502, 503, 504})
+# Максимальное количество одновременных запросов к одному серверу
+MAX_CONNECTIONS = 8
+# Минимальный интервал в секундах между началами запросов к одному серверу - ограничивает частоту запросов
+MIN_INTERVAL = 0.05
+# Заголовок User-Agent всех запросов
+USER_AGENT = 'Mozilla/5.0 (compatible; poptimizer)'
+# Максимальное количество перенаправлений
+MAX_REDIRECTS = 5
+REDIRECT_CODES = frozenset({301, 302, 303, 307, 308})
+
+
+class Session:
+    """HTTP-клиент с пулом постоянных соединений для каждого сервера
+
+    Соединения после выполнения запроса возвращаются в пул и используются повторно, поэтому последовательные запросы к
+    одному серверу не требуют нового TCP и TLS соединения. Количество одновременных запросов к каждому серверу
+    ограничено max_connections, а запросы к нему, включая повторные попытки, начинаются не чаще одного раза в
+    min_interval секунд. При сетевых ошибках и ответах из RETRY_CODES запрос повторяется retries раз с удваивающейся
+    паузой, начиная с backoff секунд
+
+    Ошибки сообщаются так же, как в urllib.request.urlopen - с помощью urllib.error.HTTPError и urllib.error.URLError
+
+    Запросы к отдельным серверам могут направляться на другой адрес, а полученные ответы записываться для последующего
+    воспроизведения без доступа к сети
+    """
+
+    def __init__(self, timeout: float = TIMEOUT, retries: int = RETRIES, backoff: float = BACKOFF,
+                 max_connections: int = MAX_CONNECTIONS, min_interval: float = MIN_INTERVAL,
+                 user_agent: str = USER_AGENT):
+        self._timeout = timeout
+        self._retries = retries
+        self._backoff = backoff
+        self._max_connections = max_connections
+        self._min_interval = min_interval
+        self._user_agent = user_agent
+        self._lock = threading.Lock()
+        self._pools = dict()
+        self._limits = dict()
+        self._next_starts = dict()
+        self._routes = dict()
+        self._record_directory = None
+
+    def route(self, host: str, base_url):
+        """Направляет запросы к серверу host на base_url с добавлением host в начало пути
+
+        Если base_url None, то запросы снова направляются на исходный сервер
+        """
+        with self._lock:
+            if base_url is None:
+                self._routes.pop(host, None)
+            else:
+                self._routes[host] = base_url
+
+    def record(self, directory):
+        """Включает запись всех полученных ответов в каталог или выключает ее, если каталог None"""
+        self._record_directory = directory
+
+    def _routed(self, url: str):
+        """Адрес с учетом маршрутизации запросов"""
+        parts = parse.urlsplit(url)
+        base_url = self._routes.get(parts.netloc)
+        if base_url is None:
+            return url
+        return parse.urlunsplit(parse.urlsplit(base_url)[:2] + (f'/{parts.netloc}{parts.path}', parts.query, ''))
+
+    def get(self, url: str, verify: bool = True):
+        """Загружает содержимое url
+
+        Parameters
+        ----------
+        url
+            Адрес ресурса с http или https схемой
+        verify
+            Нужно ли проверять сертификат сервера для https
+
+        Returns
+        -------
+        bytes
+            Содержимое ответа сервера
+        """
+        requested_url = url
+        for _ in range(MAX_REDIRECTS + 1):
+            status, headers, body = self._retry(self._routed(url), verify)
+            if status in REDIRECT_CODES and headers.get('Location'):
+                url = parse.urljoin(url, headers['Location'])
+                continue
+            if status >= 400:
+                raise urllib.error.HTTPError(url, status, http.client.responses.get(status, ''), headers,
+                                             io.BytesIO(body))
+            if self._record_directory is not None:
+                recording.save(self._record_directory, requested_url, body)
+            return body
+        raise urllib.error.URLError(f'Слишком много перенаправлений: {url}')
+
+    def get_json(self, url: str, verify: bool = True):
+        """Загружает и декодирует json"""
+        return json.loads(self.get(url, verify).decode('utf-8'))
+
+    def close(self):
+        """Закрывает все неиспользуемые соединения"""
+        with self._lock:
+            pools, self._pools = self._pools, dict()
+        for pool in pools.values():
+            for connection in pool:
+                connection.close()
+
+    def _retry(self, url: str, verify: bool):
+        """Выполняет запрос с повторными попытками"""
+        pause = self._backoff
+        for attempt in range(self._retries + 1):
+            last_attempt = attempt == self._retries
+            try:
+                status, headers, body = self._request(url, verify)
+            except (OSError, http.client.HTTPException) as error:
+                if last_attempt:
+                    raise urllib.error.URLError(error)
+            else:
+                if status not in RETRY_CODES or last_attempt:
+                    return status, headers, body
+            time.sleep(pause)
+            pause *= 2
+
+    def _request(self, url: str, verify: bool):
+        """Выполняет запрос с использованием соединения из пула
+
+        Сервер может закрыть простаивающее соединение, поэтому при ошибке на соединении из пула запрос однократно
+        повторяется на новом соединении
+        """
+        parts = parse.urlsplit(url)
+        if parts.scheme not in ('http', 'https'):
+            raise urllib.error.URLError(f'Неподдерживаемая схема: {url}')
+        key = (parts.scheme, parts.netloc, verify)
+        path = parts.path or '/'
+        if parts.query:
+            path = f'{path}?{parts.query}'
+        with self._concurrency_limit(key):
+            self._wait_turn(parts.netloc)
+            connection, reused = self._acquire(key)
+            try:
+                status, headers, body, will_close = _send(connection, path, self._user_agent)
+            except (OSError, http.client.HTTPException):
+                connection.close()
+                if not reused:
+                    raise
+                connection = self._connect(key)
+                try:
+                    status, headers, body, will_close = _send(connection, path, self._user_agent)
+                except (OSError, http.client.HTTPException):
+                    connection.close()
+                    raise
+            if will_close:
+                connection.close()
+            else:
+                self._release(key, connection)
+        return status, headers, body
+
+    def _concurrency_limit(self, key):
+        """Семафор, ограничивающий количество одновременных запросов к серверу"""
+        with self._lock:
+            if key not in self._limits:
+                self._limits[key] = threading.BoundedSemaphore(self._max_connections)
+            return self._limits[key]
+
+    def _wait_turn(self, host: str):
+        """Ожидает, пока с начала предыдущего запроса к серверу пройдет не менее min_interval секунд"""
+        with self._lock:
+            now = time.monotonic()
+            start = max(now, self._next_starts.get(host, now))
+            self._next_starts[host] = start + self._min_interval
+        if start > now:
+            time.sleep(start - now)
+
+    def _acquire(self, key):
+        """Соединение из пула или новое соединение и признак повторного использования"""
+        with self._lock:
+            pool = self._pools.get(key)
+            if pool:
+                return pool.pop(), True
+        return self._connect(key), False
+
+    def _release(self, key, connection):
+        """Возвращает соединение в пул"""
+        with self._lock:
+            self._pools.setdefault(key, []).append(connection)
+
+    def _connect(self, key):
+        """Создает новое соединение"""
+        scheme, netloc, verify = key
+        if scheme == 'http':
+            return http.client.HTTPConnection(netloc, timeout=self._timeout)
+        context = ssl.create_default_context()
+        if not verify:
+            context.check_hostname = False
+            context.verify_mode = ssl.CERT_NONE
+        return http.client.HTTPSConnection(netloc, timeout=self._timeout, context=context)
+
+
+def _send(connection, path: str, user_agent: str):
+    """Отправляет GET-запрос и полностью читает ответ, чтобы соединение можно было использовать повторно"""
+    connection.request('GET', path, headers={'Connection': 'keep-alive', 'User-Agent': user_agent})
+    response = connection.getresponse()
+    body = response.read()
+    return response.status, response.headers, body, response.will_close
+
+
+# Общий клиент для всех web-источников
+SESSION = Session()
+
+
+def get(url: str, verify: bool = True):
+    """Загружает содержимое url с помощью общего клиента"""
+    return SESSION.get(url, verify)
+
+
+def get_json(url: str, verify: bool = True):
+    """Загружает и декодирует json с помощью общего клиента"""
+    return SESSION.get_json(url, verify)
+
+
+if __name__ == '__main__':
+    print(get_json('https://iss.moex.com/iss/securities.json?q=1-02-65104-D'))
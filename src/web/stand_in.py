@@ -0,0 +1,193 @@
+"""Локальный HTTP-сервер, заменяющий web-источники записанными ответами
+
+Позволяет проверять производительность и поведение загрузки данных при одновременных запросах без доступа к сети.
+Запросы направляются на сервер с помощью маршрутизации общего HTTP-клиента, а в пути запроса первым указывается
+исходный сервер - http://127.0.0.1:port/iss.moex.com/iss/...
+
+Постраничные ответы собираются из записи и заново разбиваются на страницы, поэтому поддерживаются произвольные значения
+start, фильтр по начальной дате from и блоки с информацией о количестве строк. Дополнительно можно задать задержку
+ответа и долю ответов с ошибкой
+"""
+import contextlib
+import json
+import random
+import socketserver
+import sys
+import threading
+import time
+from http.server import HTTPServer, BaseHTTPRequestHandler
+from urllib import parse
+
+from web import recording, session
+
+# Размер страницы при постраничной выдаче
+PAGE_SIZE = 100
+# Колонка с датой, по которой фильтруются данные
+DATE_COLUMN = 'TRADEDATE'
+# Web-источники, которые заменяются локальным сервером
+HOSTS = ('iss.moex.com', 'www.dohod.ru', 'smart-lab.ru', 'www.gks.ru')
+
+
+class StandInHandler(BaseHTTPRequestHandler):
+    """Обработчик запросов с поддержкой постоянных соединений"""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        server.wait()
+        if server.is_error():
+            self._send(503, b'Service Unavailable')
+            return
+        host, _, path = self.path.lstrip('/').partition('/')
+        body = server.response(host, f'/{path}')
+        if body is None:
+            self._send(404, f'Нет записи для {self.path}'.encode('utf-8'))
+        else:
+            self._send(200, body)
+
+    def _send(self, code, body):
+        self.send_response(code)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        """Запросы не протоколируются"""
+        pass
+
+
+class StandInServer(socketserver.ThreadingMixIn, HTTPServer):
+    """Сервер, отвечающий записанными ответами из каталога записи
+
+    Parameters
+    ----------
+    directory
+        Каталог с записанными ответами
+    latency
+        Задержка каждого ответа в секундах
+    error_rate
+        Доля ответов с кодом 503
+    page_size
+        Размер страницы при постраничной выдаче
+    seed
+        Начальное значение генератора случайных чисел для воспроизводимости ошибок
+    """
+    daemon_threads = True
+
+    def __init__(self, directory, latency: float = 0.0, error_rate: float = 0.0, page_size: int = PAGE_SIZE,
+                 seed: int = 0, address=('127.0.0.1', 0)):
+        super().__init__(address, StandInHandler)
+        self.directory = directory
+        self.latency = latency
+        self.error_rate = error_rate
+        self.page_size = page_size
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._thread = None
+        self.requests = 0
+
+    @property
+    def url(self):
+        """Адрес сервера"""
+        host, port = self.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def start(self):
+        """Запускает сервер в отдельном потоке"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Останавливает сервер"""
+        self.shutdown()
+        self.server_close()
+        self._thread.join()
+
+    def wait(self):
+        """Задержка ответа"""
+        if self.latency:
+            time.sleep(self.latency)
+
+    def is_error(self):
+        """Нужно ли ответить ошибкой"""
+        with self._lock:
+            self.requests += 1
+            return self._random.random() < self.error_rate
+
+    def response(self, host: str, path_with_query: str):
+        """Ответ на запрос или None при отсутствии записи"""
+        _, key, start = recording.split_url(f'http://{host}{path_with_query}')
+        if start is None:
+            return recording.load_raw(self.directory, host, key)
+        path, _, query = key.partition('?')
+        params = parse.parse_qsl(query, keep_blank_values=True)
+        loaded = recording.load_pages(self.directory, host, key)
+        from_date = None
+        if loaded is None:
+            from_date = dict(params).get(recording.FROM_PARAM)
+            if from_date is None:
+                return None
+            params = [(name, value) for name, value in params if name != recording.FROM_PARAM]
+            loaded = recording.load_pages(self.directory, host, recording.make_key(path, params))
+            if loaded is None:
+                return None
+        blocks, cursors = loaded
+        answer = dict()
+        for name, block in blocks.items():
+            data = block['data']
+            if from_date is not None and DATE_COLUMN in block['columns']:
+                position = block['columns'].index(DATE_COLUMN)
+                data = [row for row in data if row[position] >= from_date]
+            answer[name] = dict(columns=block['columns'], data=data[start:start + self.page_size])
+            if name in cursors:
+                answer[name + recording.CURSOR_SUFFIX] = dict(columns=['INDEX', 'TOTAL', 'PAGESIZE'],
+                                                              data=[[start, len(data), self.page_size]])
+        return json.dumps(answer, ensure_ascii=False).encode('utf-8')
+
+
+@contextlib.contextmanager
+def stand_in(directory, hosts=HOSTS, **kwargs):
+    """Запускает локальный сервер и направляет на него запросы общего HTTP-клиента к web-источникам
+
+    Parameters
+    ----------
+    directory
+        Каталог с записанными ответами
+    hosts
+        Серверы, запросы к которым направляются на локальный сервер
+    kwargs
+        Параметры StandInServer - задержка, доля ошибок, размер страницы и начальное значение генератора
+
+    Yields
+    ------
+    StandInServer
+        Запущенный сервер
+    """
+    server = StandInServer(directory, **kwargs).start()
+    for host in hosts:
+        session.SESSION.route(host, server.url)
+    try:
+        yield server
+    finally:
+        for host in hosts:
+            session.SESSION.route(host, None)
+        session.SESSION.close()
+        server.stop()
+
+
+@contextlib.contextmanager
+def record(directory):
+    """Записывает все ответы web-источников, полученные общим HTTP-клиентом, в каталог"""
+    session.SESSION.record(directory)
+    try:
+        yield
+    finally:
+        session.SESSION.record(None)
+
+
+if __name__ == '__main__':
+    with stand_in(sys.argv[1]) as stand_in_server:
+        print(f'Сервер запущен {stand_in_server.url}')
+        while True:
+            time.sleep(3600)
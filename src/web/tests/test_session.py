@@ -0,0 +1,130 @@
+import json
+import socketserver
+import threading
+import time
+import urllib.error
+from http.server import HTTPServer, BaseHTTPRequestHandler
+
+import pytest
+
+from web import session
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+    connections = set()
+    failures = dict()
+    user_agents = []
+
+    def do_GET(self):
+        self.connections.add(self.client_address)
+        self.user_agents.append(self.headers.get('User-Agent'))
+        if self.path.startswith('/fail'):
+            left = self.failures.get(self.path, 0)
+            if left:
+                self.failures[self.path] = left - 1
+                self._send(503, b'busy')
+                return
+        if self.path == '/missing':
+            self._send(404, b'missing')
+            return
+        if self.path == '/redirect':
+            self.send_response(302)
+            self.send_header('Location', '/json')
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self._send(200, json.dumps({'path': self.path}).encode())
+
+    def _send(self, code, body):
+        self.send_response(code)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class Server(socketserver.ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+@pytest.fixture(scope='module', name='url')
+def make_server():
+    server = Server(('127.0.0.1', 0), Handler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    yield f'http://127.0.0.1:{server.server_address[1]}'
+    server.shutdown()
+    server.server_close()
+
+
+def test_keep_alive(url):
+    client = session.Session()
+    Handler.connections.clear()
+    for number in range(5):
+        assert client.get_json(f'{url}/json?page={number}') == {'path': f'/json?page={number}'}
+    assert len(Handler.connections) == 1
+    client.close()
+
+
+def test_retry(url):
+    client = session.Session(backoff=0.01)
+    Handler.failures['/fail1'] = 2
+    assert client.get_json(f'{url}/fail1') == {'path': '/fail1'}
+    assert Handler.failures['/fail1'] == 0
+
+
+def test_retry_exhausted(url):
+    client = session.Session(retries=1, backoff=0.01)
+    Handler.failures['/fail2'] = 5
+    with pytest.raises(urllib.error.HTTPError) as error:
+        client.get(f'{url}/fail2')
+    assert error.value.code == 503
+    assert Handler.failures['/fail2'] == 3
+
+
+def test_http_error(url):
+    with pytest.raises(urllib.error.HTTPError) as error:
+        session.Session().get(f'{url}/missing')
+    assert error.value.code == 404
+
+
+def test_redirect(url):
+    assert session.Session().get_json(f'{url}/redirect') == {'path': '/json'}
+
+
+def test_url_error():
+    client = session.Session(retries=1, backoff=0.01)
+    with pytest.raises(urllib.error.URLError):
+        client.get('http://127.0.0.1:1/json')
+
+
+def test_concurrency_limit(url):
+    client = session.Session(max_connections=2)
+    Handler.connections.clear()
+    threads = [threading.Thread(target=client.get, args=(f'{url}/json',)) for _ in range(10)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(Handler.connections) <= 2
+
+
+def test_min_interval(url):
+    client = session.Session(min_interval=0.1)
+    threads = [threading.Thread(target=client.get, args=(f'{url}/json',)) for _ in range(4)]
+    start = time.monotonic()
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert time.monotonic() - start >= 0.3
+
+
+def test_user_agent(url):
+    Handler.user_agents.clear()
+    session.Session().get(f'{url}/json')
+    session.Session(user_agent='agent').get(f'{url}/json')
+    assert Handler.user_agents == [session.USER_AGENT, 'agent']
@@ -0,0 +1,83 @@
+import json
+import urllib.error
+
+import pandas as pd
+import pytest
+
+from web import recording, session, stand_in
+from web.dividends import dohod_ru
+from web.labels import CLOSE_PRICE, VOLUME
+from web.moex import iss_quotes
+
+URL = 'https://iss.moex.com/iss/history/engines/stock/markets/shares/securities/AKRN.json?start={start}'
+COLUMNS = ['BOARDID', 'TRADEDATE', 'SECID', 'CLOSE', 'VOLUME']
+ROWS = 250
+
+
+def make_rows():
+    dates = pd.date_range('2018-01-01', periods=ROWS, freq='D')
+    return [['TQBR', str(date.date()), 'AKRN', 100.0 + number, number] for number, date in enumerate(dates)]
+
+
+@pytest.fixture(name='directory')
+def make_recording(tmpdir):
+    rows = make_rows()
+    for start in range(0, ROWS + 100, 100):
+        page = {'history': {'columns': COLUMNS, 'data': rows[start:start + 100]},
+                'history.cursor': {'columns': ['INDEX', 'TOTAL', 'PAGESIZE'], 'data': [[start, ROWS, 100]]}}
+        recording.save(tmpdir, URL.format(start=start), json.dumps(page).encode())
+    recording.save(tmpdir, dohod_ru.make_url('AKRN'), b'<html>AKRN</html>')
+    return tmpdir
+
+
+@pytest.fixture(autouse=True)
+def fast_retry(monkeypatch):
+    monkeypatch.setattr(session.SESSION, '_backoff', 0.001)
+
+
+def test_split_url():
+    host, key, start = recording.split_url('https://iss.moex.com/iss/a.json?start=100&from=2018-01-01')
+    assert host == 'iss.moex.com'
+    assert key == '/iss/a.json?from=2018-01-01'
+    assert start == 100
+
+
+def test_replay_quotes(directory):
+    with stand_in.stand_in(directory, page_size=30) as server:
+        df = iss_quotes.quotes('AKRN')
+    assert len(df) == ROWS
+    assert df.index.is_unique
+    assert list(df[VOLUME]) == list(range(ROWS))
+    assert server.requests > ROWS // 30
+
+
+def test_replay_from_filter(directory):
+    with stand_in.stand_in(directory):
+        df = iss_quotes.quotes('AKRN', pd.Timestamp('2018-08-01'))
+    assert df.index[0] == pd.Timestamp('2018-08-01')
+    assert df.index[-1] == pd.Timestamp('2018-09-07')
+    assert df.loc['2018-08-01', CLOSE_PRICE] == 312.0
+
+
+def test_replay_raw(directory):
+    with stand_in.stand_in(directory):
+        assert dohod_ru.get_html(dohod_ru.make_url('AKRN')) == b'<html>AKRN</html>'
+        with pytest.raises(urllib.error.HTTPError):
+            session.get('https://iss.moex.com/iss/missing.json')
+
+
+def test_errors_and_latency(directory):
+    with stand_in.stand_in(directory, latency=0.001, error_rate=0.2, seed=1) as server:
+        df = iss_quotes.quotes('AKRN')
+    assert len(df) == ROWS
+    assert server.requests > 4
+
+
+def test_record(directory, tmpdir_factory):
+    copy = tmpdir_factory.mktemp('copy')
+    with stand_in.stand_in(directory):
+        with stand_in.record(copy):
+            expected = iss_quotes.quotes('AKRN')
+    with stand_in.stand_in(copy):
+        df = iss_quotes.quotes('AKRN')
+    assert df.equals(expected)
@@ -1,9 +1,10 @@
 """Загрузка данных по месячному индексу потребительских цен сайта www.gks.ru"""
-
+import io
 from datetime import date
 
 import pandas as pd
 
+from web import session
 from web.labels import DATE, CPI
 
 URL_CPI = 'http://www.gks.ru/free_doc/new_site/prices/potr/I_ipc.xlsx'
@@ -28,7 +29,7 @@ def validate(df: pd.DataFrame):
 
 def parse_xls(url: str):
     """Загружает, проверяет и преобразует xls-файл"""
-    df = pd.read_excel(url, **PARSING_PARAMETERS)
+    df = pd.read_excel(io.BytesIO(session.get(url)), **PARSING_PARAMETERS)
     validate(df)
     df = df.transpose().stack()
     first_year = df.index[0][0]